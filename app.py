@@ -1,17 +1,37 @@
+import time
+_APP_START = time.perf_counter()
+
 import sys
 import os
-import json
 import re
 from pathlib import Path
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QProgressBar, QLabel, QHeaderView,
+    QTableWidget, QTableWidgetItem, QTableView, QProgressBar, QLabel, QHeaderView,
     QTabWidget, QCheckBox, QFileDialog, QHBoxLayout, QMessageBox,
-    QTextEdit, QComboBox, QSpinBox, QGroupBox, QFrame, QSizePolicy
+    QTextEdit, QComboBox, QSpinBox, QGroupBox, QFrame, QSizePolicy, QInputDialog
+)
+from PyQt6.QtCore import Qt, QTimer, QRectF, QSize
+from PyQt6.QtGui import QIcon, QPainter, QPainterPath, QColor, QPixmap, QPen, QBrush
+from core import (
+    DownloadItem, DownloadHistory, DownloadManager, DownloadRunner, item_from_entry, batch_summary,
+    DEPENDENCIES_PATH, DEFAULT_YT_DLP_PATH, DEFAULT_FFMPEG_PATH
 )
-from PyQt6.QtCore import QProcess, Qt, QTimer, pyqtSignal, QObject, QRectF
-from PyQt6.QtGui import QIcon, QPainter, QPainterPath, QColor, QPixmap
+from control import ControlServer, MetricsServer, forward_to_running_instance
+from cluster import Coordinator
+from metrics import THROUGHPUT_SAMPLES, format_bytes
+from profiling import PROFILE_ENABLED, SUMMARY_FILE, Profiler, profiled
+from procio import process_hub
+from formats import (FormatFilterProxy, FormatTableModel, load_profiles, rank_formats, PROFILES_FILE,
+                     info_fetch_args, lean_info, trim_info, format_size_bytes)
+from schedule import SCHEDULE_FILE
+from audio import AUDIO_FORMATS
+from launch import LAUNCH_PROFILES_FILE
+from subscriptions import SUBSCRIPTIONS_FILE, Subscription, SubscriptionManager
+from thumbnails import THUMBNAIL_SIZE, ThumbnailLoader, pick_thumbnail
+from search import (SEARCH_BACKENDS, SEARCH_MODES, PREFETCH_TOP_K, MetadataPrefetcher, SearchCache, SearchSession,
+                    result_signature, result_url, search_cache_key)
 
 class TabButtonBackground(QLabel):
     def __init__(self, parent=None):
@@ -40,135 +60,49 @@ class TabButtonBackground(QLabel):
         x = geometry.x() + 6
         self.move(x, geometry.y())
 
-class DownloadItem:
-    def __init__(self, url, format_id, format_type, output_path, title="Unknown"):
-        self.url = url
-        self.format_id = format_id
-        self.format_type = format_type
-        self.output_path = output_path
-        self.title = title
-        self.status = "Queued"
-        self.progress = 0
-        self.process = None
-        self.added_time = datetime.now()
-        self.start_time = None
-        self.end_time = None
-        self.file_size = ""
-        self.download_speed = ""
-
-class DownloadHistory:
-    def __init__(self, history_file="Saves/download_history.json"):
-        self.history_file = history_file
-        self.history = []
-
-        # Ensure folder exists
-        folder = os.path.dirname(self.history_file)
-        if not os.path.exists(folder):
-            os.makedirs(folder, exist_ok=True)
-
-        # Ensure file exists
-        if not os.path.exists(self.history_file):
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                json.dump([], f, indent=2)
-
-        self.load_history()
-
-    def load_history(self):
-        try:
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.history = data
-        except Exception as e:
-            print(f"Error loading history: {e}")
-            self.history = []
+class ThroughputGraph(QWidget):
+    """Sparkline of the manager's aggregate throughput samples"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.samples = []
+        self.setFixedHeight(48)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
 
-    def save_history(self):
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False, default=str)
-        except Exception as e:
-            print(f"Error saving history: {e}")
-
-    def add_item(self, download_item):
-        history_entry = {
-            "title": download_item.title,
-            "url": download_item.url,
-            "format_id": download_item.format_id,
-            "format_type": download_item.format_type,
-            "output_path": download_item.output_path,
-            "status": download_item.status,
-            "added_time": download_item.added_time.isoformat(),
-            "start_time": download_item.start_time.isoformat() if download_item.start_time else None,
-            "end_time": download_item.end_time.isoformat() if download_item.end_time else None,
-            "file_size": download_item.file_size
-        }
-        self.history.insert(0, history_entry)
-        self.save_history()
-
-class DownloadManager(QObject):
-    download_started = pyqtSignal(str)
-    download_progress = pyqtSignal(str, int, str)
-    download_finished = pyqtSignal(str, bool)
-    
-    def __init__(self, max_concurrent=3):
-        super().__init__()
-        self.max_concurrent = max_concurrent
-        self.queue = []
-        self.active_downloads = {}
-        self.item_counter = 0
-        
-    def add_to_queue(self, download_item):
-        self.item_counter += 1
-        download_item.id = str(self.item_counter)
-        self.queue.append(download_item)
-        self.process_queue()
-    
-    def process_queue(self):
-        while len(self.active_downloads) < self.max_concurrent and self.queue:
-            item = self.queue.pop(0)
-            self.start_download(item)
-    
-    def start_download(self, item):
-        item.status = "Downloading"
-        item.start_time = datetime.now()
-        self.active_downloads[item.id] = item
-        self.download_started.emit(item.id)
-    
-    def update_progress(self, item_id, progress, status=""):
-        if item_id in self.active_downloads:
-            item = self.active_downloads[item_id]
-            item.progress = progress
-            if status:
-                item.status = status
-            self.download_progress.emit(item_id, progress, status)
-    
-    def finish_download(self, item_id, success):
-        if item_id in self.active_downloads:
-            item = self.active_downloads[item_id]
-            item.end_time = datetime.now()
-            item.status = "Completed" if success else "Failed"
-            item.progress = 100 if success else item.progress
-            
-            self.download_finished.emit(item_id, success)
-            del self.active_downloads[item_id]
-            
-            self.process_queue()
-    
-    def get_queue_items(self):
-        return self.queue.copy()
-    
-    def get_active_items(self):
-        return list(self.active_downloads.values())
-    
-    def remove_from_queue(self, item_id):
-        self.queue = [item for item in self.queue if item.id != item_id]
-    
-    def cancel_download(self, item_id):
-        if item_id in self.active_downloads:
-            item = self.active_downloads[item_id]
-            if item.process and item.process.state() == QProcess.ProcessState.Running:
-                item.process.kill()
-            self.finish_download(item_id, False)
+    def set_samples(self, samples):
+        self.samples = [value for _, value in samples]
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(1, 4, -1, -1)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 40))
+
+        peak = max(self.samples, default=0)
+        if len(self.samples) > 1 and peak > 0:
+            # Newest sample on the right edge, the graph scrolls left as samples arrive
+            step = rect.width() / (THROUGHPUT_SAMPLES - 1)
+            left = rect.right() - (len(self.samples) - 1) * step
+            path = QPainterPath()
+            path.moveTo(left, rect.bottom())
+            for index, value in enumerate(self.samples):
+                path.lineTo(left + index * step, rect.bottom() - value / peak * rect.height())
+            path.lineTo(rect.right(), rect.bottom())
+            painter.fillPath(path, QColor(40, 140, 255, 70))
+            painter.setPen(QPen(QColor(40, 140, 255), 1.5))
+            painter.drawPath(path)
+
+        painter.setPen(QColor(200, 200, 200))
+        painter.drawText(self.rect().adjusted(4, 2, -4, -2),
+                         Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTop,
+                         f"peak {format_bytes(peak, '/s')}")
+        painter.end()
+
+
+HISTORY_FILL_CHUNK = 500
+# Queue tab's schedule view: rows shown and seconds between projections
+SCHEDULE_VIEW_ROWS = 50
+SCHEDULE_VIEW_INTERVAL = 5
 
 class VideoDownloader(QWidget):
     def __init__(self):
@@ -178,23 +112,38 @@ class VideoDownloader(QWidget):
         self.setMinimumSize(1200, 800)
 
         # Paths
-        self.Dependencies_path = "./Dependencies/"
-        self.yt_dlp_path = self.Dependencies_path + "yt-dlp.exe"
-        self.ffmpeg_path = self.Dependencies_path + "ffmpeg-8.0-full_build/bin/ffmpeg.exe"
+        self.Dependencies_path = DEPENDENCIES_PATH
+        self.yt_dlp_path = DEFAULT_YT_DLP_PATH
+        self.ffmpeg_path = DEFAULT_FFMPEG_PATH
 
         # State
         self.format_json = []
         self.video_info = {}
         self.show_best_mp4_highlight = True
+        self.format_profiles = load_profiles()
+        self.best_choice = None
         self.fetching_info = False
         self.fetching_search = False
         self.search_results = []
         self.current_search_query = ""
-        self.info_buffer = ""
+        self.info_errors = ""
+        self.info_received = False
+        self.lean_fetch = True
+        # Audio-only downloads are converted to this, None keeps the native format; see audio.py
+        self.audio_format = None
+        self.loudnorm = False
+        self.info_lean = True
+        self.info_objects = []
+        self.info_started = None
+        self.info_url = ""
+        self.last_info_fetch = None
+        self.first_paint_logged = False
+        self.history_fill_generation = 0
 
         # Download management
         self.download_manager = DownloadManager()
         self.download_history = DownloadHistory()
+        self.download_runner = DownloadRunner(self.download_manager, self.yt_dlp_path, self.ffmpeg_path)
         self.setup_download_manager_connections()
 
         # Create shared console first
@@ -217,11 +166,17 @@ class VideoDownloader(QWidget):
         # Tab background
         self.tab_background = TabButtonBackground(self)
 
-        # UI
+        # UI: only the Downloader tab is built before the first frame, the
+        # others are built on first use or once the window is idle
         self.init_main_tab()
-        self.init_queue_tab()
-        self.init_history_tab()
-        self.init_settings_tab()
+        self.queue_table = None
+        self.history_table = None
+        self.deferred_tabs = {
+            self.tabs.indexOf(self.queue_tab): self.init_queue_tab,
+            self.tabs.indexOf(self.history_tab): self.init_history_tab,
+            self.tabs.indexOf(self.settings_tab): self.init_settings_tab,
+        }
+        self.tabs.currentChanged.connect(self.ensure_tab_built)
         
         # Main layout with shared console
         root = QVBoxLayout()
@@ -250,19 +205,115 @@ class VideoDownloader(QWidget):
         root.addWidget(self.console_frame)
         self.setLayout(root)
 
-        # Processes
-        self.init_processes()
-        
-        # Update timer for queue display
+        # Handles of the running fetch/search, the processes live in procio's worker thread
+        self.proc_info = None
+        self.search_session = None
+        self.search_cache = SearchCache()
+        self.search_cache_key = None
+        self.prefetcher = MetadataPrefetcher(self.yt_dlp_path, parent=self)
+        self.prefetcher.prefetched.connect(self.on_prefetched)
+        self.awaiting_prefetch = None
+        self.thumbnail_loader = None
+        self.thumbnail_rows = {}
+        self.video_thumbnail_url = None
+        
+        # Update timer for queue display, started after the first frame
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_queue_display)
+
+        # Control API so scripts and later launches feed this instance's queue
+        self.control_server = ControlServer(
+            self.download_manager, str(Path.home() / "Downloads" / "%(title)s.%(ext)s"))
+        self.control_server.log_message.connect(self.log_to_console)
+        self.control_server.activate_requested.connect(self.activate_window)
+        self.control_server.start()
+
+        # Prometheus endpoint, only when VDM_METRICS_PORT is set
+        self.metrics_server = MetricsServer(self.download_manager.metrics)
+        self.metrics_server.log_message.connect(self.log_to_console)
+        self.metrics_server.start()
+
+        # Remote download workers, only when VDM_COORDINATOR_PORT is set
+        self.coordinator = Coordinator(self.download_manager)
+        self.coordinator.log_message.connect(self.log_to_console)
+        self.control_server.coordinator = self.coordinator
+
+        # Followed channels and playlists, polled in the background, see subscriptions.py
+        self.subscription_manager = SubscriptionManager(self.download_manager, self.download_runner.yt_dlp_path,
+                                                        self.control_server.default_output)
+        self.subscription_manager.log_message.connect(self.log_to_console)
+        self.subscription_manager.polled.connect(lambda *args: self.update_subscriptions_display())
+        self.control_server.subscriptions = self.subscription_manager
+        self.subscriptions_table = None
+        self.subscription_manager.start()
+
+        # Download windows, see schedule.py; edits to the file are picked up while running
+        self.download_manager.schedule_changed.connect(lambda message: self.log_to_console(f"[SCHEDULE] {message}"))
+        self.schedule_view_updated = 0
+        try:
+            self.download_manager.set_schedule_file(SCHEDULE_FILE)
+            for window in self.download_manager.schedule.windows:
+                self.log_to_console(f"[SCHEDULE] Window {window.describe()}")
+        except ValueError as e:
+            self.log_to_console(f"[SCHEDULE] Running without a schedule, {e}")
+        self.coordinator.start()
+
+        # Opt-in event loop watchdog and slot timings, see profiling.py
+        self.profiler = Profiler()
+        self.profiler.stall_detected.connect(
+            lambda drift, culprit: self.log_to_console(f"[PROFILE] Event loop stalled {drift:.0f} ms, slowest: {culprit}"))
+        self.profiler.set_enabled(PROFILE_ENABLED)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_logged:
+            self.first_paint_logged = True
+            QTimer.singleShot(0, self.on_first_paint)
+
+    def on_first_paint(self):
+        elapsed_ms = (time.perf_counter() - _APP_START) * 1000
+        self.log_to_console(f"[STARTUP] First paint after {elapsed_ms:.0f} ms")
+        try:
+            os.makedirs("Saves", exist_ok=True)
+            with open("Saves/startup_times.log", "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now().isoformat()} first_paint_ms={elapsed_ms:.1f}\n")
+        except OSError as e:
+            print(f"Error logging startup time: {e}")
+
         self.update_timer.start(1000)
+        QTimer.singleShot(0, self.build_next_deferred_tab)
+
+    def build_next_deferred_tab(self):
+        # One tab per event loop pass so input stays responsive while idle-building
+        if self.deferred_tabs:
+            self.ensure_tab_built(min(self.deferred_tabs))
+        if self.deferred_tabs:
+            QTimer.singleShot(0, self.build_next_deferred_tab)
+        else:
+            # Start the process I/O thread now rather than on the first fetch
+            process_hub()
+            # and let the thumbnail loader load the CA certificates while idle
+            self.get_thumbnail_loader()
+
+    def ensure_tab_built(self, index):
+        builder = self.deferred_tabs.pop(index, None)
+        if builder is not None:
+            builder()
+
+    def activate_window(self):
+        self.setWindowState(self.windowState() & ~Qt.WindowState.WindowMinimized)
+        self.show()
+        self.raise_()
+        self.activateWindow()
 
     def setup_download_manager_connections(self):
-        self.download_manager.download_started.connect(self.on_download_started)
+        self.download_runner.log_message.connect(self.log_to_console)
         self.download_manager.download_progress.connect(self.on_download_progress_update)
         self.download_manager.download_finished.connect(self.on_download_completed)
+        self.download_manager.batch_committed.connect(self.on_batch_committed)
+        self.download_manager.download_retrying.connect(self.on_download_retrying)
 
+    @profiled()
     def log_to_console(self, message):
         if self.console_output is not None:
             self.console_output.append(message.strip())
@@ -271,18 +322,6 @@ class VideoDownloader(QWidget):
         else:
             print(f"Console not ready: {message.strip()}")
 
-    def init_processes(self):
-        self.proc_info = QProcess()
-        self.proc_search = QProcess()
-
-        self.proc_info.readyReadStandardOutput.connect(self.on_info_output)
-        self.proc_info.readyReadStandardError.connect(self.on_info_error)
-        self.proc_info.finished.connect(self.on_info_finished)
-
-        self.proc_search.readyReadStandardOutput.connect(self.on_search_output)
-        self.proc_search.readyReadStandardError.connect(self.on_search_error)
-        self.proc_search.finished.connect(self.on_search_finished)
-
     def init_main_tab(self):
         layout = QVBoxLayout()
 
@@ -322,17 +361,22 @@ class VideoDownloader(QWidget):
         
         # Search results table (hidden by default)
         self.search_table = QTableWidget()
-        self.search_table.setColumnCount(4)
-        self.search_table.setHorizontalHeaderLabels(["Title", "Uploader", "Duration", "View Count"])
+        self.search_table.setColumnCount(5)
+        self.search_table.setHorizontalHeaderLabels(["Title", "Uploader", "Duration", "View Count", "Source"])
         search_header = self.search_table.horizontalHeader()
         search_header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-        search_header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        search_header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        search_header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        # ResizeToContents would re-measure the whole column on every setItem;
+        # the columns are fitted once per burst of row changes instead
+        self.search_resize_timer = QTimer(self)
+        self.search_resize_timer.setSingleShot(True)
+        self.search_resize_timer.setInterval(50)
+        self.search_resize_timer.timeout.connect(self.resize_search_columns)
         self.search_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         self.search_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
         self.search_table.setAlternatingRowColors(True)
-        self.search_table.setMaximumHeight(200)
+        self.search_table.setIconSize(QSize(80, 45))
+        self.search_table.verticalHeader().setDefaultSectionSize(49)
+        self.search_table.setMaximumHeight(260)
         self.search_table.setVisible(False)
         self.search_table.cellDoubleClicked.connect(self.on_search_result_selected)
         
@@ -350,46 +394,92 @@ class VideoDownloader(QWidget):
         # Filter
         filter_row = QHBoxLayout()
         self.filter_input = QLineEdit()
-        self.filter_input.setPlaceholderText("Filter by resolution, type, codec, itag…")
-        self.filter_input.textChanged.connect(self.apply_filter)
+        self.filter_input.setPlaceholderText("Filter, e.g. height>=1080 vcodec:av01 size<500MB audio")
+        self.filter_input.setToolTip(
+            "Terms are combined with AND:\n"
+            "  height>=1080, fps>30, tbr<2000, size<500MB   numeric comparison (also width, vbr, abr, asr)\n"
+            "  vcodec:av01, acodec:opus, ext:webm, note:premium, id:137   field contains text\n"
+            "  audio / video   audio-only or video formats\n"
+            "  anything else matches any column, prefix - or ! to exclude")
+        # Re-filter once typing pauses rather than on every keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(self.filter_timer.start)
         filter_row.addWidget(QLabel("Filter:"))
         filter_row.addWidget(self.filter_input)
 
         # Format table
-        self.format_table = QTableWidget()
-        self.format_table.setColumnCount(10)
-        self.format_table.setHorizontalHeaderLabels(
-            ["Itag", "Ext", "Resolution", "Type", "VCodec", "ACodec", "FPS", "Bitrate", "Size", "Note"]
-        )
+        self.format_model = FormatTableModel(self)
+        self.format_proxy = FormatFilterProxy(self)
+        self.format_proxy.setSourceModel(self.format_model)
+        self.format_table = QTableView()
+        self.format_table.setModel(self.format_proxy)
+        self.format_table.verticalHeader().setVisible(False)
         header = self.format_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        # Size columns from the visible rows plus a sample, not every cell of every format
+        header.setResizeContentsPrecision(50)
         header.setStretchLastSection(True)
-        self.format_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.format_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        # No sort column until a header is clicked, so rows keep yt-dlp's order
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.format_table.setSortingEnabled(True)
+        self.format_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.format_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.format_table.setShowGrid(False)
         self.format_table.setAlternatingRowColors(True)
         self.format_table.setStyleSheet("""
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #4a90e2;
                 color: white;
                 font-weight: bold;
             }
         """)
-        self.format_table.cellDoubleClicked.connect(self.on_double_click_row)
+        self.format_table.doubleClicked.connect(self.on_double_click_row)
 
         # Buttons
         actions_row = QHBoxLayout()
         self.btn_add_selected = QPushButton("Add Selected to Queue")
-        self.btn_add_best = QPushButton("Add Best Quality to Queue")
+        self.btn_add_best = QPushButton("Add Best to Queue")
         self.btn_add_selected.clicked.connect(self.add_selected_to_queue)
         self.btn_add_best.clicked.connect(self.add_best_to_queue)
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems([profile.name for profile in self.format_profiles])
+        self.profile_combo.setToolTip(f"Rules for \"Add Best\": resolution cap, codec preference, "
+                                      f"size budget and audio bitrate.\nCustom profiles go in {PROFILES_FILE}")
+        self.profile_combo.currentIndexChanged.connect(self.update_best_choice)
         actions_row.addWidget(self.btn_add_selected)
+        actions_row.addWidget(QLabel("Profile:"))
+        actions_row.addWidget(self.profile_combo)
         actions_row.addWidget(self.btn_add_best)
+        self.btn_audio_batch = QPushButton("Batch Audio...")
+        self.btn_audio_batch.setToolTip("Queue a list of URLs as best-audio downloads, converted as set in Settings")
+        self.btn_audio_batch.clicked.connect(self.add_audio_batch)
+        actions_row.addWidget(self.btn_audio_batch)
+        self.best_choice_label = QLabel("")
+        self.best_choice_label.setWordWrap(True)
+
+        # Current video
+        video_row = QHBoxLayout()
+        self.video_thumb_label = QLabel()
+        self.video_thumb_label.setFixedSize(THUMBNAIL_SIZE)
+        self.video_thumb_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.video_thumb_label.setVisible(False)
+        self.video_title_label = QLabel("")
+        self.video_title_label.setWordWrap(True)
+        font = self.video_title_label.font()
+        font.setBold(True)
+        self.video_title_label.setFont(font)
+        video_row.addWidget(self.video_thumb_label)
+        video_row.addWidget(self.video_title_label, 1)
 
         layout.addWidget(search_group)
+        layout.addLayout(video_row)
         layout.addLayout(filter_row)
         layout.addWidget(self.format_table)
         layout.addLayout(actions_row)
+        layout.addWidget(self.best_choice_label)
         
         self.main_tab.setLayout(layout)
 
@@ -399,9 +489,14 @@ class VideoDownloader(QWidget):
         # Queue controls
         controls_row = QHBoxLayout()
         self.queue_status_label = QLabel("Queue Status: 0 queued, 0 downloading")
+        self.queue_metrics_label = QLabel("")
+        self.throughput_graph = ThroughputGraph()
         self.pause_all_btn = QPushButton("Pause All")
         self.cancel_all_btn = QPushButton("Cancel All")
         self.clear_completed_btn = QPushButton("Clear Completed")
+        self.schedule_btn = QPushButton("Schedule")
+        self.schedule_btn.setCheckable(True)
+        self.schedule_btn.toggled.connect(self.toggle_schedule_view)
         
         self.pause_all_btn.clicked.connect(self.pause_all_downloads)
         self.cancel_all_btn.clicked.connect(self.cancel_all_downloads)
@@ -409,6 +504,7 @@ class VideoDownloader(QWidget):
         
         controls_row.addWidget(self.queue_status_label)
         controls_row.addStretch()
+        controls_row.addWidget(self.schedule_btn)
         controls_row.addWidget(self.pause_all_btn)
         controls_row.addWidget(self.cancel_all_btn)
         controls_row.addWidget(self.clear_completed_btn)
@@ -435,16 +531,50 @@ class VideoDownloader(QWidget):
         self.queue_table.setAlternatingRowColors(True)
         self.queue_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         
+        graph_row = QHBoxLayout()
+        graph_row.addWidget(self.throughput_graph, 1)
+        graph_row.addWidget(self.queue_metrics_label)
+
+        # Per-worker load and throughput, only shown when running as a coordinator
+        self.workers_table = QTableWidget()
+        self.workers_table.setColumnCount(7)
+        self.workers_table.setHorizontalHeaderLabels([
+            "Worker", "Address", "Running", "Backlog", "Speed", "Average", "Done / Failed"
+        ])
+        self.workers_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.workers_table.verticalHeader().setVisible(False)
+        self.workers_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.workers_table.setMaximumHeight(120)
+        self.workers_table.setVisible(self.coordinator.is_listening())
+
+        # Upcoming schedule: the current window and projected start/finish of the next items
+        self.schedule_label = QLabel("")
+        self.schedule_table = QTableWidget()
+        self.schedule_table.setColumnCount(5)
+        self.schedule_table.setHorizontalHeaderLabels(["Title", "Status", "Size", "Projected Start", "Projected Finish"])
+        # Sized once per refresh in update_schedule_display, ResizeToContents re-measures on every setItem
+        self.schedule_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.schedule_table.verticalHeader().setVisible(False)
+        self.schedule_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.schedule_table.setMaximumHeight(200)
+        self.schedule_label.setVisible(False)
+        self.schedule_table.setVisible(False)
+        
         layout.addLayout(controls_row)
+        layout.addLayout(graph_row)
+        layout.addWidget(self.workers_table)
+        layout.addWidget(self.schedule_label)
+        layout.addWidget(self.schedule_table)
         layout.addWidget(self.queue_table)
         self.queue_tab.setLayout(layout)
+        self.update_queue_display()
 
     def init_history_tab(self):
         layout = QVBoxLayout()
         
         # History controls
         controls_row = QHBoxLayout()
-        self.history_status_label = QLabel(f"Total downloads: {len(self.download_history.history)}")
+        self.history_status_label = QLabel("Loading history...")
         self.clear_history_btn = QPushButton("Clear History")
         self.export_history_btn = QPushButton("Export History")
         
@@ -458,9 +588,9 @@ class VideoDownloader(QWidget):
         
         # History table
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(7)
+        self.history_table.setColumnCount(8)
         self.history_table.setHorizontalHeaderLabels([
-            "Title", "Format", "Status", "File Size", "Date Added", "Duration", "Path"
+            "Title", "Format", "Status", "File Size", "Date Added", "Duration", "Avg Speed", "Path"
         ])
         
         history_header = self.history_table.horizontalHeader()
@@ -470,7 +600,8 @@ class VideoDownloader(QWidget):
         history_header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
         history_header.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
         history_header.setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)
-        history_header.setSectionResizeMode(6, QHeaderView.ResizeMode.Stretch)
+        history_header.setSectionResizeMode(6, QHeaderView.ResizeMode.ResizeToContents)
+        history_header.setSectionResizeMode(7, QHeaderView.ResizeMode.Stretch)
         
         self.history_table.setAlternatingRowColors(True)
         self.history_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
@@ -479,12 +610,14 @@ class VideoDownloader(QWidget):
         self.history_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.history_table.customContextMenuRequested.connect(self.show_history_context_menu)
         
-        self.populate_history_table()
-        
         layout.addLayout(controls_row)
         layout.addWidget(self.history_table)
         self.history_tab.setLayout(layout)
 
+        # The history file is only read here, not at startup
+        self.populate_history_table()
+        self.update_history_status()
+
     def init_settings_tab(self):
         layout = QVBoxLayout()
         
@@ -500,13 +633,77 @@ class VideoDownloader(QWidget):
         self.concurrent_spin.valueChanged.connect(self.update_concurrent_downloads)
         concurrent_row.addWidget(self.concurrent_spin)
         concurrent_row.addStretch()
+
+        retries_row = QHBoxLayout()
+        retries_row.addWidget(QLabel("Retries on Transient Errors:"))
+        self.retries_spin = QSpinBox()
+        self.retries_spin.setRange(0, 10)
+        self.retries_spin.setValue(self.download_manager.max_retries)
+        self.retries_spin.valueChanged.connect(self.update_max_retries)
+        retries_row.addWidget(self.retries_spin)
+        retries_row.addStretch()
         
-        self.highlight_checkbox = QCheckBox("Show Best MP4 Highlight")
+        self.highlight_checkbox = QCheckBox("Highlight Best Format for Profile")
         self.highlight_checkbox.setChecked(True)
         self.highlight_checkbox.stateChanged.connect(self.toggle_highlight)
+
+        self.lean_fetch_checkbox = QCheckBox("Lean Format Fetch (title, duration and formats only)")
+        self.lean_fetch_checkbox.setToolTip("Ask yt-dlp for just the fields VDM uses instead of the full "
+                                            "-J info dict, which skips captions and comments")
+        self.lean_fetch_checkbox.setChecked(self.lean_fetch)
+        self.lean_fetch_checkbox.stateChanged.connect(self.toggle_lean_fetch)
+
+        self.segmented_checkbox = QCheckBox("Segmented Downloads for Direct HTTP Formats")
+        self.segmented_checkbox.setToolTip("Fetch single-file formats over several parallel connections "
+                                           "instead of yt-dlp's one; metadata is not embedded in these files")
+        self.segmented_checkbox.setChecked(self.download_runner.segmented)
+        self.segmented_checkbox.stateChanged.connect(self.toggle_segmented)
+
+        self.verify_checkbox = QCheckBox("Verify Finished Downloads (size, SHA-256, ffprobe)")
+        self.verify_checkbox.setToolTip("Check every finished file in the background before marking it "
+                                        "completed; files that fail are downloaded again")
+        self.verify_checkbox.setChecked(self.download_runner.verify)
+        self.verify_checkbox.stateChanged.connect(self.toggle_verify)
+
+        audio_row = QHBoxLayout()
+        audio_row.addWidget(QLabel("Convert Audio-Only Downloads To:"))
+        self.audio_format_combo = QComboBox()
+        self.audio_format_combo.addItems(["Keep Original"] + list(AUDIO_FORMATS))
+        self.audio_format_combo.setToolTip(f"Converted after the download, on up to "
+                                           f"{self.download_runner.converter.workers} ffmpeg processes "
+                                           f"that don't take download slots")
+        self.audio_format_combo.currentTextChanged.connect(self.update_audio_format)
+        self.loudnorm_checkbox = QCheckBox("Normalize Loudness")
+        self.loudnorm_checkbox.setToolTip("Run ffmpeg's loudnorm filter (EBU R128, -16 LUFS) while converting")
+        self.loudnorm_checkbox.setEnabled(False)
+        self.loudnorm_checkbox.stateChanged.connect(self.update_audio_format)
+        audio_row.addWidget(self.audio_format_combo)
+        audio_row.addWidget(self.loudnorm_checkbox)
+        audio_row.addStretch()
+
+        launch_row = QHBoxLayout()
+        launch_row.addWidget(QLabel("Process Priority:"))
+        self.launch_profile_combo = QComboBox()
+        for index, profile in enumerate(self.download_runner.launch_profiles.values()):
+            self.launch_profile_combo.addItem(profile.name)
+            self.launch_profile_combo.setItemData(index, profile.describe(), Qt.ItemDataRole.ToolTipRole)
+        self.launch_profile_combo.setCurrentText(self.download_runner.launch_profile)
+        self.launch_profile_combo.setToolTip("CPU nice level, I/O class, CPU affinity and memory cap of yt-dlp and "
+                                             "ffmpeg, applied as each starts.\n\"background\" keeps the machine "
+                                             f"responsive under large batches. Custom profiles go in "
+                                             f"{LAUNCH_PROFILES_FILE}")
+        self.launch_profile_combo.currentTextChanged.connect(self.update_launch_profile)
+        launch_row.addWidget(self.launch_profile_combo)
+        launch_row.addStretch()
         
         download_layout.addLayout(concurrent_row)
+        download_layout.addLayout(retries_row)
         download_layout.addWidget(self.highlight_checkbox)
+        download_layout.addWidget(self.lean_fetch_checkbox)
+        download_layout.addWidget(self.segmented_checkbox)
+        download_layout.addWidget(self.verify_checkbox)
+        download_layout.addLayout(audio_row)
+        download_layout.addLayout(launch_row)
         download_group.setLayout(download_layout)
 
         # Console toggle
@@ -514,8 +711,65 @@ class VideoDownloader(QWidget):
         self.console_checkbox.setChecked(True)
         self.console_checkbox.stateChanged.connect(self.toggle_console)
 
+        # Diagnostics
+        diagnostics_group = QGroupBox("Diagnostics")
+        diagnostics_layout = QVBoxLayout()
+        self.profile_checkbox = QCheckBox("Profile Event Loop and Slot Timings")
+        self.profile_checkbox.setChecked(self.profiler.enabled)
+        self.profile_checkbox.stateChanged.connect(self.toggle_profiling)
+        self.cprofile_checkbox = QCheckBox("Capture cProfile")
+        self.cprofile_checkbox.stateChanged.connect(self.toggle_cprofile)
+        diagnostics_layout.addWidget(self.profile_checkbox)
+        diagnostics_layout.addWidget(self.cprofile_checkbox)
+        diagnostics_layout.addWidget(QLabel(f"A summary of the slowest handlers is written to {SUMMARY_FILE} on exit."))
+        diagnostics_group.setLayout(diagnostics_layout)
+
+        # Followed channels and playlists
+        subscriptions_group = QGroupBox("Subscriptions")
+        subscriptions_layout = QVBoxLayout()
+        self.subscriptions_table = QTableWidget()
+        self.subscriptions_table.setColumnCount(6)
+        self.subscriptions_table.setHorizontalHeaderLabels(["Name", "URL", "Format", "Every", "Last Checked", "New"])
+        self.subscriptions_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.subscriptions_table.verticalHeader().setVisible(False)
+        self.subscriptions_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.subscriptions_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.subscriptions_table.setMaximumHeight(150)
+
+        subscribe_row = QHBoxLayout()
+        self.subscription_url_input = QLineEdit()
+        self.subscription_url_input.setPlaceholderText("Channel or playlist URL (e.g. https://www.youtube.com/@name/videos)")
+        self.subscription_format_combo = QComboBox()
+        self.subscription_format_combo.setEditable(True)
+        self.subscription_format_combo.addItems(["best"] + [profile.name for profile in self.format_profiles])
+        self.subscription_format_combo.setToolTip("Format profile or yt-dlp format selector for new uploads")
+        self.subscription_every_spin = QSpinBox()
+        self.subscription_every_spin.setRange(15, 7 * 24 * 60)
+        self.subscription_every_spin.setValue(360)
+        self.subscription_every_spin.setSuffix(" min")
+        subscribe_btn = QPushButton("Subscribe")
+        subscribe_btn.clicked.connect(self.add_subscription)
+        poll_btn = QPushButton("Check Now")
+        poll_btn.clicked.connect(lambda: self.subscription_manager.poll_now())
+        unsubscribe_btn = QPushButton("Remove")
+        unsubscribe_btn.clicked.connect(self.remove_subscription)
+        subscribe_row.addWidget(self.subscription_url_input, 1)
+        subscribe_row.addWidget(self.subscription_format_combo)
+        subscribe_row.addWidget(self.subscription_every_spin)
+        subscribe_row.addWidget(subscribe_btn)
+        subscribe_row.addWidget(poll_btn)
+        subscribe_row.addWidget(unsubscribe_btn)
+
+        subscriptions_layout.addWidget(self.subscriptions_table)
+        subscriptions_layout.addLayout(subscribe_row)
+        subscriptions_layout.addWidget(QLabel(f"Saved in {SUBSCRIPTIONS_FILE}; new uploads are queued automatically."))
+        subscriptions_group.setLayout(subscriptions_layout)
+        self.update_subscriptions_display()
+
         layout.addWidget(download_group)
+        layout.addWidget(subscriptions_group)
         layout.addWidget(self.console_checkbox)
+        layout.addWidget(diagnostics_group)
         layout.addStretch(1)
         self.settings_tab.setLayout(layout)
 
@@ -535,29 +789,50 @@ class VideoDownloader(QWidget):
         
         self.search_table.setVisible(False)
         self.select_search_btn.setVisible(False)
-        self.format_table.setRowCount(0)
+        self.format_model.clear()
 
     def perform_search(self, query, search_type):
         self.console_output.clear()
         self.search_results = []
         self.current_search_query = query
-        self.fetching_search = True
         
-        # Clear search table and show loading row
-        self.search_table.setRowCount(1)
-        self.search_table.setColumnCount(4)
+        if self.search_session is not None:
+            self.search_session.cancel()
+            self.search_session.deleteLater()
+            self.search_session = None
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.clear_pending()
+        self.thumbnail_rows = {}
+        self.prefetcher.cancel()
+        if self.awaiting_prefetch is not None:
+            # cancel() doesn't report the fetch that was being waited for
+            self.awaiting_prefetch = None
+            self.fetching_info = False
+            self.format_model.clear()
+            self.btn_add_selected.setEnabled(True)
+            self.btn_add_best.setEnabled(True)
+        self.prefetcher.yt_dlp_path = self.yt_dlp_path
+        limit = self.search_limit.value()
+        backends = SEARCH_MODES.get(search_type, ["youtube"])
+        self.search_cache_key = search_cache_key(search_type, query, limit)
+        
+        cached = self.search_cache.get(self.search_cache_key)
+        if cached is not None:
+            results, stale = cached
+            self.log_to_console(f"[SEARCH] \"{query}\": {len(results)} cached results"
+                                + (", revalidating" if stale else ""))
+            self.search_results = results
+            self.populate_search_results()
+            for result in results[:PREFETCH_TOP_K]:
+                self.prefetcher.enqueue(result_url(result))
+            if stale:
+                self._start_search_session(query, backends, limit, revalidate=True)
+            return
         
-        # Create loading row
-        loading_item = QTableWidgetItem("Fetching results...")
-        loading_item.setBackground(Qt.GlobalColor.darkBlue)
-        loading_item.setForeground(Qt.GlobalColor.white)
-        font = loading_item.font()
-        font.setBold(True)
-        loading_item.setFont(font)
+        self.fetching_search = True
         
-        self.search_table.setItem(0, 0, loading_item)
-        for col in range(1, 4):
-            self.search_table.setItem(0, col, QTableWidgetItem(""))
+        # Clear search table and show loading row
+        self._show_search_message("Fetching results...", Qt.GlobalColor.darkBlue)
         
         # Make search table visible to show loading state
         self.search_table.setVisible(True)
@@ -566,73 +841,148 @@ class VideoDownloader(QWidget):
         # Disable search button while loading
         self.fetch_button.setEnabled(False)
         
-        # Build search command
-        limit = self.search_limit.value()
-        if search_type == "Search YouTube":
-            search_query = f"ytsearch{limit}:{query}"
+        self.log_to_console(f"[SEARCH] \"{query}\" on {', '.join(backends)}, {limit} results each")
+        session = self._start_search_session(query, backends, limit)
+        self.search_results = session.results
+
+    def _start_search_session(self, query, backends, limit, revalidate=False):
+        session = SearchSession(self.yt_dlp_path, self)
+        session.backend_finished.connect(self.on_search_backend_finished)
+        if revalidate:
+            # Rows stay as they are until the whole new result list is in
+            session.finished.connect(self.on_search_revalidated)
         else:
-            search_query = f"ytsearch{limit}:{query}"
-        
-        args = [
-            "--flat-playlist",
-            "--dump-json",
-            search_query
-        ]
-        
-        self.log_to_console(f"[SEARCH] Command: {self.yt_dlp_path} {' '.join(args)}")
-        self.proc_search.start(self.yt_dlp_path, args)
-
-    def on_search_output(self):
-        output = str(self.proc_search.readAllStandardOutput(), "utf-8")
-        self.log_to_console(f"[SEARCH] {output}")
-        
-        for line in output.strip().split('\n'):
-            if line.strip():
-                try:
-                    result = json.loads(line)
-                    if result.get('_type') != 'playlist':
-                        self.search_results.append(result)
-                except json.JSONDecodeError:
-                    continue
-
-    def on_search_error(self):
-        error = str(self.proc_search.readAllStandardError(), "utf-8")
-        if error.strip():
-            self.log_to_console(f"[SEARCH ERROR] {error}")
+            session.result_added.connect(self.on_search_result_added)
+            session.finished.connect(self.on_search_finished)
+        self.search_session = session
+        session.start(query, backends, limit)
+        return session
+
+    def _show_search_message(self, text, background):
+        self.search_table.setRowCount(1)
+        message_item = QTableWidgetItem(text)
+        message_item.setBackground(background)
+        message_item.setForeground(Qt.GlobalColor.white)
+        font = message_item.font()
+        font.setBold(True)
+        message_item.setFont(font)
+        self.search_table.setItem(0, 0, message_item)
+        for col in range(1, self.search_table.columnCount()):
+            self.search_table.setItem(0, col, QTableWidgetItem(""))
 
+    @profiled()
+    def on_search_result_added(self, result):
+        row = len(self.search_results) - 1
+        # The first result replaces the loading row
+        if row == 0:
+            self.search_table.setRowCount(0)
+            self.select_search_btn.setVisible(True)
+            self.log_to_console(f"[SEARCH] First result after {self.search_session.first_result_ms:.0f} ms")
+        self.search_table.insertRow(row)
+        self._set_search_row(row, result)
+        if row < PREFETCH_TOP_K:
+            self.prefetcher.enqueue(result_url(result))
+
+    def on_search_backend_finished(self, backend, count, error):
+        elapsed = self.search_session.elapsed_ms()
+        if error:
+            self.log_to_console(f"[SEARCH ERROR] {SEARCH_BACKENDS[backend][1]}: {error} "
+                                f"({count} results, {elapsed:.0f} ms)")
+        else:
+            self.log_to_console(f"[SEARCH] {SEARCH_BACKENDS[backend][1]}: {count} results in {elapsed:.0f} ms")
+
+    @profiled()
     def on_search_finished(self):
         self.fetching_search = False
         self.fetch_button.setEnabled(True)
+        # Partial results (a backend failed or timed out) aren't worth repeating
+        if self.search_results and not any(self.search_session.errors.values()):
+            self.search_cache.put(self.search_cache_key, self.search_results)
         
-        if self.search_results:
-            self.populate_search_results()
-        else:
-            self.search_table.setRowCount(1)
-            error_item = QTableWidgetItem("No search results found")
-            error_item.setBackground(Qt.GlobalColor.darkRed)
-            error_item.setForeground(Qt.GlobalColor.white)
-            font = error_item.font()
-            font.setBold(True)
-            error_item.setFont(font)
-            self.search_table.setItem(0, 0, error_item)
-            for col in range(1, 4):
-                self.search_table.setItem(0, col, QTableWidgetItem(""))
-            
+        if not self.search_results:
+            self._show_search_message("No search results found", Qt.GlobalColor.darkRed)
             self.log_to_console("[SEARCH] No search results found")
 
+    @profiled()
+    def on_search_revalidated(self):
+        session = self.search_session
+        if any(session.errors.values()) or not session.results:
+            return
+        new_results = session.results
+        self.search_cache.put(self.search_cache_key, new_results)
+        # Only rows whose content changed are rewritten, selection and scroll position stay
+        changed = 0
+        self.search_table.setRowCount(len(new_results))
+        for row, result in enumerate(new_results):
+            old = self.search_results[row] if row < len(self.search_results) else None
+            if old is None or result_signature(result) != result_signature(old):
+                self._set_search_row(row, result)
+                changed += 1
+        self.search_results = new_results
+        self.log_to_console(f"[SEARCH] Revalidated: {changed} of {len(new_results)} rows changed")
+
+    def _set_search_row(self, idx, result):
+        title = result.get('title', 'Unknown Title')
+        uploader = result.get('uploader', result.get('channel', 'Unknown'))
+        duration = self.format_duration(result.get('duration', 0))
+        view_count = self.format_view_count(result.get('view_count', 0))
+        source = SEARCH_BACKENDS.get(result.get("_backend"), ("", ""))[1]
+        
+        title_item = QTableWidgetItem(title)
+        thumbnail_url = pick_thumbnail(result)
+        if thumbnail_url:
+            pixmap = self.get_thumbnail_loader().request(thumbnail_url)
+            if pixmap is not None:
+                title_item.setIcon(QIcon(pixmap))
+            else:
+                self.thumbnail_rows.setdefault(thumbnail_url, []).append(idx)
+        self.search_table.setItem(idx, 0, title_item)
+        self.search_table.setItem(idx, 1, QTableWidgetItem(uploader))
+        self.search_table.setItem(idx, 2, QTableWidgetItem(duration))
+        self.search_table.setItem(idx, 3, QTableWidgetItem(view_count))
+        self.search_table.setItem(idx, 4, QTableWidgetItem(source))
+        if not self.search_resize_timer.isActive():
+            self.search_resize_timer.start()
+
+    def resize_search_columns(self):
+        for col in range(1, self.search_table.columnCount()):
+            self.search_table.resizeColumnToContents(col)
+
+    def get_thumbnail_loader(self):
+        # Created on first use, nothing network-related happens at startup
+        if self.thumbnail_loader is None:
+            self.thumbnail_loader = ThumbnailLoader(parent=self)
+            self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        return self.thumbnail_loader
+
+    def show_video_thumbnail(self, url):
+        self.video_thumbnail_url = url
+        if not url:
+            return
+        pixmap = self.get_thumbnail_loader().request(url)
+        if pixmap is not None:
+            self.on_thumbnail_ready(url, pixmap)
+
+    @profiled()
+    def on_thumbnail_ready(self, url, pixmap):
+        icon = None
+        for row in self.thumbnail_rows.pop(url, []):
+            item = self.search_table.item(row, 0)
+            # Revalidation may have put a different result in the row since
+            if item is not None and row < len(self.search_results) \
+                    and pick_thumbnail(self.search_results[row]) == url:
+                icon = icon or QIcon(pixmap)
+                item.setIcon(icon)
+        if url == self.video_thumbnail_url:
+            self.video_thumb_label.setPixmap(pixmap)
+            self.video_thumb_label.setVisible(True)
+
+    @profiled()
     def populate_search_results(self):
         self.search_table.setRowCount(len(self.search_results))
         
         for idx, result in enumerate(self.search_results):
-            title = result.get('title', 'Unknown Title')
-            uploader = result.get('uploader', result.get('channel', 'Unknown'))
-            duration = self.format_duration(result.get('duration', 0))
-            view_count = self.format_view_count(result.get('view_count', 0))
-            
-            self.search_table.setItem(idx, 0, QTableWidgetItem(title))
-            self.search_table.setItem(idx, 1, QTableWidgetItem(uploader))
-            self.search_table.setItem(idx, 2, QTableWidgetItem(duration))
-            self.search_table.setItem(idx, 3, QTableWidgetItem(view_count))
+            self._set_search_row(idx, result)
         
         self.search_table.setVisible(True)
         self.select_search_btn.setVisible(True)
@@ -647,7 +997,7 @@ class VideoDownloader(QWidget):
         
         if 0 <= row < len(self.search_results):
             selected_result = self.search_results[row]
-            video_url = selected_result.get('webpage_url') or selected_result.get('url')
+            video_url = result_url(selected_result)
             
             if video_url:
                 self.input_mode.setCurrentText("URL")
@@ -656,12 +1006,60 @@ class VideoDownloader(QWidget):
                 self.search_table.setVisible(False)
                 self.select_search_btn.setVisible(False)
                 
-                self.format_table.setRowCount(0)
+                self.format_model.clear()
                 
-                self.fetch_formats()
+                info = self.prefetcher.get(video_url)
+                if info is not None:
+                    self.show_prefetched_info(video_url, info)
+                elif self.prefetcher.is_pending(video_url):
+                    self.wait_for_prefetch(video_url)
+                else:
+                    self.fetch_formats()
             else:
                 QMessageBox.warning(self, "Error", "Could not get URL for selected video.")
 
+    def _begin_info_display(self):
+        """Reset the format view for a new video; a fetch still running for the old one is dropped"""
+        if self.proc_info is not None:
+            self.proc_info.kill()
+            self.proc_info = None
+        self.awaiting_prefetch = None
+        self.console_output.clear()
+        self.format_json = []
+        self.video_info = {}
+        self.best_choice = None
+        self.best_choice_label.setText("")
+        self.video_title_label.setText("")
+        self.video_thumb_label.clear()
+        self.video_thumb_label.setVisible(False)
+        self.video_thumbnail_url = None
+        self.format_table.setVisible(True)
+
+    def show_prefetched_info(self, url, info):
+        self._begin_info_display()
+        self.log_to_console(f"[INFO] Using prefetched formats for {url}")
+        self.on_info_parsed(dict(info))
+        self.btn_add_selected.setEnabled(True)
+        self.btn_add_best.setEnabled(True)
+
+    def wait_for_prefetch(self, url):
+        self._begin_info_display()
+        self.awaiting_prefetch = url
+        self.fetching_info = True
+        self.format_model.set_message("Fetching formats...", Qt.GlobalColor.darkBlue)
+        self.btn_add_selected.setEnabled(False)
+        self.btn_add_best.setEnabled(False)
+        self.log_to_console(f"[INFO] Waiting for the background fetch of {url}")
+
+    def on_prefetched(self, url, success):
+        if url != self.awaiting_prefetch:
+            return
+        if success:
+            self.show_prefetched_info(url, self.prefetcher.get(url))
+        else:
+            self.awaiting_prefetch = None
+            self.fetch_formats()
+
     def format_duration(self, seconds):
         if not seconds:
             return "Unknown"
@@ -689,26 +1087,93 @@ class VideoDownloader(QWidget):
         if self.format_json:
             self.populate_table()
 
+    def toggle_lean_fetch(self, state):
+        self.lean_fetch = state == Qt.CheckState.Checked.value
+
+    def toggle_segmented(self, state):
+        self.download_runner.segmented = state == Qt.CheckState.Checked.value
+
+    def toggle_verify(self, state):
+        self.download_runner.verify = state == Qt.CheckState.Checked.value
+
+    def update_launch_profile(self, name):
+        self.download_runner.launch_profile = name
+        self.log_to_console(f"[LAUNCH] New processes run as "
+                            f"{self.download_runner.launch_profiles[name].describe()}")
+
+    def update_audio_format(self, *args):
+        self.audio_format = self.audio_format_combo.currentText() if self.audio_format_combo.currentIndex() else None
+        self.loudnorm_checkbox.setEnabled(self.audio_format is not None)
+        self.loudnorm = self.audio_format is not None and self.loudnorm_checkbox.isChecked()
+
+    def add_subscription(self):
+        url = self.subscription_url_input.text().strip()
+        if not url:
+            return
+        rule = self.subscription_format_combo.currentText().strip()
+        subscription = Subscription(url, every=self.subscription_every_spin.value(),
+                                    format=None if rule in ("", "best") else rule)
+        self.subscription_manager.add(subscription)
+        self.subscription_url_input.clear()
+        self.log_to_console(f"[SUBSCRIPTIONS] Subscribed to {url}")
+        self.update_subscriptions_display()
+
+    def remove_subscription(self):
+        rows = sorted({index.row() for index in self.subscriptions_table.selectedIndexes()})
+        urls = [self.subscription_manager.subscriptions[row].url for row in rows
+                if row < len(self.subscription_manager.subscriptions)]
+        for url in urls:
+            self.subscription_manager.remove(url)
+            self.log_to_console(f"[SUBSCRIPTIONS] Unsubscribed from {url}")
+        self.update_subscriptions_display()
+
+    def update_subscriptions_display(self):
+        if self.subscriptions_table is None:
+            return
+        manager = self.subscription_manager
+        self.subscriptions_table.setRowCount(len(manager.subscriptions))
+        for idx, subscription in enumerate(manager.subscriptions):
+            state = manager.state.get(subscription.url, {})
+            checked = "Polling..." if subscription.url in manager.polls else \
+                (state.get("last_checked", "Never").replace("T", " ") + (" (error)" if state.get("error") else ""))
+            values = [
+                subscription.name,
+                subscription.url,
+                subscription.format or "best",
+                f"{subscription.every} min",
+                checked,
+                str(state.get("last_new", "")),
+            ]
+            for col, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                if col == 4 and state.get("error"):
+                    cell.setToolTip(state["error"])
+                self.subscriptions_table.setItem(idx, col, cell)
+
     def update_concurrent_downloads(self, value):
         self.download_manager.max_concurrent = value
         self.download_manager.process_queue()
 
+    def update_max_retries(self, value):
+        self.download_manager.max_retries = value
+
+    def toggle_profiling(self, state):
+        self.profiler.set_enabled(state == Qt.CheckState.Checked.value)
+        self.log_to_console(f"[PROFILE] Profiling {'enabled' if self.profiler.enabled else 'disabled'}")
+
+    def toggle_cprofile(self, state):
+        enabled = state == Qt.CheckState.Checked.value
+        self.profiler.set_cprofile(enabled)
+        self.log_to_console(f"[PROFILE] cProfile capture {'started' if enabled else 'stopped'}")
+
     def toggle_console(self, state):
         is_visible = state == Qt.CheckState.Checked.value
         self.console_frame.setVisible(is_visible)
 
     def _show_format_error(self, error_message):
         """Helper method to display error in the format table"""
-        self.format_table.setRowCount(1)
-        error_item = QTableWidgetItem(error_message)
-        error_item.setBackground(Qt.GlobalColor.red)
-        error_item.setForeground(Qt.GlobalColor.white)
-        font = error_item.font()
-        font.setBold(True)
-        error_item.setFont(font)
-        self.format_table.setItem(0, 0, error_item)
-        for col in range(1, 10):
-            self.format_table.setItem(0, col, QTableWidgetItem(""))
+        self.format_model.set_message(error_message, Qt.GlobalColor.red)
+        self.format_table.setVisible(True)
 
     def fetch_formats(self):
         input_text = self.url_input.text().strip()
@@ -722,30 +1187,14 @@ class VideoDownloader(QWidget):
             return
         
         url = input_text
-        self.console_output.clear()
-        
-        self.format_json = []
-        self.video_info = {}
-        
-        self.format_table.setRowCount(1)
-        self.format_table.setColumnCount(10)
+        self._begin_info_display()
         
-        loading_item = QTableWidgetItem("Fetching formats...")
-        loading_item.setBackground(Qt.GlobalColor.darkBlue)
-        loading_item.setForeground(Qt.GlobalColor.white)
-        font = loading_item.font()
-        font.setBold(True)
-        loading_item.setFont(font)
-        
-        self.format_table.setItem(0, 0, loading_item)
-        for col in range(1, 10):
-            self.format_table.setItem(0, col, QTableWidgetItem(""))
+        self.format_model.set_message("Fetching formats...", Qt.GlobalColor.darkBlue)
         
         self.btn_add_selected.setEnabled(False)
         self.btn_add_best.setEnabled(False)
 
         self.fetching_info = True
-        self.info_buffer = ""
         
         if not os.path.exists(self.yt_dlp_path):
             self.log_to_console(f"[ERROR] yt-dlp not found at: {self.yt_dlp_path}")
@@ -754,65 +1203,79 @@ class VideoDownloader(QWidget):
             self.btn_add_best.setEnabled(True)
             return
         
-        args = ["-J", "--no-warnings", url]
+        self._start_info_fetch(url, self.lean_fetch)
+
+    def _start_info_fetch(self, url, lean):
+        self.info_errors = ""
+        self.info_received = False
+        self.info_lean = lean
+        self.info_objects = []
+        self.info_url = url
+        args = info_fetch_args(url, lean)
         self.log_to_console(f"[INFO] Starting yt-dlp with command: {self.yt_dlp_path} {' '.join(args)}")
         
-        self.proc_info.start(self.yt_dlp_path, args)
-
-    def on_info_output(self):
-        chunk = str(self.proc_info.readAllStandardOutput(), "utf-8")
-        if chunk:
-            self.info_buffer += chunk
-            self.log_to_console(f"[INFO] {chunk}")
-
-        if not self.fetching_info:
-            return
+        if self.proc_info is not None:
+            self.proc_info.kill()
+        self.info_started = time.perf_counter()
+        self.proc_info = process_hub().start(self.yt_dlp_path, args, "jsonlines" if lean else "json",
+                                             self.on_info_records)
 
-        buf = self.info_buffer.strip()
-        if not buf:
+    @profiled()
+    def on_info_records(self, handle, records):
+        # Records of a fetch that was replaced by a newer one are dropped
+        if handle is not self.proc_info:
             return
-
-        if buf.startswith("{"):
-            brace_count = 0
-            last_complete_pos = -1
-            
-            for i, char in enumerate(buf):
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        last_complete_pos = i
-                        break
-            
-            if last_complete_pos != -1:
-                json_str = buf[:last_complete_pos + 1]
-                try:
-                    info = json.loads(json_str)
-                    self.fetching_info = False
-                    self.info_buffer = ""
-                    if info is not None:
-                        self.video_info = info
-                        self.format_json = info.get("formats", [])
-                        if self.format_json:
-                            self.populate_table()
-                            self.log_to_console(f"[INFO] Successfully parsed {len(self.format_json)} formats")
-                        else:
-                            self.log_to_console("[WARNING] No formats found in video info")
-                            self._show_format_error("No formats available for this video")
-                        
-                        self.btn_add_selected.setEnabled(True)
-                        self.btn_add_best.setEnabled(True)
+        for record in records:
+            kind = record[0]
+            if kind == "stdout":
+                # Lean output is the JSON itself, only -J's byte count is worth logging
+                if not self.info_lean:
+                    self.log_to_console(f"[INFO] {record[1]}")
+            elif kind == "stderr":
+                self.info_errors += record[1]
+                self.log_to_console(f"[ERROR] {record[1]}")
+            elif kind == "json":
+                if self.info_lean:
+                    self.info_objects.append(record[1])
+                else:
+                    self.info_received = True
+                    self.on_info_parsed(trim_info(record[1] or {}))
+            elif kind == "json_error":
+                self.info_received = True
+                self.log_to_console(f"[ERROR] Failed to parse JSON: {record[1]}")
+                self._show_format_error("Failed to parse format data")
+            elif kind == "finished":
+                elapsed = (time.perf_counter() - self.info_started) * 1000
+                self.last_info_fetch = {"lean": self.info_lean, "payload_bytes": record[2],
+                                        "fetch_ms": round(elapsed, 1)}
+                self.log_to_console(f"[INFO] {'Lean' if self.info_lean else 'Full'} fetch: "
+                                    f"{format_bytes(record[2])} in {elapsed:.0f} ms")
+                if self.info_lean and record[1] == 0:
+                    info = lean_info(self.info_objects)
+                    self.info_objects = []
+                    if info is None:
+                        # e.g. a yt-dlp too old for field selection in output templates
+                        self.log_to_console("[WARNING] Lean fetch returned no usable data, retrying with -J")
+                        self._start_info_fetch(self.info_url, False)
                         return
-                except json.JSONDecodeError as e:
-                    self.log_to_console(f"[DEBUG] JSON parse failed, waiting for more data: {e}")
-                    return
+                    self.info_received = True
+                    self.on_info_parsed(info)
+                self.on_info_finished(record[1])
 
-    def on_info_error(self):
-        error = str(self.proc_info.readAllStandardError(), "utf-8")
-        if error.strip():
-            self.log_to_console(f"[ERROR] {error}")
+    def on_info_parsed(self, info):
+        self.fetching_info = False
+        self.video_info = info or {}
+        self.format_json = self.video_info.get("formats", [])
+        self.video_title_label.setText(self.video_info.get("title", ""))
+        self.show_video_thumbnail(pick_thumbnail(self.video_info))
+        if self.format_json:
+            self.populate_table()
+            self.log_to_console(f"[INFO] Successfully parsed {len(self.format_json)} formats")
+        else:
+            self.log_to_console("[WARNING] No formats found in video info")
+            self._show_format_error("No formats available for this video")
 
+    @profiled()
     def on_info_finished(self, exit_code):
         self.fetching_info = False
         
@@ -821,71 +1284,24 @@ class VideoDownloader(QWidget):
         
         self.log_to_console(f"[INFO] Process finished with exit code: {exit_code}")
         
-        if self.format_json:
-            self.log_to_console(f"[INFO] Formats already processed successfully")
-            self.info_buffer = ""
+        if self.info_received:
             return
         
-        buf = self.info_buffer.strip()
-        
         if exit_code != 0:
             error_msg = "Failed to fetch formats"
-            if "ERROR:" in buf:
-                lines = buf.split('\n')
-                for line in lines:
-                    if "ERROR:" in line:
-                        error_msg = line.strip()
-                        break
-            elif "WARNING:" in buf and "Video unavailable" in buf:
+            error_lines = [line.strip() for line in self.info_errors.splitlines() if "ERROR:" in line]
+            if error_lines:
+                error_msg = error_lines[0]
+            elif "Video unavailable" in self.info_errors:
                 error_msg = "Video unavailable or private"
-            elif not buf:
+            elif not self.info_errors.strip():
                 error_msg = "No output received from yt-dlp"
             
             self.log_to_console(f"[ERROR] {error_msg}")
             self._show_format_error(error_msg)
-            self.info_buffer = ""
-            return
-        
-        if not buf:
+        else:
             self.log_to_console("[ERROR] Process finished successfully but no data received")
             self._show_format_error("No format data received")
-            return
-
-        try:
-            lines = buf.split('\n')
-            json_line = None
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    json_line = line
-                    break
-            
-            if json_line:
-                info = json.loads(json_line)
-                self.video_info = info
-                self.format_json = info.get("formats", [])
-                if self.format_json:
-                    self.populate_table()
-                    self.log_to_console(f"[INFO] Successfully parsed {len(self.format_json)} formats")
-                else:
-                    self.log_to_console("[WARNING] No formats found in video info")
-                    self._show_format_error("No formats available for this video")
-            else:
-                info = json.loads(buf)
-                self.video_info = info
-                self.format_json = info.get("formats", [])
-                if self.format_json:
-                    self.populate_table()
-                else:
-                    self._show_format_error("No formats available for this video")
-                    
-        except json.JSONDecodeError as e:
-            self.log_to_console(f"[ERROR] Failed to parse JSON: {e}")
-            self.log_to_console(f"[DEBUG] Buffer content: {buf[:500]}...")
-            self._show_format_error("Failed to parse format data")
-        
-        self.info_buffer = ""
 
     def add_selected_to_queue(self):
         if not self.format_json:
@@ -897,9 +1313,7 @@ class VideoDownloader(QWidget):
             QMessageBox.warning(self, "No Selection", "Please select a format from the table.")
             return
         
-        row = rows[0].row()
-        itag = self.format_table.item(row, 0).text()
-        fmt = next((f for f in self.format_json if str(f.get("format_id", "")) == itag), None)
+        fmt = self.format_model.format_at(self.format_proxy.mapToSource(rows[0]).row())
         
         if not fmt:
             QMessageBox.warning(self, "Format Error", "Selected format not found.")
@@ -922,17 +1336,35 @@ class VideoDownloader(QWidget):
             format_id = str(fmt.get("format_id", ""))
             is_audio_only = fmt.get("vcodec") == "none" or fmt.get("vcodec") is None
             original_ext = fmt.get("ext", "mkv")
+            if fmt.get("acodec") == "none" or fmt.get("acodec") is None:
+                format_selector = f"{format_id}+bestaudio"
+            else:
+                format_selector = format_id
             
             if is_audio_only:
-                default_name = f"{title}.{original_ext}"
-                file_filter = f"Audio File (*.{original_ext})"
+                audio_ext = self.audio_format or original_ext
+                default_name = f"{title}.{audio_ext}"
+                file_filter = f"Audio File (*.{audio_ext})"
             else:
                 default_name = f"{title}.mkv"
                 file_filter = "Matroska Video (*.mkv)"
         else:
-            format_id = "best"
-            default_name = f"{title}.mkv"
-            file_filter = "Matroska Video (*.mkv)"
+            choice = self.best_choice
+            if choice is not None and choice.format_id:
+                format_id = choice.format_id
+                format_selector = choice.selector
+                self.log_to_console(f"[FORMAT] {self.profile_combo.currentText()}: {choice.describe()}")
+            else:
+                format_id = "best"
+                format_selector = "bestvideo+bestaudio/best"
+            is_audio_only = choice is not None and choice.video is None and choice.audio is not None
+            if is_audio_only:
+                audio_ext = self.audio_format or choice.audio.get("ext", "m4a")
+                default_name = f"{title}.{audio_ext}"
+                file_filter = f"Audio File (*.{audio_ext})"
+            else:
+                default_name = f"{title}.mkv"
+                file_filter = "Matroska Video (*.mkv)"
         
         default_name = re.sub(r'[<>:"/\\|?*]', '_', default_name)
         
@@ -951,230 +1383,375 @@ class VideoDownloader(QWidget):
             format_id=format_id,
             format_type=format_type,
             output_path=save_path,
-            title=title
+            title=title,
+            format_selector=format_selector
         )
+        download_item.max_retries = self.download_manager.max_retries
+        if is_audio_only:
+            download_item.audio_format = self.audio_format
+            download_item.loudnorm = self.loudnorm
+        # Known up front for the schedule projection; yt-dlp's progress replaces it
+        if format_type == "selected" and fmt:
+            download_item.file_size = format_size_bytes(fmt)
+        elif self.best_choice is not None:
+            download_item.file_size = self.best_choice.expected_bytes
         
         self.download_manager.add_to_queue(download_item)
         self.log_to_console(f"[QUEUE] Added to queue: {title}")
         
         self.tabs.setCurrentIndex(1)
 
-    def on_download_started(self, item_id):
-        item = self.download_manager.active_downloads.get(item_id)
-        if item:
-            self.log_to_console(f"[DOWNLOAD] Started: {item.title}")
-            self._create_download_process(item)
-
-    def _create_download_process(self, item):
-        process = QProcess()
-        item.process = process
-        
-        process.readyReadStandardOutput.connect(lambda: self._on_process_output(item.id))
-        process.readyReadStandardError.connect(lambda: self._on_process_error(item.id))
-        process.finished.connect(lambda: self._on_process_finished(item.id))
-        
-        if item.format_type == "selected":
-            fmt = None
-            if hasattr(self, 'format_json'):
-                fmt = next((f for f in self.format_json if str(f.get("format_id", "")) == item.format_id), None)
-            
-            if fmt and (fmt.get("acodec") == "none" or fmt.get("acodec") is None):
-                format_selector = f"{item.format_id}+bestaudio"
-            else:
-                format_selector = item.format_id
-        else:
-            format_selector = "bestvideo+bestaudio/best"
-        
-        args = [
-            "-f", format_selector,
-            item.url,
-            "--newline",
-            "-o", item.output_path,
-            "--force-overwrites",
-            "--no-warnings",
-            "--embed-metadata",
-            "--ignore-errors",
-            "--ffmpeg-location", self.ffmpeg_path
-        ]
-        
-        if not item.output_path.lower().endswith(('.mp3', '.m4a', '.wav', '.flac')):
-            args.extend(["--merge-output-format", "mkv"])
-        
-        self.log_to_console(f"[DOWNLOAD] Command: {self.yt_dlp_path} {' '.join(args)}")
-        process.start(self.yt_dlp_path, args)
-
-    def _on_process_output(self, item_id):
-        item = self.download_manager.active_downloads.get(item_id)
-        if not item or not item.process:
+    def add_audio_batch(self):
+        text, ok = QInputDialog.getMultiLineText(self, "Batch Audio", "URLs to download as audio, one per line:")
+        urls = [line.strip() for line in text.splitlines() if line.strip()] if ok else []
+        if not urls:
             return
-        
-        output = str(item.process.readAllStandardOutput(), "utf-8")
-        if output.strip():
-            self.log_to_console(f"[{item_id}] {output}")
-        
-        lines = output.splitlines()
-        for line in lines:
-            m = re.search(r"\[download\]\s+(\d{1,3}(?:\.\d+)?)%", line)
-            if m:
-                progress = int(float(m.group(1)))
-                self.download_manager.update_progress(item_id, progress)
-            
-            speed_match = re.search(r"\[download\]\s+\d+\.\d+%\s+of\s+[^\s]+\s+at\s+([^\s]+)", line)
-            if speed_match:
-                item.download_speed = speed_match.group(1)
-            
-            size_match = re.search(r"\[download\]\s+\d+\.\d+%\s+of\s+([^\s]+)", line)
-            if size_match:
-                item.file_size = size_match.group(1)
-            
-            if "Merging formats into" in line or "[Merger]" in line:
-                self.download_manager.update_progress(item_id, item.progress, "Merging...")
-            elif "Deleting original file" in line:
-                self.download_manager.update_progress(item_id, item.progress, "Cleaning up...")
-            elif "[ffmpeg]" in line and ("Converting" in line or "Merging" in line):
-                self.download_manager.update_progress(item_id, item.progress, "Processing...")
-
-    def _on_process_error(self, item_id):
-        item = self.download_manager.active_downloads.get(item_id)
-        if not item or not item.process:
+        folder = QFileDialog.getExistingDirectory(self, "Save Audio To", str(Path.home()))
+        if not folder:
             return
-        
-        error = str(item.process.readAllStandardError(), "utf-8")
-        if error.strip():
-            self.log_to_console(f"[{item_id} ERROR] {error}")
+        # The network side runs at the queue's concurrency, conversions in the converter's own pool
+        entry = {"format": "bestaudio/best", "format_type": "audio", "audio_format": self.audio_format,
+                 "loudnorm": self.loudnorm, "output_path": os.path.join(folder, "%(title)s.%(ext)s")}
+        for url in urls:
+            item = item_from_entry(dict(entry, url=url), entry["output_path"])
+            item.max_retries = self.download_manager.max_retries
+            self.download_manager.add_to_queue(item)
+        conversion = f", converting to {self.audio_format}{' with loudnorm' if self.loudnorm else ''} on " \
+                     f"{self.download_runner.converter.workers} process(es)" if self.audio_format else ""
+        self.log_to_console(f"[QUEUE] Added {len(urls)} audio download(s){conversion}")
+        self.tabs.setCurrentIndex(1)
 
-    def _on_process_finished(self, item_id):
-        item = self.download_manager.active_downloads.get(item_id)
-        if not item or not item.process:
-            return
-        
-        exit_code = item.process.exitCode()
-        success = exit_code == 0
-        
-        self.log_to_console(f"[{item_id}] Finished with exit code: {exit_code}")
-        self.download_manager.finish_download(item_id, success)
+    def on_download_retrying(self, item_id, attempt, delay):
+        item = self.download_manager.retry_pending.get(item_id)
+        if item:
+            self.log_to_console(f"[RETRY] {item.title}: attempt {attempt}/{item.max_retries} in {delay}s")
 
+    @profiled()
     def on_download_progress_update(self, item_id, progress, status):
         pass
 
+    @profiled()
     def on_download_completed(self, item_id, success):
         item = self.download_manager.active_downloads.get(item_id) or \
                next((i for i in self.download_manager.get_active_items() if i.id == item_id), None)
         
-        if item:
-            self.log_to_console(f"[DOWNLOAD] {'Completed' if success else 'Failed'}: {item.title}")
-            
+        # A bulk operation logs, writes history and redraws once, in on_batch_committed
+        if item and not self.download_manager.in_batch():
+            self.log_to_console(f"[DOWNLOAD] {item.status}: {item.title}")
             self.download_history.add_item(item)
+            if self.history_table is not None:
+                self.populate_history_table()
+                self.update_history_status()
+
+    @profiled()
+    def on_batch_committed(self, items):
+        if len(items) == 1:
+            self.log_to_console(f"[DOWNLOAD] {items[0].status}: {items[0].title}")
+        else:
+            self.log_to_console(f"[DOWNLOAD] {batch_summary(items)}")
+        self.download_history.add_items(items)
+        if self.history_table is not None:
             self.populate_history_table()
             self.update_history_status()
+        self.update_queue_display()
+
+    def _set_queue_autosize(self, enabled):
+        # As with the history table, ResizeToContents would re-measure a column
+        # on every cell that changes, e.g. all of them after Pause All
+        header = self.queue_table.horizontalHeader()
+        mode = QHeaderView.ResizeMode.ResizeToContents if enabled else QHeaderView.ResizeMode.Interactive
+        for col in (1, 2, 4, 5, 6):
+            header.setSectionResizeMode(col, mode)
+
+    def _set_queue_text(self, row, col, text, background=None):
+        # Cells are reused between refreshes; a new QTableWidgetItem per cell
+        # per second is most of the cost of a long queue. Every change to a
+        # cell repaints it, so a new cell is styled before it goes in and an
+        # unchanged one isn't touched
+        background = QBrush(background) if background is not None else QBrush()
+        cell = self.queue_table.item(row, col)
+        if cell is None:
+            cell = QTableWidgetItem(text)
+            cell.setBackground(background)
+            self.queue_table.setItem(row, col, cell)
+            return
+        if cell.text() != text:
+            cell.setText(text)
+        if cell.background() != background:
+            cell.setBackground(background)
 
+    @profiled()
     def update_queue_display(self):
-        all_items = self.download_manager.get_queue_items() + self.download_manager.get_active_items()
+        if self.queue_table is None:
+            return
+        manager = self.download_manager
+        queued, active = manager.get_queue_items(), manager.get_active_items()
+        retrying, paused = manager.get_retrying_items(), manager.get_paused_items()
+        all_items = queued + active + retrying + paused
         
+        self._set_queue_autosize(False)
         self.queue_table.setRowCount(len(all_items))
         
         for idx, item in enumerate(all_items):
-            self.queue_table.setItem(idx, 0, QTableWidgetItem(item.title[:50] + "..." if len(item.title) > 50 else item.title))
+            self._set_queue_text(idx, 0, item.title[:50] + "..." if len(item.title) > 50 else item.title)
             
             format_text = item.format_type.title()
             if item.format_id != "best":
                 format_text += f" ({item.format_id})"
-            self.queue_table.setItem(idx, 1, QTableWidgetItem(format_text))
+            self._set_queue_text(idx, 1, format_text)
             
-            status_item = QTableWidgetItem(item.status)
+            status_color = None
             if item.status == "Completed":
-                status_item.setBackground(Qt.GlobalColor.green)
+                status_color = Qt.GlobalColor.green
             elif item.status == "Failed":
-                status_item.setBackground(Qt.GlobalColor.red)
-            elif item.status == "Downloading":
-                status_item.setBackground(Qt.GlobalColor.blue)
-            self.queue_table.setItem(idx, 2, status_item)
+                status_color = Qt.GlobalColor.red
+            elif item.status.startswith("Downloading"):
+                status_color = Qt.GlobalColor.blue
+            elif item.status.startswith("Retrying"):
+                status_color = Qt.GlobalColor.darkYellow
+            elif item.status.startswith("Paused"):
+                status_color = Qt.GlobalColor.gray
+            self._set_queue_text(idx, 2, item.status, status_color)
             
-            progress_bar = QProgressBar()
-            progress_bar.setValue(item.progress)
-            progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.queue_table.setCellWidget(idx, 3, progress_bar)
+            # setValue repaints right away once the bar is in the table
+            progress_bar = self.queue_table.cellWidget(idx, 3)
+            if not isinstance(progress_bar, QProgressBar):
+                progress_bar = QProgressBar()
+                progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                progress_bar.setValue(item.progress)
+                self.queue_table.setCellWidget(idx, 3, progress_bar)
+            elif progress_bar.value() != item.progress:
+                progress_bar.setValue(item.progress)
             
-            self.queue_table.setItem(idx, 4, QTableWidgetItem(getattr(item, 'download_speed', '')))
-            self.queue_table.setItem(idx, 5, QTableWidgetItem(getattr(item, 'file_size', '')))
+            self._set_queue_text(idx, 4, item.speed_text)
+            self._set_queue_text(idx, 5, item.size_text)
+            self._set_queue_text(idx, 6, item.added_time.strftime("%H:%M:%S"))
             
-            added_time = item.added_time.strftime("%H:%M:%S")
-            self.queue_table.setItem(idx, 6, QTableWidgetItem(added_time))
-            
-            if item.status in ["Queued", "Downloading"]:
+            cancel_btn = self.queue_table.cellWidget(idx, 7)
+            if not isinstance(cancel_btn, QPushButton):
                 cancel_btn = QPushButton("Cancel")
-                cancel_btn.clicked.connect(lambda checked, i=item.id: self.cancel_download(i))
+                cancel_btn.clicked.connect(self.on_queue_cancel_clicked)
                 self.queue_table.setCellWidget(idx, 7, cancel_btn)
-            else:
-                self.queue_table.setItem(idx, 7, QTableWidgetItem(""))
-        
-        queued_count = len(self.download_manager.get_queue_items())
-        active_count = len(self.download_manager.get_active_items())
-        self.queue_status_label.setText(f"Queue Status: {queued_count} queued, {active_count} downloading")
+            cancel_btn.setProperty("item_id", item.id)
+        self._set_queue_autosize(True)
+        
+        self.queue_status_label.setText(
+            f"Queue Status: {len(queued)} queued, {len(active)} downloading, {len(retrying)} waiting to retry"
+            + (f", {len(paused)} paused" if paused else ""))
+        self.pause_all_btn.setText("Resume All" if self._all_paused() else "Pause All")
+
+        metrics = self.download_manager.metrics
+        self.throughput_graph.set_samples(metrics.throughput_history)
+        current = metrics.throughput_history[-1][1] if metrics.throughput_history else 0
+        summary = [format_bytes(current, "/s"), f"{metrics.jobs_per_hour()} jobs/h"]
+        average_wait = metrics.queue_wait.mean()
+        if average_wait is not None:
+            summary.append(f"avg wait {average_wait:.1f}s")
+        self.queue_metrics_label.setText("\n".join(summary))
+        if self.coordinator.is_listening():
+            self.update_workers_display()
+        # Projections don't change much from second to second
+        if self.schedule_table.isVisible() and time.monotonic() - self.schedule_view_updated >= SCHEDULE_VIEW_INTERVAL:
+            self.update_schedule_display()
+
+    def toggle_schedule_view(self, visible):
+        self.schedule_label.setVisible(visible)
+        self.schedule_table.setVisible(visible)
+        if visible:
+            self.update_schedule_display()
+
+    @profiled()
+    def update_schedule_display(self):
+        self.schedule_view_updated = time.monotonic()
+        manager = self.download_manager
+        now = datetime.now()
+        slots, rate_limit, window = manager.limits(now)
+        if not manager.schedule.windows:
+            text = f"No schedule ({SCHEDULE_FILE}), {slots} at once"
+        elif window is None:
+            text = "Outside all windows, nothing runs"
+        else:
+            text = f"Window {window.describe()}"
+        next_change = manager.schedule.next_change(now)
+        if next_change:
+            text += f", next change at {next_change:%H:%M}"
+        self.schedule_label.setText(text)
+
+        rows = manager.projection(now)[:SCHEDULE_VIEW_ROWS]
+        self.schedule_table.setRowCount(len(rows))
+        for idx, (item, start, finish) in enumerate(rows):
+            values = [
+                item.title,
+                item.status,
+                item.size_text,
+                self._format_projected(start, now),
+                self._format_projected(finish, now),
+            ]
+            for col, value in enumerate(values):
+                self.schedule_table.setItem(idx, col, QTableWidgetItem(value))
+        for col in range(1, self.schedule_table.columnCount()):
+            self.schedule_table.resizeColumnToContents(col)
+
+    @staticmethod
+    def _format_projected(moment, now):
+        if moment is None:
+            return "?"
+        if moment.date() == now.date():
+            return f"{moment:%H:%M}"
+        return f"{moment:%a %H:%M}"
+
+    def update_workers_display(self):
+        workers = self.coordinator.worker_stats()
+        self.workers_table.setRowCount(len(workers))
+        for idx, worker in enumerate(workers):
+            values = [
+                worker["name"],
+                worker["address"],
+                f"{worker['running']}/{worker['capacity']}",
+                str(worker["backlog"]),
+                format_bytes(worker["speed_bps"], "/s"),
+                format_bytes(worker["average_bps"], "/s"),
+                f"{worker['completed']} / {worker['failed']}",
+            ]
+            for col, value in enumerate(values):
+                self.workers_table.setItem(idx, col, QTableWidgetItem(value))
 
     def cancel_download(self, item_id):
         self.download_manager.cancel_download(item_id)
         self.log_to_console(f"[QUEUE] Cancelled download: {item_id}")
 
+    def on_queue_cancel_clicked(self):
+        item_id = self.sender().property("item_id")
+        if item_id:
+            self.cancel_download(item_id)
+
+    def _all_paused(self):
+        manager = self.download_manager
+        return bool(manager.paused) and not manager.queue and not manager.local_downloads()
+
     def pause_all_downloads(self):
-        for item_id in list(self.download_manager.active_downloads.keys()):
-            self.download_manager.cancel_download(item_id)
-        self.log_to_console("[QUEUE] Paused all downloads")
+        manager = self.download_manager
+        if self._all_paused():
+            resumed = manager.resume_all()
+            self.log_to_console(f"[QUEUE] Resumed {len(resumed)} download(s)")
+        else:
+            paused = manager.pause_all()
+            self.log_to_console(f"[QUEUE] Paused {len(paused)} download(s)")
+        self.update_queue_display()
 
     def cancel_all_downloads(self):
-        for item_id in list(self.download_manager.active_downloads.keys()):
-            self.download_manager.cancel_download(item_id)
-        
-        self.download_manager.queue.clear()
-        self.log_to_console("[QUEUE] Cancelled all downloads and cleared queue")
+        cancelled = self.download_manager.cancel_all()
+        self.log_to_console(f"[QUEUE] Cancelled {len(cancelled)} download(s) and cleared queue")
+        self.update_queue_display()
 
     def clear_completed_downloads(self):
         self.log_to_console("[QUEUE] Cleared completed downloads from view")
 
     def populate_history_table(self):
+        if self.history_table is None:
+            return
+        # Rows are filled a chunk per event loop pass so a large history never blocks a frame
+        self.history_fill_generation += 1
+        self._set_history_autosize(False)
         self.history_table.setRowCount(len(self.download_history.history))
+        self._fill_history_rows(self.history_fill_generation, 0)
+
+    def _set_history_autosize(self, enabled):
+        # ResizeToContents re-measures the column on every setItem of a visible
+        # table, so it is switched off while rows are being filled
+        header = self.history_table.horizontalHeader()
+        mode = QHeaderView.ResizeMode.ResizeToContents if enabled else QHeaderView.ResizeMode.Interactive
+        for col in range(1, 7):
+            header.setSectionResizeMode(col, mode)
+
+    @profiled()
+    def _fill_history_rows(self, generation, start):
+        if generation != self.history_fill_generation:
+            return
+        history = self.download_history.history
+        end = min(start + HISTORY_FILL_CHUNK, len(history))
+        for idx in range(start, end):
+            self._set_history_row(idx, history[idx])
+        if end < len(history):
+            QTimer.singleShot(0, lambda: self._fill_history_rows(generation, end))
+        else:
+            self._set_history_autosize(True)
+
+    def _set_history_row(self, idx, entry):
+        self.history_table.setItem(idx, 0, QTableWidgetItem(entry.get("title", "Unknown")))
+        
+        format_text = entry.get("format_type", "").title()
+        if entry.get("format_id") and entry.get("format_id") != "best":
+            format_text += f" ({entry.get('format_id')})"
+        self.history_table.setItem(idx, 1, QTableWidgetItem(format_text))
+        
+        status = entry.get("status", "Unknown")
+        status_text = status
+        if entry.get("retry_count"):
+            status_text += f" ({entry['retry_count']} retries)"
+        status_item = QTableWidgetItem(status_text)
+        verification = entry.get("verification") or {}
+        if entry.get("error"):
+            status_item.setToolTip(f"{entry.get('failure_class') or 'unknown'}: {entry['error']}")
+        elif verification.get("ok"):
+            status_item.setToolTip(f"Verified: {verification.get('size')} bytes, SHA-256 {verification.get('sha256')}, "
+                                   f"ffprobe {verification.get('probe')}")
+        conversion = entry.get("conversion") or {}
+        if conversion.get("ok"):
+            tooltip = status_item.toolTip()
+            status_item.setToolTip((tooltip + "\n" if tooltip else "") +
+                                   f"Converted to {conversion.get('format')}"
+                                   f"{' with loudnorm' if conversion.get('loudnorm') else ''} in "
+                                   f"{conversion.get('seconds')} s ({conversion.get('realtime')}x realtime)")
+        if status == "Completed":
+            status_item.setBackground(Qt.GlobalColor.darkGreen)
+        elif status == "Failed":
+            status_item.setBackground(Qt.GlobalColor.darkRed)
+        elif status == "Cancelled":
+            status_item.setBackground(Qt.GlobalColor.darkGray)
+        self.history_table.setItem(idx, 2, status_item)
+        
+        # Older history files stored the size as yt-dlp's display string
+        file_size = entry.get("file_size")
+        size_text = format_bytes(file_size) if isinstance(file_size, (int, float)) else (file_size or "")
+        self.history_table.setItem(idx, 3, QTableWidgetItem(size_text))
+        
+        added_time = entry.get("added_time", "")
+        if added_time:
+            try:
+                dt = datetime.fromisoformat(added_time)
+                formatted_time = dt.strftime("%Y-%m-%d %H:%M")
+            except:
+                formatted_time = added_time
+        else:
+            formatted_time = ""
+        self.history_table.setItem(idx, 4, QTableWidgetItem(formatted_time))
         
-        for idx, entry in enumerate(self.download_history.history):
-            self.history_table.setItem(idx, 0, QTableWidgetItem(entry.get("title", "Unknown")))
-            
-            format_text = entry.get("format_type", "").title()
-            if entry.get("format_id") and entry.get("format_id") != "best":
-                format_text += f" ({entry.get('format_id')})"
-            self.history_table.setItem(idx, 1, QTableWidgetItem(format_text))
-            
-            status = entry.get("status", "Unknown")
-            status_item = QTableWidgetItem(status)
-            if status == "Completed":
-                status_item.setBackground(Qt.GlobalColor.darkGreen)
-            elif status == "Failed":
-                status_item.setBackground(Qt.GlobalColor.darkRed)
-            self.history_table.setItem(idx, 2, status_item)
-            
-            self.history_table.setItem(idx, 3, QTableWidgetItem(entry.get("file_size", "")))
-            
-            added_time = entry.get("added_time", "")
-            if added_time:
-                try:
-                    dt = datetime.fromisoformat(added_time)
-                    formatted_time = dt.strftime("%Y-%m-%d %H:%M")
-                except:
-                    formatted_time = added_time
-            else:
-                formatted_time = ""
-            self.history_table.setItem(idx, 4, QTableWidgetItem(formatted_time))
-            
-            duration = ""
-            if entry.get("start_time") and entry.get("end_time"):
-                try:
-                    start = datetime.fromisoformat(entry["start_time"])
-                    end = datetime.fromisoformat(entry["end_time"])
-                    duration_seconds = (end - start).total_seconds()
-                    duration = f"{int(duration_seconds // 60)}m {int(duration_seconds % 60)}s"
-                except:
-                    duration = ""
-            self.history_table.setItem(idx, 5, QTableWidgetItem(duration))
-            
-            self.history_table.setItem(idx, 6, QTableWidgetItem(entry.get("output_path", "")))
+        duration = ""
+        if entry.get("start_time") and entry.get("end_time"):
+            try:
+                start = datetime.fromisoformat(entry["start_time"])
+                end = datetime.fromisoformat(entry["end_time"])
+                duration_seconds = (end - start).total_seconds()
+                duration = f"{int(duration_seconds // 60)}m {int(duration_seconds % 60)}s"
+            except:
+                duration = ""
+        duration_item = QTableWidgetItem(duration)
+        metrics = entry.get("metrics") or {}
+        phases = [(label, metrics.get(key)) for label, key in (
+            ("Time to first byte", "ttfb"), ("Extraction", "extraction_time"),
+            ("Download", "download_time"), ("Merge/postprocess", "merge_time"))]
+        if any(value is not None for _, value in phases):
+            duration_item.setToolTip("\n".join(f"{label}: {value:.1f}s" for label, value in phases if value is not None))
+        self.history_table.setItem(idx, 5, duration_item)
+
+        speed_item = QTableWidgetItem(format_bytes(metrics.get("avg_throughput"), "/s"))
+        if metrics.get("peak_throughput"):
+            speed_item.setToolTip(f"Peak: {format_bytes(metrics['peak_throughput'], '/s')}, "
+                                  f"{format_bytes(metrics.get('bytes') or 0)} transferred")
+        self.history_table.setItem(idx, 6, speed_item)
+        
+        self.history_table.setItem(idx, 7, QTableWidgetItem(entry.get("output_path", "")))
 
     def update_history_status(self):
         total_downloads = len(self.download_history.history)
@@ -1195,16 +1772,17 @@ class VideoDownloader(QWidget):
             self.update_history_status()
 
     def export_history(self):
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self, "Export History", 
             str(Path.home() / "download_history.json"),
-            "JSON Files (*.json)"
+            "JSON Files (*.json);;JSON Lines (*.jsonl);;CSV Files (*.csv)"
         )
         
         if file_path:
+            if not os.path.splitext(file_path)[1]:
+                file_path += re.search(r"\*(\.\w+)", selected_filter).group(1)
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.download_history.history, f, indent=2, ensure_ascii=False, default=str)
+                self.download_history.export(file_path)
                 QMessageBox.information(self, "Export Complete", f"History exported to {file_path}")
             except Exception as e:
                 QMessageBox.critical(self, "Export Error", f"Failed to export history: {str(e)}")
@@ -1212,85 +1790,52 @@ class VideoDownloader(QWidget):
     def show_history_context_menu(self, position):
         pass
 
-    def on_double_click_row(self, row, col):
+    def on_double_click_row(self, index):
         self.add_selected_to_queue()
 
+    @profiled()
     def populate_table(self):
-        self.format_table.setRowCount(0)
-        best_row = None
-        best_fmt = None
-
         if not self.format_json:
+            self.format_model.clear()
             return
 
         single_format = len(self.format_json) == 1
+        best_row = self.rank_best_format()
 
-        for idx, fmt in enumerate(self.format_json):
-            row = self.format_table.rowCount()
-            self.format_table.insertRow(row)
-            itag = str(fmt.get("format_id", idx+1))
-            ext = fmt.get("ext", "mkv")
-            width = fmt.get("width")
-            height = fmt.get("height")
-            resolution = f"{width}x{height}" if width and height else ""
-            vcodec = fmt.get("vcodec") or ""
-            acodec = fmt.get("acodec") or ""
-            typ = "Audio" if vcodec == "none" else "Video"
-            fps = fmt.get("fps")
-            tbr = fmt.get("tbr")
-            size_bytes = fmt.get("filesize") or fmt.get("filesize_approx")
-            size = f"{round(size_bytes/(1024*1024), 2)} MiB" if size_bytes else ""
-            note = fmt.get("format_note", "")
-
-            ext_display = ext if typ == "Audio" else "mkv"
-            values = [itag, ext_display, resolution, typ, vcodec, acodec, str(fps or ""), str(tbr or ""), size, note]
-            for c, v in enumerate(values):
-                self.format_table.setItem(row, c, QTableWidgetItem(v))
-
-            if "Audio" in typ:
-                for c in range(self.format_table.columnCount()):
-                    item = self.format_table.item(row, c)
-                    item.setBackground(Qt.GlobalColor.lightGray)
-
-            if "Video" in typ and ext in ["mp4","webm"]:
-                if not best_fmt:
-                    best_fmt = fmt
-                    best_row = row
-                else:
-                    def key(f):
-                        return (f.get("height") or 0, f.get("fps") or 0, f.get("tbr") or 0)
-                    if key(fmt) > key(best_fmt):
-                        best_fmt = fmt
-                        best_row = row
-
-        if self.show_best_mp4_highlight and best_row is not None and not single_format:
-            for c in range(self.format_table.columnCount()):
-                item = self.format_table.item(best_row, c)
-                if item:
-                    item.setBackground(Qt.GlobalColor.darkGreen)
-                    item.setForeground(Qt.GlobalColor.white)
-                    f = item.font()
-                    f.setBold(True)
-                    item.setFont(f)
+        show_best = self.show_best_mp4_highlight and not single_format
+        self.format_model.set_formats(self.format_json, best_row if show_best else None)
+        self.apply_filter()
 
         self.format_table.setVisible(not single_format)
         self.btn_add_selected.setVisible(not single_format)
 
+    def rank_best_format(self):
+        """Run the selected profile over the fetched formats; returns the row to highlight"""
+        profile = self.format_profiles[max(0, self.profile_combo.currentIndex())]
+        self.best_choice = rank_formats(self.format_json, profile, self.video_info.get("duration"))
+        self.best_choice_label.setText(f"Best for {profile.name}: {self.best_choice.describe()}")
+        highlighted = self.best_choice.video or self.best_choice.audio
+        for row, fmt in enumerate(self.format_json):
+            if fmt is highlighted:
+                return row
+        return None
+
+    def update_best_choice(self):
+        if not self.format_json:
+            return
+        best_row = self.rank_best_format()
+        if self.show_best_mp4_highlight and len(self.format_json) > 1:
+            self.format_model.set_best_row(best_row)
+
+    @profiled()
     def apply_filter(self):
-        needle = self.filter_input.text().lower()
-        for r in range(self.format_table.rowCount()):
-            show = False
-            for c in range(self.format_table.columnCount()):
-                it = self.format_table.item(r, c)
-                if it and needle in it.text().lower():
-                    show = True
-                    break
-            self.format_table.setRowHidden(r, not show)
+        self.filter_timer.stop()
+        self.format_proxy.set_query(self.filter_input.text())
 
     def closeEvent(self, event):
         active_downloads = len(self.download_manager.get_active_items())
-        running_info = self.proc_info.state() == QProcess.ProcessState.Running
-        running_search = self.proc_search.state() == QProcess.ProcessState.Running
+        running_info = self.proc_info is not None and self.proc_info.is_running()
+        running_search = self.search_session is not None and self.search_session.is_running()
         
         if active_downloads > 0 or running_info or running_search:
             reply = QMessageBox.question(
@@ -1306,13 +1851,20 @@ class VideoDownloader(QWidget):
                 if running_info: 
                     self.proc_info.kill()
                 if running_search: 
-                    self.proc_search.kill()
+                    self.search_session.cancel()
                 event.accept()
             else:
                 event.ignore()
         else:
             event.accept()
 
+        if event.isAccepted() and (self.profiler.enabled or self.profiler.cprofile or self.profiler.cprofile_stats):
+            try:
+                path = self.profiler.write_summary()
+                print(f"[PROFILE] Summary written to {path}")
+            except OSError as e:
+                print(f"[PROFILE] Failed to write summary: {e}")
+
     def debug_yt_dlp(self, url):
         """Test yt-dlp directly to see what's happening"""
         import subprocess
@@ -1328,6 +1880,9 @@ class VideoDownloader(QWidget):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # Single instance: URLs passed to a second launch go to the running queue
+    if forward_to_running_instance(sys.argv[1:]):
+        sys.exit(0)
     win = VideoDownloader()
     win.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""Batch audio conversion.
+
+An item with an audio_format downloads the best audio stream as it is
+(bestaudio/best, native extension) and is then handed to a Converter, which
+re-encodes it with ffmpeg into AUDIO_FORMATS[audio_format], optionally
+through the loudnorm filter (EBU R128, single pass) on the way.
+
+Conversion is CPU-bound and the network part is over by then, so the runner
+frees the item's download slot first (DownloadManager.begin_postprocess) and
+the Converter runs its own pool of ffmpeg processes: CONVERT_WORKERS, one per
+CPU, each limited to one thread and run at CONVERT_NICE or the item's launch
+profile, whichever is lower priority (see launch.py). A batch
+of hundreds of files therefore downloads at the network concurrency and
+converts at the CPU count, independently.
+
+converted(item_id, result) is emitted for every file with what it cost
+(seconds, audio seconds, bytes in and out, x realtime); batch_finished(totals)
+when the pool drains, with the throughput of the whole batch.
+"""
+import os
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+from procio import process_hub
+from metrics import format_bytes
+from launch import LaunchProfile
+from audioformats import AUDIO_FORMATS, validate_audio_format
+
+CONVERT_WORKERS = os.cpu_count() or 2
+CONVERT_NICE = 10
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+
+def download_output(item):
+    """yt-dlp's -o for an item; a conversion job downloads the native stream next to its final path"""
+    if not item.audio_format or "%(" in item.output_path:
+        return item.output_path
+    return os.path.splitext(item.output_path)[0] + ".%(ext)s"
+
+
+def target_path(source, audio_format):
+    return os.path.splitext(source)[0] + "." + audio_format
+
+
+def needs_conversion(source, audio_format, loudnorm):
+    return bool(audio_format) and (loudnorm or target_path(source, audio_format) != source)
+
+
+def convert_args(source, target, audio_format, loudnorm):
+    spec = AUDIO_FORMATS[audio_format]
+    args = ["-hide_banner", "-nostdin", "-y", "-i", source, "-vn", "-map_metadata", "0", "-threads", "1"]
+    if loudnorm:
+        args += ["-af", LOUDNORM_FILTER, "-ar", str(spec["sample_rate"])]
+    return args + spec["codec"] + ["-progress", "pipe:1", "-nostats", target]
+
+
+def progress_seconds(text, current):
+    """The latest out_time_us in a chunk of ffmpeg -progress output, in seconds"""
+    for line in reversed(text.splitlines()):
+        key, _, value = line.partition("=")
+        if key == "out_time_us" and value.strip().isdigit():
+            return int(value) / 1e6
+    return current
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Converter(QObject):
+    converted = pyqtSignal(str, dict)
+    batch_finished = pyqtSignal(dict)
+    log_message = pyqtSignal(str)
+
+    def __init__(self, ffmpeg_path, workers=CONVERT_WORKERS):
+        super().__init__()
+        self.ffmpeg_path = ffmpeg_path
+        self.workers = workers or CONVERT_WORKERS
+        self.pending = deque()
+        self.running = {}
+        # Totals since the pool last went idle
+        self.batch = None
+
+    def convert(self, item_id, source, audio_format, loudnorm=False, launch=None):
+        if self.batch is None:
+            self.batch = {"started": time.monotonic(), "files": 0, "failed": 0, "audio_seconds": 0.0,
+                          "input_bytes": 0, "output_bytes": 0}
+        self.pending.append((item_id, source, audio_format, loudnorm, launch))
+        self.start_next()
+
+    def cancel(self, item_id):
+        self.pending = deque(job for job in self.pending if job[0] != item_id)
+        job = self.running.pop(item_id, None)
+        if job is not None:
+            job["handle"].kill()
+            self.remove_partial(job["temp"])
+            self.check_drained()
+            self.start_next()
+
+    def start_next(self):
+        while self.pending and len(self.running) < self.workers:
+            item_id, source, audio_format, loudnorm, launch = self.pending.popleft()
+            target = target_path(source, audio_format)
+            root, ext = os.path.splitext(target)
+            # ffmpeg picks the muxer from the extension, and the source may be the target
+            temp = f"{root}.converting{ext}"
+            job = {"source": source, "target": target, "temp": temp, "format": audio_format, "loudnorm": loudnorm,
+                   "started": time.monotonic(), "out_time": 0.0, "stderr": ""}
+            launch = (launch or LaunchProfile("convert")).with_nice(CONVERT_NICE)
+
+            def on_records(handle, records, item_id=item_id, job=job):
+                if self.running.get(item_id) is not job:
+                    return
+                for record in records:
+                    if record[0] == "stdout":
+                        job["out_time"] = progress_seconds(record[1], job["out_time"])
+                    elif record[0] == "stderr":
+                        job["stderr"] = (job["stderr"] + record[1])[-4000:]
+                    elif record[0] == "finished":
+                        self.on_finished(item_id, job, record[1])
+
+            self.running[item_id] = job
+            job["handle"] = process_hub().start(self.ffmpeg_path, convert_args(source, temp, audio_format, loudnorm),
+                                                "text", on_records, launch)
+
+    def on_finished(self, item_id, job, exit_code):
+        del self.running[item_id]
+        seconds = time.monotonic() - job["started"]
+        result = {"ok": False, "error": "", "path": job["target"], "source": job["source"], "format": job["format"],
+                  "loudnorm": job["loudnorm"], "seconds": round(seconds, 3), "audio_seconds": round(job["out_time"], 3),
+                  "input_size": None, "size": None, "realtime": None}
+        if exit_code != 0:
+            lines = job["stderr"].strip().splitlines()
+            result["error"] = lines[-1] if lines else f"ffmpeg exited with {exit_code}"
+            self.remove_partial(job["temp"])
+        else:
+            try:
+                result["input_size"] = os.path.getsize(job["source"])
+                os.replace(job["temp"], job["target"])
+                if job["source"] != job["target"]:
+                    os.remove(job["source"])
+                result["size"] = os.path.getsize(job["target"])
+                result["ok"] = True
+            except OSError as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                self.remove_partial(job["temp"])
+        if seconds > 0 and job["out_time"]:
+            result["realtime"] = round(job["out_time"] / seconds, 1)
+
+        batch = self.batch
+        if result["ok"]:
+            batch["files"] += 1
+            batch["audio_seconds"] += job["out_time"]
+            batch["input_bytes"] += result["input_size"]
+            batch["output_bytes"] += result["size"]
+            self.log_message.emit(
+                f"[{item_id}] Converted to {job['format']}{' with loudnorm' if job['loudnorm'] else ''}: "
+                f"{format_duration(job['out_time'])} of audio, {format_bytes(result['input_size'])} -> "
+                f"{format_bytes(result['size'])} in {seconds:.1f} s"
+                + (f" ({result['realtime']}x realtime)" if result["realtime"] else ""))
+        else:
+            batch["failed"] += 1
+        self.converted.emit(item_id, result)
+        self.check_drained()
+        self.start_next()
+
+    def check_drained(self):
+        if self.pending or self.running or self.batch is None:
+            return
+        batch, self.batch = self.batch, None
+        wall = max(time.monotonic() - batch.pop("started"), 1e-6)
+        batch.update(seconds=round(wall, 3), workers=self.workers,
+                     files_per_minute=round(batch["files"] * 60 / wall, 1),
+                     realtime=round(batch["audio_seconds"] / wall, 1),
+                     input_bytes_per_second=round(batch["input_bytes"] / wall))
+        if batch["files"] or batch["failed"]:
+            self.log_message.emit(
+                f"[CONVERT] Batch done: {batch['files']} file(s)"
+                + (f", {batch['failed']} failed" if batch["failed"] else "")
+                + f" in {wall:.1f} s on {self.workers} process(es): {batch['files_per_minute']} files/min, "
+                f"{batch['realtime']}x realtime, {format_bytes(batch['input_bytes'])} -> "
+                f"{format_bytes(batch['output_bytes'])}")
+        self.batch_finished.emit(batch)
+
+    def remove_partial(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
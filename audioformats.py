@@ -0,0 +1,19 @@
+"""Output formats of the batch audio conversion, see audio.py.
+
+Kept apart from the Converter so the CLI can check --audio without
+importing Qt.
+"""
+
+# Output extension -> ffmpeg codec arguments and the sample rate to resample
+# to after loudnorm, which otherwise outputs 192 kHz
+AUDIO_FORMATS = {
+    "mp3": {"codec": ["-c:a", "libmp3lame", "-q:a", "2"], "sample_rate": 44100},
+    "opus": {"codec": ["-c:a", "libopus", "-b:a", "128k"], "sample_rate": 48000},
+    "m4a": {"codec": ["-c:a", "aac", "-b:a", "192k"], "sample_rate": 44100},
+    "flac": {"codec": ["-c:a", "flac"], "sample_rate": 44100},
+}
+
+
+def validate_audio_format(audio_format):
+    if audio_format and audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"unknown audio format {audio_format!r}, expected one of {', '.join(AUDIO_FORMATS)}")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Stand-in for ffmpeg used by the audio benchmark.
+
+Understands the command line audio.Converter builds:
+
+    ... -i SOURCE ... [-af loudnorm=...] ... -progress pipe:1 -nostats TARGET
+
+The source is taken to be source_bitrate audio. The stub burns CPU time in
+proportion to its size (convert_rate bytes per CPU second, loudnorm_cost
+times as long with the loudnorm filter), prints -progress blocks as it goes
+and writes a sparse TARGET sized for target_bitrate. Settings are the
+convert_* keys of FAKE_YTDLP_CONFIG, so one config drives both stubs.
+"""
+import os
+import sys
+import json
+import time
+
+DEFAULTS = {
+    "source_bitrate": 160000,
+    "target_bitrate": 192000,
+    "convert_rate": 16 * 1024 * 1024,  # source bytes per CPU second
+    "loudnorm_cost": 1.5,
+    "progress_interval": 0.5,
+    "convert_exit_code": 0,
+}
+
+
+def load_config():
+    config = dict(DEFAULTS)
+    raw = os.environ.get("FAKE_YTDLP_CONFIG", "")
+    if raw:
+        if raw.lstrip().startswith("{"):
+            config.update(json.loads(raw))
+        else:
+            with open(raw, "r", encoding="utf-8") as f:
+                config.update(json.load(f))
+    return config
+
+
+def main(argv):
+    config = load_config()
+    source, target = argv[argv.index("-i") + 1], argv[-1]
+    loudnorm = "-af" in argv and argv[argv.index("-af") + 1].startswith("loudnorm")
+    try:
+        size = os.path.getsize(source)
+    except OSError as e:
+        sys.stderr.write(f"{source}: {e.strerror}\n")
+        return 1
+    duration_us = size * 8 * 1000000 // config["source_bitrate"]
+    cpu_seconds = size / config["convert_rate"] * (config["loudnorm_cost"] if loudnorm else 1)
+
+    started = time.process_time()
+    next_report = time.monotonic()
+    while True:
+        done = min((time.process_time() - started) / cpu_seconds, 1.0) if cpu_seconds else 1.0
+        if done >= 1.0 or time.monotonic() >= next_report:
+            sys.stdout.write(f"out_time_us={int(duration_us * done)}\nspeed=N/A\n"
+                             f"progress={'end' if done >= 1.0 else 'continue'}\n")
+            sys.stdout.flush()
+            next_report = time.monotonic() + config["progress_interval"]
+        if done >= 1.0:
+            break
+        sum(i * i for i in range(20000))
+
+    if config["convert_exit_code"]:
+        sys.stderr.write(f"{target}: Error while encoding\n")
+        return config["convert_exit_code"]
+    with open(target, "wb") as f:
+        f.truncate(duration_us * config["target_bitrate"] // 8 // 1000000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Stand-in for yt-dlp used by the benchmarks.
+
+Understands just enough of the yt-dlp command line to exercise the app:
+
+    -J / --dump-single-json URL              one info dict, padded to payload_size
+    -O "%(.{a,b})j" -O "%(formats.:.{a,b})j" URL
+                                             selected fields of the same info dict
+    -f FMT -o PATH -O "%(.{url,filename})j" URL
+                                             the selected format's URL (direct_url
+                                             if set) and the file it would write
+    --flat-playlist --dump-json ytsearchN:Q  N JSON lines, search_delay apart
+    --flat-playlist --dump-json FEED_URL     a channel of feed_size + feed_new entries,
+                                             newest first, fetched page_size at a time
+                                             (all pages up front unless --lazy-playlist);
+                                             honours --playlist-end and
+                                             --download-archive/--break-on-existing
+    --newline -o PATH URL                    a --newline progress stream; the .part file
+                                             grows with it, --continue picks it up
+                                             and --limit-rate BYTES paces it; %(ext)s
+                                             becomes webm for bestaudio, else mkv; busy
+                                             is the CPU share it burns meanwhile
+
+Behaviour is configured with the FAKE_YTDLP_CONFIG environment variable,
+either inline JSON or a path to a JSON file. Unset keys use DEFAULTS. Output
+is seeded so two runs with the same config produce identical bytes.
+"""
+import os
+import sys
+import re
+import json
+import time
+import random
+import datetime
+
+DEFAULTS = {
+    "seed": 1234,
+    # -J
+    "format_count": 60,
+    "payload_size": 2 * 1024 * 1024,
+    "info_rate": 0,            # bytes/s, 0 = as fast as the pipe takes it
+    "info_chunk": 64 * 1024,
+    # search
+    "search_delay": 0.05,      # seconds between result lines
+    "thumbnail_base": "https://i.ytimg.invalid",
+    # download
+    "download_size": 200 * 1024 * 1024,
+    "progress_lines": 200,
+    "progress_rate": 20,       # lines/s
+    "busy": 0.0,               # fraction of each progress interval spent busy-looping
+    "merge": True,
+    "merge_delay": 0.2,
+    # Write the output file (sparse) so integrity checks have something to read
+    "write_file": True,
+    "written_fraction": 1.0,   # < 1 writes a truncated file
+    "exit_code": 0,
+    "error": "",
+    # -f FMT -O: URL to report for a single (non "+") format, e.g. a local range server
+    "direct_url": "",
+    # channel/playlist listing
+    "feed_size": 5000,
+    "feed_new": 0,             # entries uploaded since feed_size, listed first
+    "page_size": 30,
+    "page_delay": 0.05,        # seconds per page request
+    "request_log": "",         # file that gets a line per page request
+}
+
+VIDEO_CODECS = ["avc1.640028", "vp09.00.40.08", "av01.0.08M.08", "avc1.4d401f"]
+AUDIO_CODECS = ["mp4a.40.2", "opus"]
+HEIGHTS = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+
+
+def load_config():
+    config = dict(DEFAULTS)
+    raw = os.environ.get("FAKE_YTDLP_CONFIG", "")
+    if raw:
+        if raw.lstrip().startswith("{"):
+            config.update(json.loads(raw))
+        else:
+            with open(raw, "r", encoding="utf-8") as f:
+                config.update(json.load(f))
+    return config
+
+
+def write(data, stream=None):
+    stream = stream or sys.stdout
+    stream.write(data)
+    stream.flush()
+
+
+def fake_video_id(rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+    return "".join(rng.choice(alphabet) for _ in range(11))
+
+
+def make_format(index, rng, video_id):
+    kind = index % 3
+    height = HEIGHTS[index % len(HEIGHTS)]
+    fmt = {
+        "format_id": str(100 + index),
+        "format_note": f"{height}p" if kind != 1 else "medium",
+        "protocol": "https",
+        "url": f"https://rr{index % 9}---sn-fake.googlevideo.invalid/videoplayback?expire=1700000000&id={video_id}"
+               f"&itag={100 + index}&source=youtube&sig={'%032x' % rng.getrandbits(128)}",
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-us,en;q=0.5",
+        },
+        "downloader_options": {"http_chunk_size": 10485760},
+        "filesize": rng.randint(1, 400) * 1024 * 1024,
+        "tbr": round(rng.uniform(50, 8000), 3),
+    }
+    if kind == 1:
+        fmt.update({"ext": "m4a" if index % 2 else "webm", "vcodec": "none",
+                    "acodec": AUDIO_CODECS[index % 2], "abr": round(rng.uniform(48, 160), 3),
+                    "asr": 48000, "audio_channels": 2})
+    else:
+        fmt.update({"ext": "mp4" if index % 2 else "webm", "vcodec": VIDEO_CODECS[index % 4],
+                    "acodec": "none" if kind == 0 else AUDIO_CODECS[0],
+                    "width": height * 16 // 9, "height": height, "fps": rng.choice([24, 30, 60]),
+                    "vbr": fmt["tbr"], "dynamic_range": "SDR"})
+    return fmt
+
+
+def make_info(config, rng, url):
+    video_id = fake_video_id(rng)
+    info = {
+        "id": video_id,
+        "title": f"Benchmark video {video_id}",
+        "webpage_url": url,
+        "duration": rng.randint(60, 7200),
+        "uploader": "Benchmark Channel",
+        "view_count": rng.randint(0, 10 ** 8),
+        "formats": [make_format(i, rng, video_id) for i in range(config["format_count"])],
+        "thumbnail": f"{config['thumbnail_base']}/vi/{video_id}/maxresdefault.jpg",
+        "thumbnails": [{"url": f"{config['thumbnail_base']}/vi/{video_id}/{i}.jpg", "id": str(i),
+                        "width": 120 * (i + 1), "height": 90 * (i + 1)} for i in range(40)],
+        "heatmap": [{"start_time": i * 10.0, "end_time": i * 10.0 + 10, "value": rng.random()} for i in range(100)],
+        "automatic_captions": {},
+    }
+
+    # Real -J payloads are dominated by caption tracks, pad with those
+    size = len(json.dumps(info))
+    lang = 0
+    while size < config["payload_size"]:
+        tracks = [{"ext": ext, "url": f"https://www.youtube.invalid/api/timedtext?v={video_id}&lang=l{lang}"
+                   f"&fmt={ext}&sig={'%064x' % rng.getrandbits(256)}", "name": f"Language {lang}"}
+                  for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")]
+        info["automatic_captions"][f"l{lang}"] = tracks
+        size += len(json.dumps(tracks)) + 10
+        lang += 1
+    return info
+
+
+def emit_info(config, rng, url):
+    payload = json.dumps(make_info(config, rng, url)) + "\n"
+    chunk = max(1, config["info_chunk"])
+    for start in range(0, len(payload), chunk):
+        write(payload[start:start + chunk])
+        if config["info_rate"]:
+            time.sleep(chunk / config["info_rate"])
+
+
+PRINT_RE = re.compile(r"^%\((.*)\)j$")
+
+
+def select_fields(value, path):
+    """The subset of yt-dlp's output template traversal the app uses:
+    ".{a,b}" picks fields, "formats.:" maps over a list"""
+    if not path:
+        return value
+    if path.startswith("{"):
+        names = path[1:path.index("}")].split(",")
+        return {name: value[name] for name in names if name in value}
+    head, _, rest = path.partition(".")
+    if head == ":":
+        return [select_fields(item, rest) for item in value]
+    if head == "":
+        return select_fields(value, rest)
+    return select_fields(value.get(head), rest) if isinstance(value, dict) else None
+
+
+def select_format(config, info, selector, output_path):
+    """Top-level fields of a single-format selection, like yt-dlp's -f FMT -O"""
+    fmt = dict(info["formats"][0])
+    if "+" in selector:
+        # Merged selections have no single URL
+        fmt.pop("url")
+        fmt["protocol"] = "https+https"
+    elif config["direct_url"]:
+        fmt.update(url=config["direct_url"], protocol=config["direct_url"].split(":", 1)[0])
+    fmt["filename"] = (output_path or "%(title)s.%(ext)s").replace("%(title)s", info["title"]) \
+        .replace("%(id)s", info["id"]).replace("%(ext)s", fmt["ext"])
+    info.update(fmt)
+
+
+def emit_print(config, rng, url, templates, selector="", output_path=""):
+    info = make_info(config, rng, url)
+    if selector:
+        select_format(config, info, selector, output_path)
+    for template in templates:
+        m = PRINT_RE.match(template)
+        value = select_fields(info, m.group(1)) if m else None
+        write((json.dumps(value) if value is not None else "NA") + "\n")
+
+
+# search prefix (without "search") -> (ie_key, URL prefix)
+SEARCH_SITES = {
+    "yt": ("Youtube", "https://www.youtube.com/watch?v="),
+    "sc": ("Soundcloud", "https://soundcloud.com/benchmark/"),
+    "bili": ("BiliBili", "https://www.bilibili.com/video/"),
+    "nico": ("Niconico", "https://www.nicovideo.jp/watch/"),
+}
+
+
+def emit_search(config, rng, query):
+    prefix, _, terms = query.partition(":")
+    digits = "".join(c for c in prefix if c.isdigit())
+    count = int(digits) if digits else 1
+    extractor = prefix.rstrip("0123456789").replace("search", "") or "yt"
+    ie_key, url_prefix = SEARCH_SITES.get(extractor, SEARCH_SITES["yt"])
+    for i in range(count):
+        video_id = fake_video_id(rng)
+        entry = {
+            "_type": "url",
+            "ie_key": ie_key,
+            "id": video_id,
+            "url": url_prefix + video_id,
+            "title": f"{terms} result {i + 1} ({extractor})",
+            "uploader": f"Channel {rng.randint(1, 500)}",
+            "channel": f"Channel {rng.randint(1, 500)}",
+            "duration": rng.randint(30, 5000),
+            "view_count": rng.randint(0, 10 ** 7),
+            "thumbnails": [{"url": f"{config['thumbnail_base']}/vi/{video_id}/hqdefault.jpg",
+                            "height": 360, "width": 480}],
+        }
+        write(json.dumps(entry) + "\n")
+        if config["search_delay"]:
+            time.sleep(config["search_delay"])
+
+
+def option(argv, name):
+    return argv[argv.index(name) + 1] if name in argv else None
+
+
+def emit_feed(config, url, argv):
+    total = config["feed_size"] + config["feed_new"]
+    end = int(option(argv, "--playlist-end") or total)
+    archive = set()
+    if option(argv, "--download-archive") and os.path.exists(option(argv, "--download-archive")):
+        with open(option(argv, "--download-archive"), "r", encoding="utf-8") as f:
+            archive = {line.strip() for line in f}
+    newest = datetime.date(2026, 1, 1)
+    # Entry k is the k-th upload; ids stay the same when new ones are added
+    entries = ({"_type": "url", "ie_key": "Youtube", "id": f"feed{k:07d}",
+                "url": f"https://www.youtube.com/watch?v=feed{k:07d}", "title": f"Upload {k}",
+                "upload_date": (newest - datetime.timedelta(days=total - 1 - k)).strftime("%Y%m%d")}
+               for k in range(total - 1, -1, -1))
+    pages = (min(end, total) + config["page_size"] - 1) // config["page_size"]
+
+    def request_page():
+        if config["request_log"]:
+            with open(config["request_log"], "a") as f:
+                f.write(url + "\n")
+        time.sleep(config["page_delay"])
+
+    lazy = "--lazy-playlist" in argv
+    if not lazy:
+        for _ in range(pages):
+            request_page()
+    for index, entry in enumerate(entries):
+        if index >= end:
+            break
+        if lazy and index % config["page_size"] == 0:
+            request_page()
+        if "--break-on-existing" in argv and f"youtube {entry['id']}" in archive:
+            write(f"[download] {entry['id']}: has already been recorded in the archive\n", sys.stderr)
+            write("[info] Encountered a video that is already in the archive, stopping due to "
+                  "--break-on-existing\n", sys.stderr)
+            return 101
+        write(json.dumps(entry) + "\n")
+    return 0
+
+
+def format_bytes(value):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.2f}{unit}"
+        value /= 1024
+
+
+def pause(seconds, busy):
+    """Sleep for seconds, the first busy fraction of them on the CPU"""
+    end = time.monotonic() + seconds * busy
+    while time.monotonic() < end:
+        sum(i * i for i in range(1000))
+    time.sleep(seconds * (1 - busy))
+
+
+def emit_download(config, rng, url, output_path, resume=False, rate_limit=None):
+    video_id = fake_video_id(rng)
+    write(f"[youtube] Extracting URL: {url}\n")
+    write(f"[youtube] {video_id}: Downloading webpage\n")
+    write(f"[info] {video_id}: Downloading 1 format(s): 137+140\n")
+    write(f"[download] Destination: {output_path}.f137.mp4\n" if config["merge"] else
+          f"[download] Destination: {output_path}\n")
+
+    total = config["download_size"]
+    lines = max(1, config["progress_lines"])
+    interval = 1.0 / config["progress_rate"] if config["progress_rate"] else 0
+    if rate_limit:
+        interval = max(interval, total / lines / rate_limit)
+    # Sparse, it only records how far the download got
+    part_path = output_path + ".part" if config["write_file"] and output_path else ""
+    first = 1
+    if resume and part_path and os.path.exists(part_path):
+        first = min(lines, os.path.getsize(part_path) * lines // total + 1)
+        write(f"[download] Resuming download at byte {os.path.getsize(part_path)}\n")
+    for i in range(first, lines + 1):
+        percent = 100.0 * i / lines
+        speed = rng.uniform(2, 20) * 1024 * 1024
+        if rate_limit:
+            speed = min(speed, rate_limit)
+        remaining = total * (1 - percent / 100) / speed
+        write(f"[download] {percent:5.1f}% of {format_bytes(total):>10} at {format_bytes(speed) + '/s':>12} "
+              f"ETA {int(remaining) // 60:02d}:{int(remaining) % 60:02d}\n")
+        if part_path:
+            with open(part_path, "ab") as f:
+                f.truncate(total * i // lines)
+        if interval:
+            pause(interval, config["busy"])
+
+    if config["exit_code"]:
+        write(f"ERROR: {config['error'] or 'unable to download video data: HTTP Error 503: Service Unavailable'}\n",
+              sys.stderr)
+        return config["exit_code"]
+
+    if config["merge"]:
+        write(f'[Merger] Merging formats into "{output_path}"\n')
+        time.sleep(config["merge_delay"])
+        write(f"Deleting original file {output_path}.f137.mp4 (pass -k to keep)\n")
+    if part_path:
+        os.replace(part_path, output_path)
+        with open(output_path, "r+b") as f:
+            f.truncate(int(total * config["written_fraction"]))
+    return 0
+
+
+def main(argv):
+    config = load_config()
+    rng = random.Random(config["seed"])
+
+    output_path = ""
+    if "-o" in argv:
+        output_path = argv[argv.index("-o") + 1]
+    targets = [a for a in argv if a.startswith(("http://", "https://")) or "search" in a.split(":", 1)[0]]
+    target = targets[0] if targets else ""
+
+    templates = [argv[i + 1] for i, a in enumerate(argv[:-1]) if a in ("-O", "--print")]
+    if templates:
+        selector = argv[argv.index("-f") + 1] if "-f" in argv else ""
+        emit_print(config, rng, target, templates, selector, output_path)
+        return 0
+    if "-J" in argv or "--dump-single-json" in argv:
+        emit_info(config, rng, target)
+        return 0
+    if "--dump-json" in argv and "search" not in target.split(":", 1)[0]:
+        return emit_feed(config, target, argv)
+    if "--dump-json" in argv:
+        emit_search(config, rng, target)
+        return 0
+    rate_limit = int(argv[argv.index("--limit-rate") + 1]) if "--limit-rate" in argv else None
+    selector = argv[argv.index("-f") + 1] if "-f" in argv else ""
+    output_path = output_path.replace("%(ext)s", "webm" if selector.startswith("bestaudio") else "mkv")
+    return emit_download(config, rng, target, output_path, "--continue" in argv, rate_limit)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,1041 @@
+"""VDM benchmark suite.
+
+Runs the real GUI (offscreen by default) against benchmarks/fake_yt_dlp.py,
+so no network or real yt-dlp is needed:
+
+    python benchmarks/run_benchmarks.py                      all scenarios, 3 repeats
+    python benchmarks/run_benchmarks.py -s format_fetch -r 5
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+Every scenario runs in a fresh child process inside an empty temporary
+directory, so peak RSS and the Saves/ folder are per scenario. Reported per
+scenario (median over repeats): wall time, CPU time of the app and of its
+yt-dlp children, peak RSS, and GUI event-loop latency measured as the
+lateness of a 5 ms precise timer. The stub is seeded, so runs on the same
+machine and commit produce comparable numbers.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+STUB_PATH = os.path.join(BENCH_DIR, "fake_yt_dlp.py")
+FFMPEG_STUB_PATH = os.path.join(BENCH_DIR, "fake_ffmpeg.py")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+RESULT_PREFIX = "BENCH_RESULT "
+
+SCENARIOS = {}
+
+
+def scenario(name, stub_config, timeout=120):
+    def register(func):
+        SCENARIOS[name] = {"func": func, "config": stub_config, "timeout": timeout, "doc": func.__doc__}
+        return func
+    return register
+
+
+def make_launcher(folder, stub=STUB_PATH, name="yt-dlp"):
+    """QProcess needs an executable, wrap the stub for the current interpreter"""
+    if os.name == "nt":
+        path = os.path.join(folder, name + ".cmd")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'@"{sys.executable}" "{stub}" %*\r\n')
+    else:
+        path = os.path.join(folder, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def children_cpu_seconds():
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LatencyProbe:
+    """Measures how late a high-frequency timer fires, i.e. how long the GUI thread was busy"""
+
+    def __init__(self, interval_ms=5):
+        from PyQt6.QtCore import QTimer, Qt
+        self.interval = interval_ms / 1000
+        self.samples = []
+        self.last = None
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.interval_ms = interval_ms
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start(self.interval_ms)
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.samples.append(max(0.0, (now - self.last - self.interval) * 1000))
+        self.last = now
+
+    def summary(self):
+        return {
+            "p50": round(percentile(self.samples, 50), 2),
+            "p95": round(percentile(self.samples, 95), 2),
+            "p99": round(percentile(self.samples, 99), 2),
+            "max": round(max(self.samples, default=0.0), 2),
+            "stalls_over_50ms": sum(1 for s in self.samples if s > 50),
+            "samples": len(self.samples),
+        }
+
+
+def wait_until(app, condition, timeout):
+    from PyQt6.QtCore import QEventLoop
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("scenario condition not reached")
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+
+
+def spin(app, seconds):
+    from PyQt6.QtCore import QEventLoop
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+
+
+def create_window(app, launcher):
+    from app import VideoDownloader
+    window = VideoDownloader()
+    window.yt_dlp_path = launcher
+    window.download_runner.yt_dlp_path = launcher
+    window.subscription_manager.yt_dlp_path = launcher
+    window.show()
+    wait_until(app, lambda: window.first_paint_logged, 10)
+    return window
+
+
+def make_item(index, output_dir):
+    from core import DownloadItem
+    return DownloadItem(
+        url=f"https://www.youtube.com/watch?v=bench{index:06d}",
+        format_id="best",
+        format_type="best",
+        output_path=os.path.join(output_dir, f"bench_{index}.mkv"),
+        title=f"Benchmark download {index}"
+    )
+
+
+def fetch_formats_once(app, window, lean):
+    window.lean_fetch = lean
+    window.url_input.setText("https://www.youtube.com/watch?v=benchmark01")
+    started = time.perf_counter()
+    window.fetch_formats()
+    wait_until(app, lambda: window.format_json and not window.fetching_info, 60)
+    stats = window.last_info_fetch or {}
+    return {"fetch_ms": round((time.perf_counter() - started) * 1000, 1), "formats": len(window.format_json),
+            "payload_bytes": stats.get("payload_bytes"), "process_ms": stats.get("fetch_ms"),
+            "info_dict_bytes": len(json.dumps(window.video_info))}
+
+
+@scenario("format_fetch", {"format_count": 300, "payload_size": 5 * 1024 * 1024})
+def run_format_fetch(app, window):
+    """-J fetch of a 5 MB info dict with 300 formats, until the format table is populated"""
+    return fetch_formats_once(app, window, lean=False)
+
+
+@scenario("format_fetch_lean", {"format_count": 300, "payload_size": 5 * 1024 * 1024})
+def run_format_fetch_lean(app, window):
+    """The same video fetched in lean mode (-O with only the fields the app uses)"""
+    return fetch_formats_once(app, window, lean=True)
+
+
+def search_once(app, window, mode, limit, expected_rows):
+    window.input_mode.setCurrentText(mode)
+    window.search_limit.setValue(limit)
+    window.url_input.setText("benchmark query")
+    started = time.perf_counter()
+    window.fetch_formats()
+    wait_until(app, lambda: window.search_results, 60)
+    first_row_ms = (time.perf_counter() - started) * 1000
+    wait_until(app, lambda: not window.fetching_search and window.search_table.rowCount() == expected_rows, 60)
+    return {"first_row_ms": round(first_row_ms, 1), "search_ms": round((time.perf_counter() - started) * 1000, 1),
+            "rows": window.search_table.rowCount()}
+
+
+@scenario("search_render", {"search_delay": 0.01})
+def run_search_render(app, window):
+    """50-result search, until every result is rendered in the search table"""
+    return search_once(app, window, "Search YouTube", 50, 50)
+
+
+@scenario("search_fanout", {"search_delay": 0.05})
+def run_search_fanout(app, window):
+    """"Search All Sites": 4 backends x 20 results in parallel, rows streamed as they arrive"""
+    return search_once(app, window, "Search All Sites", 20, 80)
+
+
+@scenario("search_cache", {"search_delay": 0.01})
+def run_search_cache(app, window):
+    """The same 50-result search three times: cold, from the cache, then a forced revalidation
+    against changed results"""
+    cold = search_once(app, window, "Search YouTube", 50, 50)
+    cached = search_once(app, window, "Search YouTube", 50, 50)
+
+    # Different seed: the revalidating search sees other results
+    os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(dict(SCENARIOS["search_cache"]["config"], seed=99))
+    window.search_cache.fresh = 0
+    first_id = window.search_results[0]["id"]
+    started = time.perf_counter()
+    shown = search_once(app, window, "Search YouTube", 50, 50)
+    wait_until(app, lambda: window.search_results[0]["id"] != first_id, 60)
+    return {"cold_first_row_ms": cold["first_row_ms"], "cold_search_ms": cold["search_ms"],
+            "cached_search_ms": cached["search_ms"], "stale_search_ms": shown["search_ms"],
+            "revalidated_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+@scenario("search_select", {"search_delay": 0.01, "format_count": 300, "payload_size": 0})
+def run_search_select(app, window):
+    """10-result search, then open a prefetched top result and a result outside the prefetch window"""
+    from search import PREFETCH_TOP_K
+    search_once(app, window, "Search YouTube", 10, 10)
+    wait_until(app, lambda: not window.prefetcher.running and not window.prefetcher.pending, 60)
+    timings = {}
+    for label, row in (("prefetched", 0), ("cold", PREFETCH_TOP_K)):
+        started = time.perf_counter()
+        window.on_search_result_selected(row)
+        wait_until(app, lambda: window.format_json and not window.fetching_info, 60)
+        timings[f"select_{label}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        window.input_mode.setCurrentText("Search YouTube")
+    return timings
+
+
+class ThumbnailServer:
+    """Local HTTP server answering every GET with the same 480x360 JPEG"""
+
+    def __init__(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+        from PyQt6.QtGui import QColor, QImage
+
+        image = QImage(480, 360, QImage.Format.Format_RGB32)
+        image.fill(QColor(40, 90, 160))
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "JPG", 90)
+        body = bytes(data)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@scenario("thumbnails", {"search_delay": 0.005})
+def run_thumbnails(app, window):
+    """50-result search with thumbnails from a local HTTP server: cold, repeated, and from the disk cache"""
+    server = ThumbnailServer()
+    config = dict(SCENARIOS["thumbnails"]["config"], thumbnail_base=server.url)
+    os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(config)
+
+    def with_icons():
+        table = window.search_table
+        return sum(1 for row in range(table.rowCount())
+                   if table.item(row, 0) is not None and not table.item(row, 0).icon().isNull())
+
+    result = {}
+    for label in ("cold", "memory", "disk"):
+        if label == "disk":
+            window.thumbnail_loader.memory.clear()
+        requests_before = server.requests
+        started = time.perf_counter()
+        search_once(app, window, "Search YouTube", 50, 50)
+        wait_until(app, lambda: with_icons() == 50, 60)
+        result[f"{label}_all_thumbnails_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result[f"{label}_http_requests"] = server.requests - requests_before
+    server.httpd.shutdown()
+    return result
+
+
+@scenario("progress_streams", {"progress_lines": 300, "progress_rate": 50, "merge_delay": 0.1})
+def run_progress_streams(app, window):
+    """10 concurrent downloads each printing 50 progress lines/s, with the Queue tab visible"""
+    window.tabs.setCurrentIndex(1)
+    window.download_manager.max_concurrent = 10
+    started = time.perf_counter()
+    for index in range(10):
+        window.download_manager.add_to_queue(make_item(index, os.getcwd()))
+    wait_until(app, lambda: not window.download_manager.get_all_items(), 60)
+    return {"jobs": 10, "all_done_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+@scenario("queue_1000", {"progress_lines": 100000, "progress_rate": 10})
+def run_queue_1000(app, window):
+    """1,000 queued items with 3 running, Queue tab visible for 5 s, then Pause All, Resume All,
+    reprioritize every item and Cancel All"""
+    manager = window.download_manager
+    window.tabs.setCurrentIndex(1)
+    manager.max_concurrent = 3
+    started = time.perf_counter()
+    for index in range(1000):
+        manager.add_to_queue(make_item(index, os.getcwd()))
+    enqueue_ms = (time.perf_counter() - started) * 1000
+    spin(app, 5)
+    started = time.perf_counter()
+    window.update_queue_display()
+    refresh_ms = (time.perf_counter() - started) * 1000
+
+    def timed(action):
+        started = time.perf_counter()
+        action()
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    spawned = []
+    manager.download_started.connect(spawned.append)
+    pause_ms = timed(window.pause_all_downloads)
+    started_by_pause = len(spawned)
+    running_after_pause = manager.running_locally()
+    resume_ms = timed(window.pause_all_downloads)
+    spin(app, 1)
+    reprioritize_ms = timed(lambda: manager.reprioritize_many({item.id: index % 10
+                                                               for index, item in enumerate(manager.queue)}))
+    spin(app, 1)
+
+    history_writes = []
+    save_history = window.download_history.save_history
+    window.download_history.save_history = lambda: (history_writes.append(1), save_history())
+    history_before = len(window.download_history.history)
+    started_items = sum(1 for item in manager.get_all_items() if item.start_time is not None)
+    console_before = window.console_output.document().blockCount()
+    del spawned[:]
+    cancel_ms = timed(window.cancel_all_downloads)
+    spin(app, 1)
+    return {"enqueue_ms": round(enqueue_ms, 1), "queue_refresh_ms": round(refresh_ms, 1),
+            "pause_all_ms": pause_ms, "running_after_pause": running_after_pause,
+            "started_by_pause": started_by_pause, "resume_all_ms": resume_ms,
+            "reprioritize_all_ms": reprioritize_ms, "cancel_all_ms": cancel_ms,
+            "started_by_cancel": len(spawned), "history_writes_by_cancel": len(history_writes),
+            "history_entries_by_cancel": len(window.download_history.history) - history_before,
+            "started_items_at_cancel": started_items,
+            "log_lines_by_cancel": window.console_output.document().blockCount() - console_before,
+            "left_running_after_cancel": len(manager.get_all_items())}
+
+
+@scenario("cluster", {"progress_lines": 40, "progress_rate": 20, "merge_delay": 0.1})
+def run_cluster(app, window):
+    """GUI as coordinator with 3 local worker processes (2 slots each), 30 jobs; one worker is killed after 10"""
+    import socket
+    import subprocess
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    window.tabs.setCurrentIndex(1)
+    window.download_manager.max_concurrent = 0
+    window.coordinator.port = port
+    window.coordinator.start()
+    window.workers_table.setVisible(True)
+    workers = [subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "cli.py"), "worker", f"127.0.0.1:{port}",
+                                 "-c", "2", "--name", f"w{index}", "--yt-dlp", window.download_runner.yt_dlp_path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+               for index in range(3)]
+    finished = []
+    window.download_manager.download_finished.connect(lambda item_id, success: finished.append(success))
+    wait_until(app, lambda: len(window.coordinator.workers) == 3, 20)
+
+    started = time.perf_counter()
+    for index in range(30):
+        window.download_manager.add_to_queue(make_item(index, os.getcwd()))
+    wait_until(app, lambda: len(finished) >= 10, 60)
+    workers[0].kill()
+    wait_until(app, lambda: len(finished) >= 30, 60)
+    all_done_ms = (time.perf_counter() - started) * 1000
+    stats = {worker["name"]: worker["completed"] for worker in window.coordinator.worker_stats()}
+    window.update_queue_display()
+    for worker in workers:
+        worker.kill()
+    return {"jobs": 30, "all_done_ms": round(all_done_ms, 1), "completed_ok": sum(finished),
+            "w1_completed": stats.get("w1"), "w2_completed": stats.get("w2"),
+            "worker_rows": window.workers_table.rowCount()}
+
+
+@scenario("daemon_exit", {"progress_lines": 10, "progress_rate": 50, "merge_delay": 0.05})
+def run_daemon_exit(app, window):
+    """cli.py run --exit-when-done on an empty queue file and on one with 5 items; both must exit on their own"""
+    import subprocess
+    result = {}
+    for label, count in (("empty", 0), ("queued", 5)):
+        folder = os.path.abspath(f"daemon_{label}")
+        os.makedirs(os.path.join(folder, "Saves"))
+        with open(os.path.join(folder, "Saves", "queue.jsonl"), "w", encoding="utf-8") as f:
+            for index in range(count):
+                item = make_item(index, folder)
+                f.write(json.dumps({"url": item.url, "output_path": item.output_path, "title": item.title}) + "\n")
+        started = time.perf_counter()
+        daemon = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "cli.py"), "run", "--exit-when-done",
+                                   "--no-control", "--yt-dlp", window.download_runner.yt_dlp_path],
+                                  cwd=folder, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until(app, lambda: daemon.poll() is not None, 30)
+        except TimeoutError:
+            # Still running: it never noticed the queue was drained
+            daemon.kill()
+            daemon.wait()
+            result[f"{label}_exited"] = 0
+            continue
+        result[f"{label}_exit_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result[f"{label}_exited"] = 1
+        result[f"{label}_exit_code"] = daemon.returncode
+    return result
+
+
+class RangeServer:
+    """Local HTTP server for one random file, with Range support and a per-connection rate limit"""
+
+    def __init__(self, size, rate):
+        import re
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        body = os.urandom(size)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+                start, end = 0, size
+                match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+                if match and server.ranges:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) + 1 if match.group(2) else size
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(end - start))
+                self.send_header("ETag", '"bench"')
+                self.end_headers()
+                started, position = time.monotonic(), start
+                try:
+                    while position < end:
+                        chunk = body[position:min(end, position + 64 * 1024)]
+                        self.wfile.write(chunk)
+                        position += len(chunk)
+                        server.bytes_sent += len(chunk)
+                        ahead = (position - start) / server.rate - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.sha256 = hashlib.sha256(body).hexdigest()
+        self.rate = rate
+        self.ranges = True
+        self.requests = 0
+        self.bytes_sent = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/video.mp4"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@scenario("segmented", {"format_count": 3, "payload_size": 0})
+def run_segmented(app, window):
+    """64 MiB direct-URL download from a local server capped at 4 MiB/s per connection:
+    without range support, segmented, and segmented with a cancel at 40% and a resume"""
+    server = RangeServer(64 * 1024 * 1024, 4 * 1024 * 1024)
+    os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(dict(SCENARIOS["segmented"]["config"], direct_url=server.url))
+    window.tabs.setCurrentIndex(1)
+    window.download_runner.segmented = True
+    manager = window.download_manager
+    finished = {}
+    manager.download_finished.connect(lambda item_id, success: finished.__setitem__(item_id, success))
+
+    def download(index, resume=False, cancel_at=None):
+        item = make_item(index, os.getcwd())
+        item.format_selector = "18"
+        item.resume = resume
+        manager.add_to_queue(item)
+        if cancel_at is not None:
+            wait_until(app, lambda: item.progress >= cancel_at, 60)
+            job = item.process
+            manager.cancel_download(item.id)
+            wait_until(app, lambda: not job.is_running(), 30)
+        wait_until(app, lambda: item.id in finished, 120)
+        return item
+
+    def file_ok(item):
+        with open(item.output_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest() == server.sha256
+
+    result = {}
+    for label, ranges in (("single", False), ("segmented", True)):
+        server.ranges = ranges
+        server.connections.clear()
+        started = time.perf_counter()
+        item = download(0 if ranges else 1)
+        seconds = time.perf_counter() - started
+        result[f"{label}_s"] = round(seconds, 2)
+        result[f"{label}_mib_s"] = round(64 / seconds, 1)
+        result[f"{label}_connections"] = len(server.connections)
+        result[f"{label}_ok"] = int(finished[item.id] and file_ok(item))
+
+    item = download(2, cancel_at=40)
+    partial = os.path.exists(item.output_path + ".part.segments")
+    sent_before = server.bytes_sent
+    item = download(2, resume=True)
+    result["resume_state_saved"] = int(partial)
+    result["resume_fetched_mib"] = round((server.bytes_sent - sent_before) / 1024 / 1024, 1)
+    result["resume_ok"] = int(finished[item.id] and file_ok(item))
+    server.httpd.shutdown()
+    return result
+
+
+@scenario("verify", {"download_size": 512 * 1024 * 1024, "progress_lines": 20, "progress_rate": 20,
+                     "merge_delay": 0.1})
+def run_verify(app, window):
+    """6 downloads of 512 MiB files checked after download; a seventh is truncated once and re-queued"""
+    import core
+    import threading
+    from integrity import hash_file
+    window.tabs.setCurrentIndex(1)
+    window.download_manager.max_concurrent = 3
+    manager = window.download_manager
+    finished = {}
+    manager.download_finished.connect(lambda item_id, success: finished.__setitem__(item_id, success))
+    started = time.perf_counter()
+    items = [make_item(index, os.getcwd()) for index in range(6)]
+    for item in items:
+        manager.add_to_queue(item)
+    wait_until(app, lambda: len(finished) == 6, 120)
+    all_done_ms = (time.perf_counter() - started) * 1000
+    seconds = [item.verification["seconds"] for item in items if item.verification]
+    # Raw hash speed, on a thread so it doesn't count as GUI latency
+    hashing = threading.Thread(target=hash_file, args=(items[0].output_file,))
+    hash_started = time.perf_counter()
+    hashing.start()
+    wait_until(app, lambda: not hashing.is_alive(), 60)
+    hash_mib_s = 512 / (time.perf_counter() - hash_started)
+
+    config = SCENARIOS["verify"]["config"]
+    os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(dict(config, written_fraction=0.5))
+    # The second attempt gets a whole file, without the usual retry backoff
+    manager.download_retrying.connect(lambda *args: os.environ.__setitem__("FAKE_YTDLP_CONFIG", json.dumps(config)))
+    core.RETRY_BASE_DELAY = 0
+    truncated = make_item(6, os.getcwd())
+    manager.add_to_queue(truncated)
+    wait_until(app, lambda: truncated.id in finished, 60)
+    entry = window.download_history.history[0]
+    return {"jobs": 6, "all_done_ms": round(all_done_ms, 1), "verified_ok": sum(1 for item in items if
+                                                                                (item.verification or {}).get("ok")),
+            "verify_median_ms": round(statistics.median(seconds) * 1000, 1) if seconds else None,
+            "hash_mib_s": round(hash_mib_s, 1),
+            "truncated_attempts": truncated.retry_count + 1, "truncated_recovered": int(finished[truncated.id]),
+            "history_has_sha256": int(bool((entry.get("verification") or {}).get("sha256")))}
+
+
+def window_from_now(start_offset, end_offset, **limits):
+    """A ScheduleWindow from now + start_offset to now + end_offset minutes"""
+    from schedule import ScheduleWindow, format_time, minute_of_day
+    now = minute_of_day(datetime.now())
+    return ScheduleWindow("bench", format_time((now + start_offset) % 1440), format_time((now + end_offset) % 1440),
+                          **limits)
+
+
+@scenario("schedule", {"download_size": 50 * 1024 * 1024, "progress_lines": 100, "progress_rate": 20,
+                       "merge_delay": 0.1})
+def run_schedule(app, window):
+    """1,000 items queued outside the window and projected; a 3-slot, 30 MiB/s window opens, closes
+    after 2 s (pausing the running three) and opens again, where they resume from their .part files"""
+    from schedule import Schedule
+    window.tabs.setCurrentIndex(1)
+    manager = window.download_manager
+    closed = Schedule([window_from_now(60, 120)])
+    manager.set_schedule(closed)
+    for index in range(1000):
+        item = make_item(index, os.getcwd())
+        item.file_size = (index % 7 + 1) * 64 * 1024 * 1024
+        manager.add_to_queue(item)
+    started = time.perf_counter()
+    rows = manager.projection()
+    projection_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    window.schedule_btn.setChecked(True)
+    view_ms = (time.perf_counter() - started) * 1000
+
+    open_window = Schedule([window_from_now(-60, 60, max_concurrent=3, rate_limit=30 * 1024 * 1024)])
+    manager.set_schedule(open_window)
+    first = manager.get_active_items()
+    rate_limited = int(all("--limit-rate" in window.download_runner.build_args(item) for item in first))
+    spin(app, 2)
+    started = time.perf_counter()
+    manager.set_schedule(closed)
+    pause_ms = (time.perf_counter() - started) * 1000
+    paused_at = [item.progress for item in first]
+    paused_ok = int(all(item.status.startswith("Paused until") and item in manager.queue for item in first))
+    spin(app, 0.5)
+    resumed_from = {}
+
+    def on_progress(item_id, progress, status):
+        resumed_from.setdefault(item_id, progress)
+
+    manager.download_progress.connect(on_progress)
+    finished = set()
+    manager.download_finished.connect(lambda item_id, success: finished.add(item_id) if success else None)
+    started = time.perf_counter()
+    manager.set_schedule(open_window)
+    wait_until(app, lambda: all(item.id in finished for item in first), 60)
+    resume_done_ms = (time.perf_counter() - started) * 1000
+    manager.set_schedule(closed)
+    return {"queued": 1000, "projection_ms": round(projection_ms, 1), "projected": sum(1 for row in rows if row[2]),
+            "schedule_view_ms": round(view_ms, 1), "pause_ms": round(pause_ms, 1),
+            "paused_ok": paused_ok,
+            "rate_limited": rate_limited, "paused_at_percent_min": min(paused_at),
+            "resumed_from_percent_min": min(resumed_from.get(item.id, 0) for item in first),
+            "resume_done_ms": round(resume_done_ms, 1)}
+
+
+@scenario("subscriptions", {"feed_size": 5000, "page_size": 30, "page_delay": 0.05})
+def run_subscriptions(app, window):
+    """A 5,000-entry channel: first poll, a poll after 3 new uploads and, for comparison, a full
+    flat listing of the same channel; counts the page requests of each"""
+    from subscriptions import Subscription
+    manager = window.subscription_manager
+    window.download_manager.max_concurrent = 0
+    config = dict(SCENARIOS["subscriptions"]["config"], request_log=os.path.abspath("requests.log"))
+    polls = []
+    manager.polled.connect(lambda name, new: polls.append(new))
+
+    def poll(subscription):
+        open(config["request_log"], "w").close()
+        os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(config)
+        count = len(polls)
+        started = time.perf_counter()
+        manager.add(subscription)
+        wait_until(app, lambda: len(polls) > count, 120)
+        with open(config["request_log"]) as f:
+            pages = sum(1 for _ in f)
+        return round((time.perf_counter() - started) * 1000, 1), pages, polls[-1]
+
+    url = "https://www.youtube.com/@bench/videos"
+    first_ms, first_pages, first_new = poll(Subscription(url, "bench"))
+    config["feed_new"] = 3
+    next_ms, next_pages, next_new = poll(Subscription(url, "bench"))
+    queued = len(window.download_manager.queue)
+    full_ms, full_pages, _ = poll(Subscription(url + "?full", "full", initial=0, stop_at_known=False))
+    return {"first_poll_ms": first_ms, "first_poll_pages": first_pages, "first_poll_new": first_new,
+            "poll_ms": next_ms, "poll_pages": next_pages, "poll_new": next_new, "queued": queued,
+            "full_listing_ms": full_ms, "full_listing_pages": full_pages}
+
+
+@scenario("audio_batch", {"merge": False, "download_size": 8 * 1024 * 1024, "progress_lines": 10,
+                          "progress_rate": 40, "convert_rate": 32 * 1024 * 1024})
+def run_audio_batch(app, window):
+    """24 best-audio downloads, 3 at a time, converted to mp3 with loudnorm in the converter's
+    own process pool; reports when the downloads and the conversions were done"""
+    from core import item_from_entry
+    manager = window.download_manager
+    converter = window.download_runner.converter
+    converter.ffmpeg_path = make_launcher(os.getcwd(), FFMPEG_STUB_PATH, "ffmpeg")
+    window.tabs.setCurrentIndex(1)
+    manager.max_concurrent = 3
+    finished = {}
+    batches = []
+    downloads_done = []
+    manager.download_finished.connect(lambda item_id, success: finished.__setitem__(item_id, success))
+    manager.download_progress.connect(lambda item_id, progress, status: downloads_done.append(time.perf_counter())
+                                      if status.startswith("Converting") else None)
+    converter.batch_finished.connect(batches.append)
+    items = [item_from_entry({"url": f"https://www.youtube.com/watch?v=audio{index:05d}", "audio_format": "mp3",
+                              "loudnorm": True, "output_path": os.path.join(os.getcwd(), f"audio_{index}.mp3")},
+                             os.getcwd()) for index in range(24)]
+    started = time.perf_counter()
+    for item in items:
+        manager.add_to_queue(item)
+    wait_until(app, lambda: len(finished) == len(items) and batches, 240)
+    all_done_ms = (time.perf_counter() - started) * 1000
+    results = [item.conversion for item in items if item.conversion and item.conversion["ok"]]
+    batch = batches[-1]
+    return {"jobs": len(items), "convert_workers": converter.workers, "converted_ok": len(results),
+            "mp3_files": sum(1 for item in items if (item.output_file or "").endswith(".mp3")
+                             and os.path.exists(item.output_file)),
+            "downloads_done_ms": round((max(downloads_done) - started) * 1000, 1) if downloads_done else None,
+            "all_done_ms": round(all_done_ms, 1),
+            "convert_median_ms": round(statistics.median(r["seconds"] for r in results) * 1000, 1) if results else None,
+            "file_realtime_median": statistics.median(r["realtime"] for r in results) if results else None,
+            "batch_files_per_minute": batch["files_per_minute"], "batch_realtime": batch["realtime"]}
+
+
+def child_nice_levels():
+    """Nice levels of this process's children, from /proc; empty elsewhere"""
+    levels = []
+    for pid in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                fields = f.read().rpartition(")")[2].split()
+        except (OSError, ValueError):
+            continue
+        if pid.isdigit() and int(fields[1]) == os.getpid():
+            levels.append(int(fields[16]))
+    return levels
+
+
+@scenario("background_load", {"download_size": 64 * 1024 * 1024, "progress_lines": 400, "progress_rate": 20,
+                              "busy": 0.5}, timeout=180)
+def run_background_load(app, window):
+    """10 downloads whose stand-ins each keep half a CPU busy, with the normal and then the background
+    launch profile: GUI event-loop latency, time of a fixed CPU task in another process, children's nice"""
+    import threading
+    manager = window.download_manager
+    runner = window.download_runner
+    manager.max_concurrent = 10
+    window.tabs.setCurrentIndex(1)
+    result = {}
+
+    def foreground_task():
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "sum(i * i for i in range(3000000))"], check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    for phase in ("normal", "background"):
+        runner.launch_profile = phase
+        items = [make_item(index, os.getcwd()) for index in range(len(result) * 10, len(result) * 10 + 10)]
+        for item in items:
+            manager.add_to_queue(item)
+        wait_until(app, lambda: all(item.metrics.bytes_transferred for item in items), 30)
+        probe = LatencyProbe()
+        probe.start()
+        timings = []
+        task = threading.Thread(target=foreground_task)
+        task.start()
+        wait_until(app, lambda: not task.is_alive(), 60)
+        spin(app, max(0.0, 3 - timings[0] / 1000))
+        probe.stop()
+        nice = child_nice_levels()
+        for item in items:
+            manager.cancel_download(item.id)
+        spin(app, 0.5)
+        latency = probe.summary()
+        result[phase] = {"loop_p99_ms": latency["p99"], "loop_max_ms": latency["max"],
+                         "stalls_over_50ms": latency["stalls_over_50ms"], "foreground_task_ms": round(timings[0], 1),
+                         "child_nice_min": min(nice) if nice else None}
+    return result
+
+
+@scenario("memory_footprint", {"format_count": 300, "payload_size": 0})
+def run_memory_footprint(app, window):
+    """Traced bytes per queued item (after one progress update) and per format table row"""
+    import gc
+    import tracemalloc
+    from procio import parse_download_line
+    from fake_yt_dlp import load_config, make_info
+    import random
+
+    count = 20000
+    manager = window.download_manager
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = []
+    for index in range(count):
+        item = make_item(index, os.getcwd())
+        item.id = str(index + 1)
+        # One progress line through the runner, as a running download would see
+        line = (f"[download]  {index % 100}.5% of ~  {index % 500 + 1}.{index % 100:02d}MiB "
+                f"at  {index % 9 + 1}.{index % 97:02d}MiB/s ETA 00:10")
+        manager.active_downloads[item.id] = item
+        window.download_runner._on_process_records(item.id, item.process, parse_download_line(line))
+        del manager.active_downloads[item.id]
+        items.append(item)
+    gc.collect()
+    item_bytes = (tracemalloc.get_traced_memory()[0] - before) / count
+
+    formats = make_info(dict(load_config(), format_count=300, payload_size=0), random.Random(1), "")["formats"]
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    window.format_model.set_formats(formats)
+    gc.collect()
+    row_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(formats)
+    tracemalloc.stop()
+    return {"items": count, "bytes_per_item": round(item_bytes), "bytes_per_format_row": round(row_bytes)}
+
+
+def write_history(count):
+    os.makedirs("Saves", exist_ok=True)
+    entries = [{
+        "title": f"History entry {i}",
+        "url": f"https://www.youtube.com/watch?v=hist{i:07d}",
+        "format_id": "best",
+        "format_type": "best",
+        "output_path": f"/downloads/History entry {i}.mkv",
+        "status": "Completed" if i % 10 else "Failed",
+        "added_time": "2025-09-07T19:20:00",
+        "start_time": "2025-09-07T19:20:01",
+        "end_time": "2025-09-07T19:24:31",
+        "file_size": "123.45MiB",
+        "retry_count": i % 3,
+    } for i in range(count)]
+    with open("Saves/download_history.json", "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+
+
+@scenario("history_100k", {}, timeout=300)
+def run_history_100k(app, window):
+    """100k-entry history: open the History tab until fully rendered, then record one download"""
+    started = time.perf_counter()
+    window.tabs.setCurrentIndex(2)
+    total = len(window.download_history.history)
+    wait_until(app, lambda: window.history_table is not None
+               and window.history_table.rowCount() == total
+               and window.history_table.item(total - 1, 0) is not None, 240)
+    render_ms = (time.perf_counter() - started) * 1000
+
+    item = make_item(0, os.getcwd())
+    item.status = "Completed"
+    started = time.perf_counter()
+    window.download_history.add_item(item)
+    add_ms = (time.perf_counter() - started) * 1000
+    return {"entries": total, "history_render_ms": round(render_ms, 1), "history_add_item_ms": round(add_ms, 1)}
+
+
+SCENARIO_SETUP = {
+    "history_100k": lambda: write_history(100000),
+}
+
+
+def run_child(name):
+    """Executed inside the per-scenario child process"""
+    sys.path.insert(0, REPO_ROOT)
+    spec = SCENARIOS[name]
+    os.environ["FAKE_YTDLP_CONFIG"] = json.dumps(spec["config"])
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["VDM_CONTROL_NAME"] = f"vdm-bench-{os.getpid()}"
+
+    setup = SCENARIO_SETUP.get(name)
+    if setup:
+        setup()
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    launcher = make_launcher(os.getcwd())
+
+    started = time.perf_counter()
+    window = create_window(app, launcher)
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    probe = LatencyProbe()
+    cpu_before = time.process_time()
+    children_before = children_cpu_seconds()
+    wall_before = time.perf_counter()
+    probe.start()
+    extra = spec["func"](app, window)
+    probe.stop()
+    wall = time.perf_counter() - wall_before
+    cpu = time.process_time() - cpu_before
+
+    window.cancel_all_downloads()
+    spin(app, 0.2)
+    children_after = children_cpu_seconds()
+
+    result = {
+        "scenario": name,
+        "startup_ms": round(startup_ms, 1),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "children_cpu_s": round(children_after - children_before, 3) if children_before is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+        "loop_latency_ms": probe.summary(),
+    }
+    result.update(extra)
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    window.hide()
+    os._exit(0)
+
+
+def run_scenario_once(name, visible):
+    workdir = tempfile.mkdtemp(prefix=f"vdm-bench-{name}-")
+    env = dict(os.environ)
+    if not visible:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=SCENARIOS[name]["timeout"] + 30
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{name} failed (exit {completed.returncode}):\n{completed.stderr[-2000:]}")
+
+
+def flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def median_result(runs):
+    flats = [flatten(run) for run in runs]
+    keys = flats[0].keys()
+    return {key: round(statistics.median(flat[key] for flat in flats if key in flat), 3) for key in keys}
+
+
+def environment():
+    try:
+        from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+    except ImportError:
+        QT_VERSION_STR = PYQT_VERSION_STR = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def config_hash(name):
+    with open(STUB_PATH, "rb") as f:
+        stub = f.read()
+    return hashlib.sha1(stub + json.dumps(SCENARIOS[name]["config"], sort_keys=True).encode()).hexdigest()[:12]
+
+
+def print_report(results, baseline=None):
+    for name, data in results.items():
+        print(f"\n{name}  ({data['repeats']} runs, stub config {data['config_hash']})")
+        base = (baseline or {}).get("scenarios", {}).get(name, {}).get("median", {})
+        for key, value in data["median"].items():
+            line = f"  {key:<32} {value:>12}"
+            if key in base and base[key]:
+                change = (value - base[key]) / base[key] * 100
+                line += f"   {change:+7.1f}% vs {base[key]}"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VDM benchmark suite")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default=None, help="Result file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    parser.add_argument("--visible", action="store_true", help="Use the real display instead of offscreen")
+    parser.add_argument("--list", action="store_true", help="List scenarios")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child)
+        return 0
+
+    if args.list:
+        for name, spec in SCENARIOS.items():
+            print(f"{name:<18} {spec['doc']}")
+        return 0
+
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    for name in names:
+        runs = []
+        for repeat in range(args.repeat):
+            print(f"[{name}] run {repeat + 1}/{args.repeat}", flush=True)
+            runs.append(run_scenario_once(name, args.visible))
+        results[name] = {
+            "repeats": args.repeat,
+            "config_hash": config_hash(name),
+            "stub_config": SCENARIOS[name]["config"],
+            "median": median_result(runs),
+            "runs": runs,
+        }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"created": datetime.now().isoformat(), "environment": environment(), "scenarios": results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
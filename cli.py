@@ -0,0 +1,659 @@
+"""Headless VDM entry point.
+
+    python cli.py run [--exit-when-done]        process the queue file unattended
+    python cli.py enqueue URL [-f FORMAT] [-o OUTPUT]
+    python cli.py status
+    python cli.py wait [--timeout SECONDS]
+    python cli.py export FILE.csv|FILE.jsonl|FILE.json
+    python cli.py worker HOST:PORT [-c N]       run jobs for a coordinator, see cluster.py
+
+Talking to a running GUI or daemon through its control API (see control.py):
+
+    python cli.py submit URL [URL ...] [-f FORMAT] [--priority N]
+    python cli.py list
+    python cli.py cancel ID [ID ...] | --all
+    python cli.py pause ID [ID ...] | --all     hold downloads until resumed
+    python cli.py resume ID [ID ...] | --all
+    python cli.py prioritize ID [ID ...] PRIORITY
+    python cli.py watch
+    python cli.py metrics
+    python cli.py workers
+    python cli.py schedule                      projected start/finish, see schedule.py
+    python cli.py subscriptions --poll          poll followed feeds now, see subscriptions.py
+
+Followed channels and playlists (picked up by a running instance within a minute):
+
+    python cli.py subscribe URL [--every MINUTES] [-f FORMAT_OR_PROFILE] [-o OUTPUT]
+    python cli.py unsubscribe URL_OR_NAME
+    python cli.py subscriptions
+
+"enqueue", "status" and "wait" don't import Qt at all; the rest only need
+QtCore/QtNetwork, never QtWidgets.
+"""
+import time
+_START_TIME = time.perf_counter()
+
+import os
+import sys
+import json
+import signal
+import argparse
+from datetime import datetime
+from schedule import SCHEDULE_FILE
+
+DEFAULT_QUEUE_FILE = "Saves/queue.jsonl"
+DEFAULT_STATUS_FILE = "Saves/daemon_status.json"
+DEFAULT_OUTPUT_TEMPLATE = os.path.join(os.path.expanduser("~"), "Downloads", "%(title)s.%(ext)s")
+# The daemon rewrites its status file at least every few seconds; older than
+# this and it is considered gone
+STATUS_STALE_AFTER = 15
+
+
+def append_queue_entry(queue_file, entry):
+    folder = os.path.dirname(queue_file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(queue_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def read_status(status_file):
+    try:
+        with open(status_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def status_age(status):
+    if status.get("stopped"):
+        return float("inf")
+    try:
+        return (datetime.now() - datetime.fromisoformat(status["updated"])).total_seconds()
+    except (KeyError, ValueError):
+        return float("inf")
+
+
+def cmd_run(args):
+    from PyQt6.QtCore import QCoreApplication, QTimer
+    from daemon import HeadlessDaemon
+
+    app = QCoreApplication(sys.argv[:1])
+    daemon = HeadlessDaemon(
+        queue_file=args.queue_file,
+        status_file=args.status_file,
+        max_concurrent=args.concurrent,
+        yt_dlp_path=args.yt_dlp,
+        ffmpeg_path=args.ffmpeg,
+        output_template=args.output,
+        exit_when_done=args.exit_when_done,
+        verbose=args.verbose,
+        control=not args.no_control,
+        metrics_port=args.metrics_port,
+        coordinator_port=args.coordinator_port,
+        coordinator_host=args.coordinator_host,
+        segmented=args.segmented,
+        verify=not args.no_verify,
+        schedule_file=args.schedule,
+        convert_workers=args.convert_workers,
+        launch_profile=args.launch_profile
+    )
+
+    exit_code = {"value": 0}
+
+    def on_finished(all_ok):
+        exit_code["value"] = 0 if all_ok else 1
+        app.quit()
+
+    daemon.finished.connect(on_finished)
+
+    # Qt's event loop doesn't return to the interpreter on its own, so wake it
+    # up periodically to let Python deliver SIGINT/SIGTERM
+    signal.signal(signal.SIGINT, lambda *a: daemon.shutdown())
+    signal.signal(signal.SIGTERM, lambda *a: daemon.shutdown())
+    wakeup = QTimer()
+    wakeup.timeout.connect(lambda: None)
+    wakeup.start(250)
+
+    daemon.start()
+    daemon.log(f"[DAEMON] Ready in {(time.perf_counter() - _START_TIME) * 1000:.0f} ms, "
+               f"watching {args.queue_file}")
+    app.exec()
+    return exit_code["value"]
+
+
+def cmd_worker(args):
+    from PyQt6.QtCore import QCoreApplication, QTimer
+    from cluster import WorkerAgent
+    from procio import process_hub
+
+    host, _, port = args.coordinator.rpartition(":")
+    if not host or not port.isdigit():
+        print("Coordinator must be given as HOST:PORT")
+        return 2
+
+    app = QCoreApplication(sys.argv[:1])
+    agent = WorkerAgent(host, int(port), capacity=args.concurrent, prefetch=args.prefetch, name=args.name,
+                        token=args.token, yt_dlp_path=args.yt_dlp, ffmpeg_path=args.ffmpeg,
+                        output_template=args.output, segmented=args.segmented, verify=not args.no_verify,
+                        convert_workers=args.convert_workers, launch_profile=args.launch_profile)
+
+    def log(message):
+        print(f"{datetime.now().strftime('%H:%M:%S')} {message.strip()}", flush=True)
+
+    agent.log_message.connect(log)
+    if args.verbose:
+        agent.download_runner.log_message.connect(log)
+
+    exit_code = {"value": 0}
+
+    def on_stopped(reason):
+        exit_code["value"] = 1 if reason else 0
+        process_hub().shutdown()
+        app.quit()
+
+    agent.stopped.connect(on_stopped)
+    signal.signal(signal.SIGINT, lambda *a: agent.shutdown())
+    signal.signal(signal.SIGTERM, lambda *a: agent.shutdown())
+    wakeup = QTimer()
+    wakeup.timeout.connect(lambda: None)
+    wakeup.start(250)
+
+    agent.start()
+    log(f"[WORKER] {agent.name} connecting to {host}:{port}, capacity {args.concurrent}")
+    app.exec()
+    return exit_code["value"]
+
+
+def connect_control():
+    from PyQt6.QtCore import QCoreApplication
+    from control import ControlClient
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    client = ControlClient()
+    if not client.connect():
+        print("No running VDM instance found")
+        return app, None
+    return app, client
+
+
+def print_response(response):
+    if not response.get("ok"):
+        print(f"Error: {response.get('error')}")
+        return 1
+    return 0
+
+
+def cmd_submit(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    items = []
+    for url in args.urls:
+        entry = {"url": url, "priority": args.priority}
+        if args.format:
+            entry["format"] = args.format
+        if args.output:
+            entry["output_path"] = args.output
+        if args.launch_profile:
+            entry["launch_profile"] = args.launch_profile
+        try:
+            add_time_window(entry, args)
+            add_audio_options(entry, args)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        items.append(entry)
+    response = client.request("enqueue", items=items)
+    if response.get("ok"):
+        print(f"Queued as {', '.join(response['item_ids'])}")
+    return print_response(response)
+
+
+def cmd_list(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    response = client.request("list")
+    if args.json:
+        print(json.dumps(response, indent=2, ensure_ascii=False))
+        return print_response(response)
+    for item in response.get("items", []):
+        print(f"  [{item['id']}] {item['status']:<28} {item['progress']:>3}%  p{item['priority']:<3} {item['title']}")
+    return print_response(response)
+
+
+def print_bulk_response(response, verb):
+    if response.get("ok"):
+        print(f"{verb} {len(response['item_ids'])} item(s)")
+        if response["skipped"]:
+            print(f"Skipped: {', '.join(response['skipped'])}")
+    return print_response(response)
+
+
+def bulk_command(cmd, verb):
+    """cancel/pause/resume: all the ids go in one request, which the instance applies as one batch"""
+    def run(args):
+        if not args.item_ids and not args.all:
+            print("Error: give item ids or --all", file=sys.stderr)
+            return 2
+        app, client = connect_control()
+        if client is None:
+            return 2
+        request = {"all": True} if args.all else {"item_ids": args.item_ids}
+        return print_bulk_response(client.request(cmd, **request), verb)
+    return run
+
+
+cmd_cancel = bulk_command("cancel", "Cancelled")
+cmd_pause = bulk_command("pause", "Paused")
+cmd_resume = bulk_command("resume", "Resumed")
+
+
+def cmd_prioritize(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    priorities = {item_id: args.priority for item_id in args.item_ids}
+    return print_bulk_response(client.request("reprioritize", priorities=priorities), "Reprioritized")
+
+
+def cmd_watch(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    response = client.request("subscribe")
+    for item in response.get("items", []):
+        print(f"[{item['id']}] {item['status']} {item['progress']}%  {item['title']}")
+    try:
+        for event in client.events():
+            if args.json:
+                print(json.dumps(event, ensure_ascii=False), flush=True)
+            elif event["event"] == "progress":
+                print(f"[{event['item_id']}] {event['status']} {event['progress']}% {event['speed']}", flush=True)
+            else:
+                print(f"[{event['item_id']}] {event['event']}: "
+                      + ", ".join(f"{k}={v}" for k, v in event.items() if k not in ("event", "item_id")), flush=True)
+    except (ConnectionError, KeyboardInterrupt):
+        pass
+    return 0
+
+
+def cmd_metrics(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    response = client.request("metrics")
+    if response.get("ok"):
+        print(response["text"], end="")
+    return print_response(response)
+
+
+def cmd_workers(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    response = client.request("workers")
+    if args.json:
+        print(json.dumps(response, indent=2, ensure_ascii=False))
+        return print_response(response)
+    for worker in response.get("workers", []):
+        print(f"  {worker['name']:<24} {worker['address']:<22} {worker['running']}/{worker['capacity']} running, "
+              f"{worker['backlog']} queued, {worker['speed_bps'] / 1048576:.2f} MiB/s now, "
+              f"{worker['average_bps'] / 1048576:.2f} MiB/s avg, {worker['completed']} done, {worker['failed']} failed")
+    return print_response(response)
+
+
+def cmd_schedule(args):
+    app, client = connect_control()
+    if client is None:
+        return 2
+    response = client.request("schedule", limit=args.limit)
+    if args.json:
+        print(json.dumps(response, indent=2, ensure_ascii=False))
+        return print_response(response)
+    if response.get("ok"):
+        if response["window"]:
+            text = f"Window: {response['window']}"
+        elif response["windows"]:
+            text = "Outside all windows, nothing runs"
+        else:
+            text = f"No schedule, {response['slots']} at once"
+        print(text + (f", next change at {response['next_change'][11:16]}" if response["next_change"] else ""))
+    for item in response.get("items", []):
+        start = item["start"][5:16].replace("T", " ") if item["start"] else "?"
+        finish = item["finish"][5:16].replace("T", " ") if item["finish"] else "?"
+        print(f"  [{item['id']}] {start:<11} -> {finish:<11} {item['status']:<24} {item['title']}")
+    return print_response(response)
+
+
+def cmd_subscribe(args):
+    from subscriptions import Subscription, load_subscriptions, save_subscriptions
+    try:
+        subscriptions = load_subscriptions()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    subscription = Subscription(args.url, args.name, args.every, args.format, args.output, args.priority,
+                                args.initial, args.max_age_days, not args.no_stop_at_known)
+    subscriptions = [s for s in subscriptions if s.url != args.url] + [subscription]
+    save_subscriptions(subscriptions)
+    print(f"Subscribed to {subscription.name}, polled every {args.every} min")
+    return 0
+
+
+def cmd_unsubscribe(args):
+    from subscriptions import load_subscriptions, save_subscriptions
+    try:
+        subscriptions = load_subscriptions()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    remaining = [s for s in subscriptions if args.subscription not in (s.url, s.name)]
+    if len(remaining) == len(subscriptions):
+        print(f"Error: not subscribed to {args.subscription}", file=sys.stderr)
+        return 1
+    save_subscriptions(remaining)
+    print(f"Unsubscribed from {args.subscription}")
+    return 0
+
+
+def cmd_subscriptions(args):
+    if args.poll:
+        app, client = connect_control()
+        if client is None:
+            return 2
+        return print_response(client.request("poll", **({"url": args.poll} if args.poll != "all" else {})))
+    from subscriptions import SUBSCRIPTION_STATE, load_subscriptions
+    try:
+        subscriptions = load_subscriptions()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    state = read_status(SUBSCRIPTION_STATE) or {}
+    if args.json:
+        print(json.dumps([dict(s.to_dict(), **state.get(s.url, {})) for s in subscriptions], indent=2,
+                         ensure_ascii=False))
+        return 0
+    for subscription in subscriptions:
+        polled = state.get(subscription.url)
+        last = (f"checked {polled['last_checked'].replace('T', ' ')}, {polled['last_new']} new of "
+                f"{polled['last_seen']} listed" + (f", {polled['error']}" if polled.get("error") else "")
+                if polled else "not polled yet")
+        print(f"  {subscription.name:<30} every {subscription.every:>4} min  {subscription.format or 'best':<18} "
+              f"{last}")
+    return 0
+
+
+def add_time_window(entry, args):
+    from schedule import parse_time
+    for key in ("start_after", "finish_before"):
+        value = getattr(args, key)
+        if value:
+            # Fail here rather than have the daemon skip the line
+            parse_time(value)
+            entry[key] = value
+
+
+def add_audio_options(entry, args):
+    from audioformats import validate_audio_format
+    if args.audio:
+        validate_audio_format(args.audio)
+        entry["audio_format"] = args.audio
+    if args.loudnorm:
+        if not args.audio:
+            raise ValueError("--loudnorm needs --audio FORMAT")
+        entry["loudnorm"] = True
+
+
+def cmd_enqueue(args):
+    entry = {"url": args.url, "added": datetime.now().isoformat()}
+    if args.format:
+        entry["format"] = args.format
+    if args.output:
+        entry["output_path"] = args.output
+    if args.title:
+        entry["title"] = args.title
+    if args.launch_profile:
+        entry["launch_profile"] = args.launch_profile
+    try:
+        add_time_window(entry, args)
+        add_audio_options(entry, args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    append_queue_entry(args.queue_file, entry)
+    print(f"Queued {args.url}")
+    return 0
+
+
+def cmd_status(args):
+    status = read_status(args.status_file)
+    if status is None:
+        print("No daemon status found")
+        return 1
+
+    age = status_age(status)
+    if age < STATUS_STALE_AFTER:
+        state = "running"
+    elif status.get("stopped"):
+        state = f"stopped at {status.get('updated')}"
+    else:
+        state = f"not running (last update {int(age)}s ago)"
+    print(f"Daemon {status.get('pid')}: {state}")
+
+    if args.json:
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0
+
+    items = status.get("items", [])
+    results = status.get("results", [])
+    print(f"{len(items)} pending, {len(results)} finished")
+    for item in items:
+        line = f"  [{item['id']}] {item['status']:<28} {item['progress']:>3}%"
+        if item.get("speed"):
+            line += f" {item['speed']}"
+        print(f"{line}  {item['title']}")
+    for result in results[:args.recent]:
+        print(f"  [{result['id']}] {result['status']:<28}       {result['title']}")
+    return 0
+
+
+def cmd_wait(args):
+    deadline = time.time() + args.timeout if args.timeout else None
+    queue_size = os.path.getsize(args.queue_file) if os.path.exists(args.queue_file) else 0
+
+    while True:
+        status = read_status(args.status_file)
+        alive = status is not None and status_age(status) < STATUS_STALE_AFTER
+        if (alive or (status or {}).get("stopped")) and not status.get("items") \
+                and status.get("queue_offset", 0) >= queue_size:
+            results = status.get("results", [])
+            failed = [r for r in results if r["status"] not in ("Completed", "Cancelled")]
+            cancelled = sum(1 for r in results if r["status"] == "Cancelled")
+            print(f"Queue drained, {len(failed)} failed" + (f", {cancelled} cancelled" if cancelled else ""))
+            return 1 if failed else 0
+        if not alive and deadline is None:
+            print("Daemon is not running")
+            return 2
+
+        if deadline is not None and time.time() >= deadline:
+            print("Timed out waiting for the queue to drain")
+            return 3
+        time.sleep(args.interval)
+
+
+def cmd_export(args):
+    from core import DownloadHistory
+
+    history = DownloadHistory(args.history_file)
+    history.export(args.path)
+    print(f"Exported {len(history.history)} entries to {args.path}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vdm", description="VDM headless download manager")
+    parser.add_argument("--queue-file", default=DEFAULT_QUEUE_FILE)
+    parser.add_argument("--status-file", default=DEFAULT_STATUS_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Process the queue file without the GUI")
+    run.add_argument("-c", "--concurrent", type=int, default=3)
+    run.add_argument("--yt-dlp", default=None, help="Path to yt-dlp (default: bundled, then PATH)")
+    run.add_argument("--ffmpeg", default=None, help="Path to ffmpeg (default: bundled, then PATH)")
+    run.add_argument("-o", "--output", default=DEFAULT_OUTPUT_TEMPLATE,
+                     help="Default yt-dlp output template for entries without one")
+    run.add_argument("--exit-when-done", action="store_true", help="Exit once the queue file is drained")
+    run.add_argument("-v", "--verbose", action="store_true", help="Echo yt-dlp output")
+    run.add_argument("--no-control", action="store_true", help="Don't start the local control API")
+    run.add_argument("--metrics-port", type=int, default=int(os.environ.get("VDM_METRICS_PORT") or 0),
+                     help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (default: off)")
+    run.add_argument("--coordinator-port", type=int, default=int(os.environ.get("VDM_COORDINATOR_PORT") or 0),
+                     help="Hand queued jobs to remote workers connecting on PORT (default: off)")
+    run.add_argument("--coordinator-host", default=os.environ.get("VDM_COORDINATOR_HOST", ""),
+                     help="Address to accept workers on (default: all)")
+    run.add_argument("--segmented", action="store_true",
+                     help="Fetch single-file http(s) formats over parallel ranged connections")
+    run.add_argument("--schedule", default=SCHEDULE_FILE,
+                     help="Download windows with their own limits, reloaded when changed (see schedule.py)")
+    run.add_argument("--no-verify", action="store_true",
+                     help="Don't size-check, hash and ffprobe finished files")
+    run.add_argument("--convert-workers", type=int, default=None,
+                     help="ffmpeg processes for audio conversion (default: one per CPU)")
+    run.add_argument("--launch-profile", default=None, metavar="NAME",
+                     help="OS priorities of yt-dlp/ffmpeg: normal, background or one from "
+                          "Saves/launch_profiles.json (default: $VDM_LAUNCH_PROFILE or normal)")
+    run.set_defaults(func=cmd_run)
+
+    worker = sub.add_parser("worker", help="Run downloads for a coordinator on another machine")
+    worker.add_argument("coordinator", help="HOST:PORT of the coordinator")
+    worker.add_argument("-c", "--concurrent", type=int, default=3, help="Downloads to run at once")
+    worker.add_argument("--prefetch", type=int, default=1, help="Jobs to hold beyond the running ones")
+    worker.add_argument("--name", default=None, help="Worker name (default: host-pid)")
+    worker.add_argument("--token", default=os.environ.get("VDM_CLUSTER_TOKEN", ""),
+                        help="Shared secret, must match the coordinator's VDM_CLUSTER_TOKEN")
+    worker.add_argument("--yt-dlp", default=None, help="Path to yt-dlp (default: bundled, then PATH)")
+    worker.add_argument("--ffmpeg", default=None, help="Path to ffmpeg (default: bundled, then PATH)")
+    worker.add_argument("-o", "--output", default=None,
+                        help="Output template on this machine (default: the one sent with each job)")
+    worker.add_argument("--segmented", action="store_true",
+                        help="Fetch single-file http(s) formats over parallel ranged connections")
+    worker.add_argument("--no-verify", action="store_true",
+                        help="Don't size-check, hash and ffprobe finished files")
+    worker.add_argument("--convert-workers", type=int, default=None,
+                        help="ffmpeg processes for audio conversion (default: one per CPU)")
+    worker.add_argument("--launch-profile", default=None, metavar="NAME",
+                        help="OS priorities of yt-dlp/ffmpeg: normal, background or one from "
+                             "Saves/launch_profiles.json (default: $VDM_LAUNCH_PROFILE or normal)")
+    worker.add_argument("-v", "--verbose", action="store_true", help="Echo yt-dlp output")
+    worker.set_defaults(func=cmd_worker)
+
+    enqueue = sub.add_parser("enqueue", help="Append a download to the queue file")
+    enqueue.add_argument("url")
+    enqueue.add_argument("-f", "--format", default=None, help="yt-dlp format selector")
+    enqueue.add_argument("-o", "--output", default=None, help="Output path or template")
+    enqueue.add_argument("--title", default=None)
+    enqueue.add_argument("--start-after", default=None, help="Only download after this time of day (HH:MM)")
+    enqueue.add_argument("--finish-before", default=None, help="Pause at this time of day (HH:MM)")
+    enqueue.add_argument("--audio", default=None, metavar="FORMAT",
+                         help="Download the best audio and convert it to mp3, opus, m4a or flac")
+    enqueue.add_argument("--loudnorm", action="store_true", help="Normalize loudness while converting")
+    enqueue.add_argument("--launch-profile", default=None, metavar="NAME",
+                         help="OS priorities for this download's processes (default: the daemon's)")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    status = sub.add_parser("status", help="Show the daemon's queue")
+    status.add_argument("--json", action="store_true")
+    status.add_argument("--recent", type=int, default=10)
+    status.set_defaults(func=cmd_status)
+
+    wait = sub.add_parser("wait", help="Block until the queue is drained")
+    wait.add_argument("--timeout", type=float, default=0)
+    wait.add_argument("--interval", type=float, default=2)
+    wait.set_defaults(func=cmd_wait)
+
+    export = sub.add_parser("export", help="Export download history with per-job metrics")
+    export.add_argument("path", help="Output file, format picked by extension (.csv, .jsonl, .json)")
+    export.add_argument("--history-file", default="Saves/download_history.json")
+    export.set_defaults(func=cmd_export)
+
+    submit = sub.add_parser("submit", help="Add downloads to the running instance")
+    submit.add_argument("urls", nargs="+")
+    submit.add_argument("-f", "--format", default=None, help="yt-dlp format selector")
+    submit.add_argument("-o", "--output", default=None, help="Output path or template")
+    submit.add_argument("-p", "--priority", type=int, default=0)
+    submit.add_argument("--start-after", default=None, help="Only download after this time of day (HH:MM)")
+    submit.add_argument("--finish-before", default=None, help="Pause at this time of day (HH:MM)")
+    submit.add_argument("--audio", default=None, metavar="FORMAT",
+                        help="Download the best audio and convert it to mp3, opus, m4a or flac")
+    submit.add_argument("--loudnorm", action="store_true", help="Normalize loudness while converting")
+    submit.add_argument("--launch-profile", default=None, metavar="NAME",
+                        help="OS priorities for these downloads' processes (default: the instance's)")
+    submit.set_defaults(func=cmd_submit)
+
+    list_cmd = sub.add_parser("list", help="List the running instance's queue")
+    list_cmd.add_argument("--json", action="store_true")
+    list_cmd.set_defaults(func=cmd_list)
+
+    for name, func, help_text in (("cancel", cmd_cancel, "Cancel queued or running downloads"),
+                                  ("pause", cmd_pause, "Hold queued or running downloads until resumed"),
+                                  ("resume", cmd_resume, "Queue paused downloads again")):
+        bulk = sub.add_parser(name, help=help_text)
+        bulk.add_argument("item_ids", nargs="*")
+        bulk.add_argument("--all", action="store_true", help=f"{name.title()} every item")
+        bulk.set_defaults(func=func)
+
+    prioritize = sub.add_parser("prioritize", help="Change queued items' priority (higher runs first)")
+    prioritize.add_argument("item_ids", nargs="+")
+    prioritize.add_argument("priority", type=int)
+    prioritize.set_defaults(func=cmd_prioritize)
+
+    watch = sub.add_parser("watch", help="Stream progress events from the running instance")
+    watch.add_argument("--json", action="store_true")
+    watch.set_defaults(func=cmd_watch)
+
+    metrics = sub.add_parser("metrics", help="Print the running instance's metrics (Prometheus format)")
+    metrics.set_defaults(func=cmd_metrics)
+
+    workers = sub.add_parser("workers", help="Show the remote workers of the running coordinator")
+    workers.add_argument("--json", action="store_true")
+    workers.set_defaults(func=cmd_workers)
+
+    schedule = sub.add_parser("schedule", help="Show the current window and projected start/finish times")
+    schedule.add_argument("--limit", type=int, default=50, help="Items to show")
+    schedule.add_argument("--json", action="store_true")
+    schedule.set_defaults(func=cmd_schedule)
+
+    subscribe = sub.add_parser("subscribe", help="Follow a channel or playlist, new uploads are queued")
+    subscribe.add_argument("url")
+    subscribe.add_argument("--name", default=None)
+    subscribe.add_argument("--every", type=int, default=360, help="Minutes between polls")
+    subscribe.add_argument("-f", "--format", default=None, help="Format profile name or yt-dlp format selector")
+    subscribe.add_argument("-o", "--output", default=None, help="Output path template")
+    subscribe.add_argument("-p", "--priority", type=int, default=0)
+    subscribe.add_argument("--initial", type=int, default=10, help="Newest entries to queue on the first poll")
+    subscribe.add_argument("--max-age-days", type=int, default=None, help="Skip entries older than this")
+    subscribe.add_argument("--no-stop-at-known", action="store_true",
+                           help="List the whole feed every time, for playlists that grow at the end")
+    subscribe.set_defaults(func=cmd_subscribe)
+
+    unsubscribe = sub.add_parser("unsubscribe", help="Stop following a channel or playlist")
+    unsubscribe.add_argument("subscription", help="URL or name")
+    unsubscribe.set_defaults(func=cmd_unsubscribe)
+
+    subscriptions = sub.add_parser("subscriptions", help="List followed channels and playlists")
+    subscriptions.add_argument("--poll", nargs="?", const="all", default=None,
+                               help="Ask the running instance to poll all feeds (or the given URL) now")
+    subscriptions.add_argument("--json", action="store_true")
+    subscriptions.set_defaults(func=cmd_subscriptions)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
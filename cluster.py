@@ -0,0 +1,657 @@
+"""Coordinator/worker mode, for spreading one queue over several machines.
+
+One instance (the GUI or the daemon) owns the queue and the history and runs
+a Coordinator on a TCP port (VDM_COORDINATOR_PORT, or --coordinator-port for
+the daemon). Worker agents (`python cli.py worker HOST:PORT`) connect,
+advertise how many downloads they run at once, pull jobs, run them with their
+own DownloadManager/DownloadRunner and stream progress and results back.
+Messages are newline-delimited JSON objects, as on the control socket:
+
+    worker -> coordinator
+    {"msg": "hello", "name": "box-2", "capacity": 3, "prefetch": 1, "token": "..."}
+    {"msg": "pull", "slots": 4}          wants up to this many jobs assigned at once
+    {"msg": "started", "item_id": "7"}
+    {"msg": "progress", "item_id": "7", "progress": 42, "status": "Downloading",
+     "speed_bps": 1048576, "size_bytes": 52428800, "bytes": 22020096}
+    {"msg": "finished", "item_id": "7", "success": false, "failure_class": "transient", "error": "..."}
+    {"msg": "revoked", "item_id": "7", "ok": true}
+    {"msg": "heartbeat"}
+
+    coordinator -> worker
+    {"msg": "welcome", "name": "box-2", "heartbeat": 5}, or {"msg": "rejected", "error": "..."}
+    {"msg": "job", "item": {...}}        an item_from_entry() entry plus the item's "id"
+    {"msg": "cancel", "item_id": "7"}
+    {"msg": "revoke", "item_id": "7"}    hand back a job that hasn't started yet
+    {"msg": "heartbeat"}
+
+Assigned items stay in the coordinator's active_downloads with a RemoteJob
+as their process handle, so cancelling, retries, the circuit breaker, metrics
+and history work as they do for local downloads. Workers don't retry; they
+report the failure class and the coordinator decides.
+
+Workers keep `prefetch` jobs beyond their capacity so the next download
+starts without a round trip. When the queue runs dry and a worker has idle
+slots, the coordinator steals a job that hasn't started from the worker with
+the longest backlog. A worker that has been silent for HEARTBEAT_TIMEOUT
+seconds, or whose connection drops, is dropped and its jobs go back to the
+front of the queue; a worker that loses the coordinator cancels its jobs and
+reconnects.
+
+Set VDM_CLUSTER_TOKEN on both sides to make workers authenticate.
+"""
+import os
+import hmac
+import json
+import time
+import platform
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QAbstractSocket, QHostAddress, QTcpServer, QTcpSocket
+from core import DownloadManager, DownloadRunner, HostCircuitBreaker, item_from_entry
+from metrics import JobMetrics
+from audio import CONVERT_WORKERS
+
+COORDINATOR_PORT = int(os.environ.get("VDM_COORDINATOR_PORT") or 0)
+COORDINATOR_HOST = os.environ.get("VDM_COORDINATOR_HOST", "")
+CLUSTER_TOKEN = os.environ.get("VDM_CLUSTER_TOKEN", "")
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_TIMEOUT = 15
+PROGRESS_FLUSH_INTERVAL = 250
+WORKER_PREFETCH = 1
+RECONNECT_DELAY = 2
+MAX_RECONNECT_DELAY = 30
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+def send_message(socket, payload):
+    if socket.state() == QAbstractSocket.SocketState.ConnectedState:
+        socket.write((json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+
+def read_messages(buffer):
+    """The complete messages in buffer and the incomplete rest; malformed lines are dropped"""
+    messages = []
+    while b"\n" in buffer:
+        line, buffer = buffer.split(b"\n", 1)
+        if not line.strip():
+            continue
+        try:
+            message = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(message, dict):
+            messages.append(message)
+    return messages, buffer
+
+
+def job_entry(item):
+    """What a worker needs to rebuild the item with item_from_entry()"""
+    return {
+        "id": item.id,
+        "url": item.url,
+        "format": item.format_selector,
+        "format_type": item.format_type,
+        "output_path": item.output_path,
+        "title": item.title,
+        "priority": item.priority,
+        "retry_count": item.retry_count,
+        "resume": item.resume,
+        "audio_format": item.audio_format,
+        "loudnorm": item.loudnorm,
+        "launch_profile": item.launch_profile,
+    }
+
+
+class RemoteJob:
+    """Process handle of an item running on a worker, quacks like procio.ProcessHandle"""
+
+    def __init__(self, coordinator, worker, item_id):
+        self.coordinator = coordinator
+        self.worker = worker
+        self.item_id = item_id
+        self.running = True
+
+    def is_running(self):
+        return self.running
+
+    def kill(self):
+        if self.running:
+            self.running = False
+            self.coordinator.cancel_job(self.worker, self.item_id)
+
+
+class WorkerState:
+    """The coordinator's view of one connected worker"""
+
+    def __init__(self, socket, name, capacity, prefetch):
+        self.socket = socket
+        self.name = name
+        self.address = f"{socket.peerAddress().toString()}:{socket.peerPort()}"
+        self.capacity = capacity
+        self.prefetch = prefetch
+        self.wanted = 0
+        self.jobs = {}              # item_id -> item, assigned and not finished
+        self.started = set()
+        self.revoking = set()
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.completed = 0
+        self.failed = 0
+        self.bytes_done = 0
+
+    def free_slots(self):
+        return min(self.wanted, self.capacity + self.prefetch) - len(self.jobs)
+
+    def stealable(self):
+        """Jobs that sit in the worker's backlog, behind the ones it is running"""
+        excess = len(self.jobs) - len(self.revoking) - self.capacity
+        if excess <= 0:
+            return []
+        waiting = [item_id for item_id in self.jobs if item_id not in self.started and item_id not in self.revoking]
+        return waiting[-excess:]
+
+    def speed(self):
+        return sum(item.download_speed for item in self.jobs.values())
+
+    def average_throughput(self):
+        in_flight = sum(item.metrics.bytes_transferred for item in self.jobs.values())
+        return (self.bytes_done + in_flight) / max(time.monotonic() - self.connected_at, 1)
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "address": self.address,
+            "capacity": self.capacity,
+            "running": len(self.started),
+            "backlog": len(self.jobs) - len(self.started),
+            "speed_bps": self.speed(),
+            "average_bps": int(self.average_throughput()),
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes": self.bytes_done,
+            "last_seen": round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+class Coordinator(QObject):
+    """Hands the manager's queue out to remote workers"""
+    log_message = pyqtSignal(str)
+    workers_changed = pyqtSignal()
+
+    def __init__(self, download_manager, port=COORDINATOR_PORT, host=COORDINATOR_HOST, token=CLUSTER_TOKEN):
+        super().__init__()
+        self.download_manager = download_manager
+        self.port = port
+        self.host = host
+        self.token = token
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}
+        self.handshakes = {}        # socket -> accept time, until its hello arrives
+        self.workers = {}           # socket -> WorkerState
+        self.steals = {}            # item_id -> WorkerState waiting for it, None if that one left
+
+        self.handlers = {
+            "pull": self.on_pull,
+            "started": self.on_started,
+            "progress": self.on_progress,
+            "finished": self.on_finished,
+            "revoked": self.on_revoked,
+            "heartbeat": self.on_heartbeat,
+        }
+        self.check_timer = QTimer(self)
+        self.check_timer.timeout.connect(self.check_heartbeats)
+        self.download_manager.queue_waiting.connect(self.dispatch)
+
+    def start(self):
+        if not self.port:
+            return False
+        address = QHostAddress(self.host) if self.host else QHostAddress(QHostAddress.SpecialAddress.Any)
+        if not self.server.listen(address, self.port):
+            self.log_message.emit(f"[CLUSTER] Failed to listen on port {self.port}: {self.server.errorString()}")
+            return False
+        metrics = self.download_manager.metrics
+        metrics.gauge("cluster_workers", "Connected remote workers", lambda: len(self.workers))
+        metrics.gauge("cluster_capacity", "Concurrent downloads across remote workers",
+                      lambda: sum(w.capacity for w in self.workers.values()))
+        self.check_timer.start(1000)
+        self.log_message.emit(f"[CLUSTER] Coordinator listening on {self.host or '*'}:{self.port}"
+                              + ("" if self.token else " (no VDM_CLUSTER_TOKEN set, any worker may join)"))
+        return True
+
+    def is_listening(self):
+        return self.server.isListening()
+
+    def stop(self):
+        self.check_timer.stop()
+        self.server.close()
+        for socket in list(self.buffers):
+            # Workers notice and cancel their jobs; nothing is re-queued here
+            socket.disconnected.disconnect()
+            socket.abort()
+        self.buffers.clear()
+        self.handshakes.clear()
+        self.workers.clear()
+
+    def worker_stats(self):
+        return [worker.snapshot() for worker in self.workers.values()]
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            self.handshakes[socket] = time.monotonic()
+            socket.readyRead.connect(lambda s=socket: self.on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self.on_disconnected(s))
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        self.handshakes.pop(socket, None)
+        worker = self.workers.pop(socket, None)
+        if worker is not None:
+            self.drop_worker(worker, "disconnected")
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        messages, buffer = read_messages(self.buffers.get(socket, b"") + bytes(socket.readAll()))
+        if len(buffer) > MAX_MESSAGE_SIZE:
+            socket.abort()
+            return
+        self.buffers[socket] = buffer
+        for message in messages:
+            # A handler may have dropped the connection
+            if socket not in self.buffers:
+                return
+            worker = self.workers.get(socket)
+            if worker is None:
+                self.handle_hello(socket, message)
+                continue
+            worker.last_seen = time.monotonic()
+            handler = self.handlers.get(message.get("msg"))
+            if handler is None:
+                continue
+            try:
+                handler(worker, message)
+            except (KeyError, TypeError, ValueError) as e:
+                self.log_message.emit(f"[CLUSTER] Bad message from {worker.name}: {e}")
+
+    def handle_hello(self, socket, message):
+        try:
+            if message.get("msg") != "hello":
+                raise ValueError("expected hello")
+            if self.token and not hmac.compare_digest(str(message.get("token", "")), self.token):
+                raise ValueError("bad token")
+            capacity = max(1, int(message.get("capacity", 1)))
+            prefetch = max(0, int(message.get("prefetch", 0)))
+        except (TypeError, ValueError) as e:
+            send_message(socket, {"msg": "rejected", "error": str(e)})
+            socket.disconnectFromHost()
+            return
+
+        name = str(message.get("name") or f"{socket.peerAddress().toString()}:{socket.peerPort()}")
+        names = {worker.name for worker in self.workers.values()}
+        unique, suffix = name, 2
+        while unique in names:
+            unique, suffix = f"{name}#{suffix}", suffix + 1
+        worker = WorkerState(socket, unique, capacity, prefetch)
+        self.handshakes.pop(socket, None)
+        self.workers[socket] = worker
+        send_message(socket, {"msg": "welcome", "name": unique, "heartbeat": HEARTBEAT_INTERVAL})
+        self.log_message.emit(f"[CLUSTER] Worker {unique} joined from {worker.address}, capacity {capacity}")
+        self.workers_changed.emit()
+
+    def on_pull(self, worker, message):
+        worker.wanted = max(0, int(message["slots"]))
+        self.dispatch()
+
+    def on_started(self, worker, message):
+        item = worker.jobs.get(str(message["item_id"]))
+        if item is not None:
+            worker.started.add(item.id)
+            self.download_manager.update_progress(item.id, item.progress, f"Downloading on {worker.name}")
+
+    def on_progress(self, worker, message):
+        item = worker.jobs.get(str(message["item_id"]))
+        if item is None:
+            return
+        percent = float(message.get("progress") or 0)
+        speed = message.get("speed_bps") or 0
+        if message.get("size_bytes"):
+            item.file_size = message["size_bytes"]
+        item.download_speed = speed
+        item.metrics.on_progress(percent, None, speed)
+        # The worker's byte count already covers every stream of the job
+        item.metrics.completed_bytes = int(message.get("bytes") or 0)
+        status = message.get("status") or "Downloading"
+        if status == "Downloading":
+            status = f"Downloading on {worker.name}"
+        else:
+            item.metrics.on_postprocess()
+        self.download_manager.update_progress(item.id, int(percent), status)
+
+    def on_finished(self, worker, message):
+        item_id = str(message["item_id"])
+        item = worker.jobs.pop(item_id, None)
+        worker.started.discard(item_id)
+        worker.revoking.discard(item_id)
+        if item is None:
+            return
+        item.process.running = False
+        success = bool(message.get("success"))
+        failure_class = None if success else (message.get("failure_class") or "unknown")
+        item.error_output = str(message.get("error") or "")[-4000:]
+        if message.get("size_bytes"):
+            item.file_size = message["size_bytes"]
+        item.metrics.completed_bytes = int(message.get("bytes") or item.metrics.completed_bytes)
+        item.verification = message.get("verification")
+        item.conversion = message.get("conversion")
+        worker.bytes_done += item.metrics.completed_bytes
+        if success:
+            worker.completed += 1
+        else:
+            worker.failed += 1
+        self.log_message.emit(f"[CLUSTER] {worker.name} finished {item_id}: "
+                              + ("ok" if success else f"{failure_class} failure"))
+        self.download_manager.finish_download(item_id, success, failure_class)
+        self.dispatch()
+
+    def on_revoked(self, worker, message):
+        item_id = str(message["item_id"])
+        worker.revoking.discard(item_id)
+        thief = self.steals.pop(item_id, None)
+        if not message.get("ok"):
+            # It started in the meantime
+            self.dispatch()
+            return
+        item = worker.jobs.pop(item_id, None)
+        if item is None:
+            return
+        item.process.running = False
+        if thief is not None and thief.socket in self.workers and thief.free_slots() > 0:
+            self.log_message.emit(f"[CLUSTER] {thief.name} took {item_id} over from {worker.name}")
+            self.assign(thief, item, fresh=False)
+        else:
+            self.download_manager.requeue(item_id)
+
+    def on_heartbeat(self, worker, message):
+        send_message(worker.socket, {"msg": "heartbeat"})
+
+    def assign(self, worker, item, fresh=True):
+        item.worker = worker.name
+        item.process = RemoteJob(self, worker, item.id)
+        worker.jobs[item.id] = item
+        if fresh:
+            item.metrics = JobMetrics(retries=item.retry_count)
+            item.metrics.mark_started()
+            self.download_manager.start_download(item)
+        else:
+            item.status = f"Sent to {worker.name}"
+        send_message(worker.socket, {"msg": "job", "item": job_entry(item)})
+
+    def dispatch(self):
+        """Fill the workers' free slots from the queue, least loaded first"""
+        while True:
+            candidates = [worker for worker in self.workers.values() if worker.free_slots() > 0]
+            if not candidates:
+                return
+            item = self.download_manager.take_next()
+            if item is None:
+                break
+            self.assign(min(candidates, key=lambda w: len(w.jobs) / w.capacity), item)
+        self.steal_for_idle()
+
+    def steal_for_idle(self):
+        for thief in self.workers.values():
+            promised = sum(1 for waiting in self.steals.values() if waiting is thief)
+            idle = min(thief.capacity - len(thief.jobs), thief.free_slots()) - promised
+            while idle > 0:
+                victim = max((w for w in self.workers.values() if w is not thief),
+                             key=lambda w: len(w.stealable()), default=None)
+                backlog = victim.stealable() if victim is not None else []
+                if not backlog:
+                    # Only this thief's own jobs are left to take; the next idle worker may still find some
+                    break
+                item_id = backlog[-1]
+                victim.revoking.add(item_id)
+                self.steals[item_id] = thief
+                send_message(victim.socket, {"msg": "revoke", "item_id": item_id})
+                idle -= 1
+
+    def cancel_job(self, worker, item_id):
+        worker.jobs.pop(item_id, None)
+        worker.started.discard(item_id)
+        worker.revoking.discard(item_id)
+        self.steals.pop(item_id, None)
+        send_message(worker.socket, {"msg": "cancel", "item_id": item_id})
+
+    def drop_worker(self, worker, reason):
+        jobs, worker.jobs = worker.jobs, {}
+        self.log_message.emit(f"[CLUSTER] Worker {worker.name} {reason}, re-queueing {len(jobs)} job(s)")
+        for item_id, thief in list(self.steals.items()):
+            if thief is worker:
+                self.steals[item_id] = None
+        for item_id, item in jobs.items():
+            self.steals.pop(item_id, None)
+            item.process.running = False
+            self.download_manager.requeue(item_id, f"Queued (worker {worker.name} lost)")
+        self.workers_changed.emit()
+        self.dispatch()
+
+    def check_heartbeats(self):
+        now = time.monotonic()
+        for socket, worker in list(self.workers.items()):
+            if now - worker.last_seen > HEARTBEAT_TIMEOUT:
+                del self.workers[socket]
+                self.drop_worker(worker, f"silent for {now - worker.last_seen:.0f}s")
+                socket.abort()
+        for socket, accepted in list(self.handshakes.items()):
+            if now - accepted > HEARTBEAT_TIMEOUT:
+                socket.abort()
+
+
+class WorkerAgent(QObject):
+    """Runs jobs pulled from a coordinator with a local DownloadManager/DownloadRunner"""
+    log_message = pyqtSignal(str)
+    stopped = pyqtSignal(str)
+
+    def __init__(self, host, port, capacity=3, prefetch=WORKER_PREFETCH, name=None, token=CLUSTER_TOKEN,
+                 yt_dlp_path=None, ffmpeg_path=None, output_template=None, segmented=False, verify=True,
+                 convert_workers=CONVERT_WORKERS, launch_profile=None):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.capacity = capacity
+        self.prefetch = prefetch
+        self.name = name or f"{platform.node()}-{os.getpid()}"
+        self.token = token
+        self.output_template = output_template
+        self.jobs = {}              # coordinator item id -> local item
+        self.remote_ids = {}        # local item -> coordinator item id
+        self.pending_progress = {}
+        self.welcomed = False
+        self.stopping = False
+        self.last_heard = time.monotonic()
+        self.reconnect_delay = RECONNECT_DELAY
+        self.buffer = b""
+
+        self.download_manager = DownloadManager(capacity, max_retries=0)
+        # The coordinator owns retries and the circuit breaker; a local
+        # breaker would only strand prefetched jobs here
+        self.download_manager.circuit_breaker = HostCircuitBreaker(failure_threshold=float("inf"))
+        self.download_runner = DownloadRunner(self.download_manager, yt_dlp_path, ffmpeg_path, segmented, verify,
+                                              convert_workers, launch_profile)
+        self.download_manager.download_started.connect(self.on_download_started)
+        self.download_manager.download_progress.connect(self.on_download_progress)
+        self.download_manager.download_finished.connect(self.on_download_finished)
+
+        self.socket = QTcpSocket(self)
+        self.socket.connected.connect(self.on_connected)
+        self.socket.readyRead.connect(self.on_ready_read)
+        self.socket.disconnected.connect(self.on_connection_lost)
+        self.socket.errorOccurred.connect(lambda error: self.on_connection_lost())
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush_progress)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.on_heartbeat_timer)
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.timeout.connect(self.connect_to_coordinator)
+
+    def start(self):
+        self.flush_timer.start(PROGRESS_FLUSH_INTERVAL)
+        self.connect_to_coordinator()
+
+    def connect_to_coordinator(self):
+        self.buffer = b""
+        self.socket.connectToHost(self.host, self.port)
+
+    def on_connected(self):
+        self.last_heard = time.monotonic()
+        send_message(self.socket, {"msg": "hello", "name": self.name, "capacity": self.capacity,
+                                   "prefetch": self.prefetch, "token": self.token})
+
+    def on_connection_lost(self):
+        if self.stopping or self.reconnect_timer.isActive():
+            return
+        # Armed first: abort() below emits disconnected, which lands here again
+        delay, self.reconnect_delay = self.reconnect_delay, min(self.reconnect_delay * 2, MAX_RECONNECT_DELAY)
+        self.reconnect_timer.start(delay * 1000)
+        error = self.socket.errorString()
+        if self.socket.state() != QAbstractSocket.SocketState.UnconnectedState:
+            self.socket.abort()
+        self.welcomed = False
+        self.heartbeat_timer.stop()
+        # The coordinator re-queues them elsewhere
+        dropped = self.drop_jobs()
+        self.log_message.emit(f"[WORKER] No connection to {self.host}:{self.port} ({error}), "
+                              f"cancelled {dropped} job(s), retrying in {delay}s")
+
+    def drop_jobs(self):
+        jobs = list(self.jobs.values())
+        self.jobs.clear()
+        self.remote_ids.clear()
+        self.pending_progress.clear()
+        self.download_manager.cancel_many([item.id for item in jobs])
+        return len(jobs)
+
+    def on_heartbeat_timer(self):
+        if time.monotonic() - self.last_heard > HEARTBEAT_TIMEOUT:
+            self.log_message.emit(f"[WORKER] Coordinator silent for {HEARTBEAT_TIMEOUT}s")
+            self.on_connection_lost()
+            return
+        send_message(self.socket, {"msg": "heartbeat"})
+
+    def on_ready_read(self):
+        messages, self.buffer = read_messages(self.buffer + bytes(self.socket.readAll()))
+        self.last_heard = time.monotonic()
+        for message in messages:
+            kind = message.get("msg")
+            if kind == "welcome":
+                self.welcomed = True
+                self.reconnect_delay = RECONNECT_DELAY
+                self.heartbeat_timer.start(int(message.get("heartbeat", HEARTBEAT_INTERVAL)) * 1000)
+                self.log_message.emit(f"[WORKER] Joined {self.host}:{self.port} as {message.get('name')}")
+                self.pull()
+            elif kind == "rejected":
+                self.log_message.emit(f"[WORKER] Rejected by the coordinator: {message.get('error')}")
+                self.shutdown(f"rejected: {message.get('error')}")
+                return
+            elif kind == "job":
+                self.on_job(message["item"])
+            elif kind == "cancel":
+                self.on_cancel(str(message["item_id"]))
+            elif kind == "revoke":
+                self.on_revoke(str(message["item_id"]))
+
+    def pull(self):
+        send_message(self.socket, {"msg": "pull", "slots": self.capacity + self.prefetch})
+
+    def on_job(self, entry):
+        remote_id = str(entry.get("id"))
+        if remote_id in self.jobs:
+            return
+        item = item_from_entry(entry, self.output_template)
+        if item is None:
+            send_message(self.socket, {"msg": "finished", "item_id": remote_id, "success": False,
+                                       "failure_class": "permanent", "error": "ERROR: job without a url"})
+            return
+        if self.output_template:
+            item.output_path = self.output_template
+        item.max_retries = 0
+        # Mapped before queueing, the manager may start it right away
+        self.jobs[remote_id] = item
+        self.remote_ids[item] = remote_id
+        self.download_manager.add_to_queue(item)
+
+    def on_cancel(self, remote_id):
+        item = self.jobs.pop(remote_id, None)
+        if item is not None:
+            self.remote_ids.pop(item, None)
+            self.pending_progress.pop(remote_id, None)
+            self.download_manager.cancel_download(item.id)
+
+    def on_revoke(self, remote_id):
+        item = self.jobs.get(remote_id)
+        ok = item is not None and item in self.download_manager.queue
+        if ok:
+            del self.jobs[remote_id]
+            self.remote_ids.pop(item, None)
+            self.download_manager.remove_from_queue(item.id)
+        send_message(self.socket, {"msg": "revoked", "item_id": remote_id, "ok": ok})
+
+    def on_download_started(self, item_id):
+        remote_id = self.remote_ids.get(self.download_manager.active_downloads.get(item_id))
+        if remote_id is not None:
+            send_message(self.socket, {"msg": "started", "item_id": remote_id})
+
+    def on_download_progress(self, item_id, progress, status):
+        item = self.download_manager.active_downloads.get(item_id)
+        remote_id = self.remote_ids.get(item)
+        if remote_id is not None:
+            self.pending_progress[remote_id] = item
+
+    def flush_progress(self):
+        if not self.pending_progress:
+            return
+        pending, self.pending_progress = self.pending_progress, {}
+        for remote_id, item in pending.items():
+            send_message(self.socket, {
+                "msg": "progress",
+                "item_id": remote_id,
+                "progress": item.progress,
+                "status": item.status,
+                "speed_bps": item.download_speed,
+                "size_bytes": item.file_size,
+                "bytes": item.metrics.bytes_transferred,
+            })
+
+    def on_download_finished(self, item_id, success):
+        item = self.download_manager.active_downloads.get(item_id)
+        remote_id = self.remote_ids.pop(item, None)
+        if remote_id is None:
+            return
+        self.jobs.pop(remote_id, None)
+        self.pending_progress.pop(remote_id, None)
+        self.log_message.emit(f"[WORKER] {'Completed' if success else 'Failed'}: {item.title}")
+        send_message(self.socket, {
+            "msg": "finished",
+            "item_id": remote_id,
+            "success": success,
+            "failure_class": item.failure_class,
+            "error": item.error_output[-4000:],
+            "size_bytes": item.file_size,
+            "bytes": item.metrics.bytes_transferred,
+            "verification": item.verification,
+            "conversion": item.conversion,
+        })
+        self.pull()
+
+    def shutdown(self, reason=""):
+        """Cancel local jobs and disconnect; the coordinator re-queues them"""
+        self.stopping = True
+        self.flush_timer.stop()
+        self.heartbeat_timer.stop()
+        self.reconnect_timer.stop()
+        self.drop_jobs()
+        self.socket.disconnectFromHost()
+        self.stopped.emit(reason)
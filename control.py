@@ -0,0 +1,433 @@
+"""Local control endpoint for a running VDM instance.
+
+The GUI and the headless daemon listen on a per-user QLocalServer (a Unix
+socket on Linux/macOS, a named pipe on Windows). Requests and responses are
+newline-delimited JSON objects:
+
+    {"cmd": "enqueue", "url": "...", "format": "...", "priority": 5}
+    {"cmd": "enqueue", "items": [{"url": "..."}, ...]}   all or nothing, queued as one batch
+    {"cmd": "list"}
+    {"cmd": "cancel", "item_id": "3"}
+    {"cmd": "cancel", "item_ids": ["3", "4"]}      or "all": true
+    {"cmd": "pause", "item_ids": ["3", "4"]}       or "all": true, held until resumed
+    {"cmd": "resume", "item_ids": ["3", "4"]}      or "all": true
+    {"cmd": "reprioritize", "item_id": "3", "priority": 10}
+    {"cmd": "reprioritize", "priorities": {"3": 10, "4": 0}}
+    {"cmd": "subscribe"}      stream started/progress/retrying/finished events
+    {"cmd": "activate"}       bring the GUI window to the front
+    {"cmd": "metrics"}        counters/histograms in the Prometheus text format
+    {"cmd": "workers"}        remote workers of the coordinator, see cluster.py
+    {"cmd": "schedule", "limit": 100}   current window and projected start/finish times
+    {"cmd": "subscriptions"}  followed feeds with their last poll, see subscriptions.py
+    {"cmd": "poll", "url": "..."}       poll one feed (or all without url) now
+    {"cmd": "ping"}
+
+Every response carries "ok" and, on failure, "error".
+
+MetricsServer additionally serves GET /metrics over HTTP on 127.0.0.1 for a
+Prometheus scraper. It is off unless a port is given (VDM_METRICS_PORT, or
+--metrics-port for the daemon).
+"""
+import os
+import json
+import getpass
+from datetime import datetime
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QHostAddress, QLocalServer, QLocalSocket, QTcpServer
+from core import item_from_entry
+
+CONTROL_SERVER_NAME = os.environ.get("VDM_CONTROL_NAME") or f"vdm-control-{getpass.getuser()}"
+MAX_REQUEST_SIZE = 1024 * 1024
+PROGRESS_FLUSH_INTERVAL = 250
+METRICS_PORT = int(os.environ.get("VDM_METRICS_PORT") or 0)
+
+
+def instance_running(name=CONTROL_SERVER_NAME, timeout=500):
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    running = socket.waitForConnected(timeout)
+    socket.abort()
+    return running
+
+
+class ControlServer(QObject):
+    log_message = pyqtSignal(str)
+    activate_requested = pyqtSignal()
+
+    def __init__(self, download_manager, default_output, name=CONTROL_SERVER_NAME):
+        super().__init__()
+        self.download_manager = download_manager
+        self.default_output = default_output
+        self.name = name
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}
+        self.subscribers = set()
+        self.pending_progress = {}
+        self.coordinator = None
+        self.subscriptions = None
+
+        self.commands = {
+            "ping": self.cmd_ping,
+            "enqueue": self.cmd_enqueue,
+            "list": self.cmd_list,
+            "cancel": self.cmd_cancel,
+            "pause": self.cmd_pause,
+            "resume": self.cmd_resume,
+            "reprioritize": self.cmd_reprioritize,
+            "subscribe": self.cmd_subscribe,
+            "activate": self.cmd_activate,
+            "metrics": self.cmd_metrics,
+            "workers": self.cmd_workers,
+            "schedule": self.cmd_schedule,
+            "subscriptions": self.cmd_subscriptions,
+            "poll": self.cmd_poll,
+        }
+
+        # Progress lines arrive many times a second per download; subscribers
+        # only get the latest value per item every PROGRESS_FLUSH_INTERVAL ms
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush_progress)
+
+        self.download_manager.download_started.connect(self.on_download_started)
+        self.download_manager.download_progress.connect(self.on_download_progress)
+        self.download_manager.download_retrying.connect(self.on_download_retrying)
+        self.download_manager.download_finished.connect(self.on_download_finished)
+
+    def start(self):
+        if instance_running(self.name):
+            self.log_message.emit(f"[CONTROL] Another instance already owns {self.name}, control API disabled")
+            return False
+        # Clean up a socket file left behind by a crashed instance
+        QLocalServer.removeServer(self.name)
+        if not self.server.listen(self.name):
+            self.log_message.emit(f"[CONTROL] Failed to listen on {self.name}: {self.server.errorString()}")
+            return False
+        self.flush_timer.start(PROGRESS_FLUSH_INTERVAL)
+        self.log_message.emit(f"[CONTROL] Listening on {self.server.fullServerName()}")
+        return True
+
+    def stop(self):
+        self.flush_timer.stop()
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self.on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self.on_disconnected(s))
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        self.subscribers.discard(socket)
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        buffer = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            if line.strip():
+                self.send(socket, self.handle_line(socket, line))
+        if len(buffer) > MAX_REQUEST_SIZE:
+            self.send(socket, {"ok": False, "error": "request too large"})
+            socket.disconnectFromServer()
+            buffer = b""
+        self.buffers[socket] = buffer
+
+    def handle_line(self, socket, line):
+        try:
+            request = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return {"ok": False, "error": f"invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be a JSON object"}
+
+        handler = self.commands.get(request.get("cmd"))
+        if handler is None:
+            return {"ok": False, "error": f"unknown command: {request.get('cmd')}"}
+        try:
+            response = handler(socket, request)
+        except (KeyError, TypeError, ValueError) as e:
+            response = {"ok": False, "error": f"bad request: {e}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def send(self, socket, payload):
+        if socket.state() == QLocalSocket.LocalSocketState.ConnectedState:
+            socket.write((json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+    def cmd_ping(self, socket, request):
+        return {"ok": True, "pid": os.getpid()}
+
+    def cmd_enqueue(self, socket, request):
+        entries = request["items"] if "items" in request else [request]
+        # All or nothing: every entry is checked before any is queued
+        items = []
+        for index, entry in enumerate(entries):
+            try:
+                item = item_from_entry(entry, self.default_output)
+            except ValueError as e:
+                return {"ok": False, "error": f"item {index}: {e}", "item_ids": []}
+            if item is None:
+                return {"ok": False, "error": f"item {index}: missing url", "item_ids": []}
+            item.max_retries = self.download_manager.max_retries
+            items.append(item)
+        with self.download_manager.batch():
+            for item in items:
+                self.download_manager.add_to_queue(item)
+        item_ids = [item.id for item in items]
+        self.log_message.emit(f"[CONTROL] Enqueued {len(item_ids)} item(s)")
+        return {"ok": True, "item_ids": item_ids}
+
+    def cmd_list(self, socket, request):
+        return {"ok": True, "items": self.download_manager.snapshot()}
+
+    def request_ids(self, request, default):
+        """The item ids a bulk command applies to: "item_ids", "item_id", or default() with "all" """
+        if request.get("all"):
+            return default()
+        if "item_ids" in request:
+            return [str(item_id) for item_id in request["item_ids"]]
+        return [str(request["item_id"])]
+
+    def bulk_result(self, item_ids, done, verb):
+        # A single missing item is an error, as it always was; bulk requests report what they skipped
+        if len(item_ids) == 1 and not done:
+            return {"ok": False, "error": f"cannot {verb} item {item_ids[0]}"}
+        applied = set(done)
+        return {"ok": True, "item_ids": done, "skipped": [item_id for item_id in item_ids if item_id not in applied]}
+
+    def cmd_cancel(self, socket, request):
+        manager = self.download_manager
+        item_ids = self.request_ids(request, lambda: [item.id for item in manager.get_all_items()])
+        return self.bulk_result(item_ids, manager.cancel_many(item_ids), "cancel")
+
+    def cmd_pause(self, socket, request):
+        manager = self.download_manager
+        item_ids = self.request_ids(request, lambda: [item.id for item in manager.get_all_items()])
+        return self.bulk_result(item_ids, manager.pause_many(item_ids), "pause")
+
+    def cmd_resume(self, socket, request):
+        manager = self.download_manager
+        item_ids = self.request_ids(request, lambda: list(manager.paused))
+        return self.bulk_result(item_ids, manager.resume_many(item_ids), "resume")
+
+    def cmd_reprioritize(self, socket, request):
+        if "priorities" in request:
+            priorities = {str(item_id): int(priority) for item_id, priority in request["priorities"].items()}
+        else:
+            priorities = {str(request["item_id"]): int(request["priority"])}
+        return self.bulk_result(list(priorities), self.download_manager.reprioritize_many(priorities), "reprioritize")
+
+    def cmd_subscribe(self, socket, request):
+        self.subscribers.add(socket)
+        return {"ok": True, "items": self.download_manager.snapshot()}
+
+    def cmd_activate(self, socket, request):
+        self.activate_requested.emit()
+        return {"ok": True}
+
+    def cmd_metrics(self, socket, request):
+        return {"ok": True, "text": self.download_manager.metrics.render_prometheus()}
+
+    def cmd_workers(self, socket, request):
+        if self.coordinator is None or not self.coordinator.is_listening():
+            return {"ok": False, "error": "not running as a coordinator"}
+        return {"ok": True, "workers": self.coordinator.worker_stats()}
+
+    def cmd_schedule(self, socket, request):
+        manager = self.download_manager
+        slots, rate_limit, window = manager.limits()
+        next_change = manager.schedule.next_change(datetime.now())
+        items = [
+            {"id": item.id, "title": item.title, "status": item.status, "size_bytes": item.file_size,
+             "start": start.isoformat() if start else None, "finish": finish.isoformat() if finish else None}
+            for item, start, finish in manager.projection()[:int(request.get("limit", 100))]
+        ]
+        return {"ok": True, "windows": [w.describe() for w in manager.schedule.windows],
+                "window": window.describe() if window else None, "slots": slots, "rate_limit": rate_limit,
+                "next_change": next_change.isoformat() if next_change else None, "items": items}
+
+    def cmd_subscriptions(self, socket, request):
+        if self.subscriptions is None:
+            return {"ok": False, "error": "subscriptions are not enabled"}
+        self.subscriptions.reload()
+        return {"ok": True, "subscriptions": [
+            dict(subscription.to_dict(), **self.subscriptions.state.get(subscription.url, {}),
+                 polling=subscription.url in self.subscriptions.polls)
+            for subscription in self.subscriptions.subscriptions
+        ]}
+
+    def cmd_poll(self, socket, request):
+        if self.subscriptions is None:
+            return {"ok": False, "error": "subscriptions are not enabled"}
+        url = request.get("url")
+        self.subscriptions.reload()
+        if url and all(subscription.url != url for subscription in self.subscriptions.subscriptions):
+            return {"ok": False, "error": f"not subscribed to {url}"}
+        self.subscriptions.poll_now(url)
+        return {"ok": True}
+
+    def broadcast(self, event):
+        for socket in list(self.subscribers):
+            self.send(socket, event)
+
+    def on_download_started(self, item_id):
+        item = self.download_manager.active_downloads.get(item_id)
+        self.broadcast({"event": "started", "item_id": item_id, "title": item.title if item else ""})
+
+    def on_download_progress(self, item_id, progress, status):
+        if not self.subscribers:
+            return
+        item = self.download_manager.active_downloads.get(item_id)
+        self.pending_progress[item_id] = {
+            "event": "progress",
+            "item_id": item_id,
+            "progress": progress,
+            "status": item.status if item else status,
+            "speed": item.speed_text if item else "",
+            "size": item.size_text if item else "",
+            "speed_bps": item.download_speed if item else 0,
+            "size_bytes": item.file_size if item else None
+        }
+
+    def flush_progress(self):
+        if not self.pending_progress:
+            return
+        events, self.pending_progress = self.pending_progress, {}
+        for event in events.values():
+            self.broadcast(event)
+
+    def on_download_retrying(self, item_id, attempt, delay):
+        self.pending_progress.pop(item_id, None)
+        self.broadcast({"event": "retrying", "item_id": item_id, "attempt": attempt, "delay": delay})
+
+    def on_download_finished(self, item_id, success):
+        self.pending_progress.pop(item_id, None)
+        item = self.download_manager.active_downloads.get(item_id)
+        self.broadcast({
+            "event": "finished",
+            "item_id": item_id,
+            "success": success,
+            "status": item.status if item else ("Completed" if success else "Failed"),
+            "title": item.title if item else ""
+        })
+
+
+class MetricsServer(QObject):
+    """Minimal HTTP endpoint serving the manager's metrics for Prometheus"""
+    log_message = pyqtSignal(str)
+
+    def __init__(self, metrics, port=METRICS_PORT):
+        super().__init__()
+        self.metrics = metrics
+        self.port = port
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}
+
+    def start(self):
+        if not self.port:
+            return False
+        if not self.server.listen(QHostAddress(QHostAddress.SpecialAddress.LocalHost), self.port):
+            self.log_message.emit(f"[METRICS] Failed to listen on port {self.port}: {self.server.errorString()}")
+            return False
+        self.log_message.emit(f"[METRICS] Serving http://127.0.0.1:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self.on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self.on_disconnected(s))
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        buffer = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        if b"\r\n\r\n" not in buffer and b"\n\n" not in buffer:
+            if len(buffer) > MAX_REQUEST_SIZE:
+                socket.abort()
+            else:
+                self.buffers[socket] = buffer
+            return
+        self.buffers[socket] = b""
+
+        parts = buffer.split(b"\n", 1)[0].decode("latin-1").split()
+        method, path = (parts + ["", ""])[:2]
+        if method not in ("GET", "HEAD"):
+            self.respond(socket, "405 Method Not Allowed", "text/plain", b"")
+        elif path.split("?", 1)[0] in ("/metrics", "/"):
+            body = self.metrics.render_prometheus().encode("utf-8")
+            self.respond(socket, "200 OK", "text/plain; version=0.0.4; charset=utf-8",
+                         b"" if method == "HEAD" else body, len(body))
+        else:
+            self.respond(socket, "404 Not Found", "text/plain", b"not found\n")
+
+    def respond(self, socket, status, content_type, body, length=None):
+        head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body) if length is None else length}\r\nConnection: close\r\n\r\n")
+        socket.write(head.encode("latin-1") + body)
+        socket.disconnectFromHost()
+
+
+class ControlClient:
+    """Blocking client for scripts and the CLI. Needs a QCoreApplication instance."""
+
+    def __init__(self, name=CONTROL_SERVER_NAME, timeout=5000):
+        self.name = name
+        self.timeout = timeout
+        self.socket = QLocalSocket()
+        self.buffer = b""
+
+    def connect(self):
+        self.socket.connectToServer(self.name)
+        return self.socket.waitForConnected(self.timeout)
+
+    def close(self):
+        self.socket.disconnectFromServer()
+
+    def request(self, cmd, **params):
+        params["cmd"] = cmd
+        self.socket.write((json.dumps(params, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.socket.waitForBytesWritten(self.timeout)
+        return self.read_message(self.timeout)
+
+    def read_message(self, timeout=-1):
+        while b"\n" not in self.buffer:
+            if not self.socket.waitForReadyRead(timeout):
+                raise ConnectionError(self.socket.errorString())
+            self.buffer += bytes(self.socket.readAll())
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def events(self):
+        while True:
+            message = self.read_message(-1)
+            if "event" in message:
+                yield message
+
+
+def forward_to_running_instance(urls, name=CONTROL_SERVER_NAME):
+    """Hand URLs to an already running instance; returns False if there is none"""
+    client = ControlClient(name, timeout=1000)
+    if not client.connect():
+        return False
+    try:
+        if urls:
+            client.request("enqueue", items=[{"url": url} for url in urls])
+        client.request("activate")
+    except ConnectionError:
+        return False
+    finally:
+        client.close()
+    return True
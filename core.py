@@ -0,0 +1,1066 @@
+import os
+import re
+import csv
+import json
+import time
+import random
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from PyQt6.QtCore import QTimer, pyqtSignal, QObject
+from metrics import DownloadMetrics, JobMetrics, METRIC_FIELDS, format_bytes
+from profiling import profiled
+from procio import process_hub
+from integrity import Verifier, find_ffprobe
+from audio import Converter, CONVERT_WORKERS, download_output, needs_conversion, validate_audio_format
+from launch import DEFAULT_LAUNCH_PROFILE, load_launch_profiles
+from schedule import (Schedule, DEFAULT_JOB_SPEED, SCHEDULE_CHECK_INTERVAL, item_bounds, item_edges,
+                      item_window_open, validate_item_times, next_edge, format_time, project)
+import segmented
+
+# Bundled binaries used by the GUI build. Headless installs usually have
+# yt-dlp/ffmpeg on PATH instead, see find_executable().
+DEPENDENCIES_PATH = "./Dependencies/"
+DEFAULT_YT_DLP_PATH = DEPENDENCIES_PATH + "yt-dlp.exe"
+DEFAULT_FFMPEG_PATH = DEPENDENCIES_PATH + "ffmpeg-8.0-full_build/bin/ffmpeg.exe"
+
+
+def find_executable(bundled_path, name):
+    if os.path.exists(bundled_path):
+        return bundled_path
+    return shutil.which(name) or bundled_path
+
+
+# Failure classification for yt-dlp stderr. Permanent patterns are checked first
+# so that e.g. a 404 is never retried; anything matching neither list is
+# treated as "unknown" and gets a single retry.
+PERMANENT_ERROR_PATTERNS = [
+    r"Video unavailable",
+    r"Private video",
+    r"Unsupported URL",
+    r"is not a valid URL",
+    r"HTTP Error 404",
+    r"Requested format is not available",
+    r"Sign in to confirm",
+    r"This video has been removed",
+    r"not available in your country",
+    r"copyright",
+    r"No space left on device",
+    r"Permission denied",
+]
+
+TRANSIENT_ERROR_PATTERNS = [
+    r"HTTP Error 5\d\d",
+    r"HTTP Error 429",
+    r"Too Many Requests",
+    r"HTTP Error 403",  # expired signed format/fragment URLs
+    r"HTTP Error 410",
+    r"Connection reset",
+    r"Connection aborted",
+    r"Connection refused",
+    r"Remote end closed connection",
+    r"timed out",
+    r"Temporary failure in name resolution",
+    r"IncompleteRead",
+    r"Unable to download fragment",
+    r"fragment \d+ not found",
+    r"Got error:",
+]
+
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 300
+
+
+def classify_failure(error_output):
+    if not error_output:
+        return "unknown"
+    for pattern in PERMANENT_ERROR_PATTERNS:
+        if re.search(pattern, error_output, re.IGNORECASE):
+            return "permanent"
+    for pattern in TRANSIENT_ERROR_PATTERNS:
+        if re.search(pattern, error_output, re.IGNORECASE):
+            return "transient"
+    return "unknown"
+
+
+def retry_delay(retry_count):
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(retry_count - 1, 0))
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+def url_host(url):
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+class HostCircuitBreaker:
+    def __init__(self, failure_threshold=3, cooldown=120):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.open_until = {}
+        # Host -> id of the item probing it after the cooldown
+        self.probes = {}
+
+    def allow(self, host, item_id):
+        until = self.open_until.get(host)
+        if until is None:
+            return True
+        if datetime.now() < until:
+            return False
+        # Half-open: one probe at a time, the rest wait for its result
+        return self.probes.setdefault(host, item_id) == item_id
+
+    def record_success(self, host):
+        self.failures.pop(host, None)
+        self.open_until.pop(host, None)
+        self.probes.pop(host, None)
+
+    def record_failure(self, host):
+        """Returns the cooldown in seconds if this failure opened the circuit"""
+        probing = self.probes.pop(host, None) is not None
+        self.failures[host] = self.failures.get(host, 0) + 1
+        if probing or (self.failures[host] >= self.failure_threshold and host not in self.open_until):
+            self.open_until[host] = datetime.now() + timedelta(seconds=self.cooldown)
+            return self.cooldown
+        return 0
+
+    def release(self, host, item_id):
+        """The probe ended without telling anything about the host (cancelled, permanent error); let another one try"""
+        if self.probes.get(host) == item_id:
+            del self.probes[host]
+
+def default_format_selector(format_id):
+    if not format_id or format_id == "best":
+        return "bestvideo+bestaudio/best"
+    return format_id
+
+
+def item_from_entry(entry, default_output):
+    """Build a DownloadItem from a queue-file line or control API request"""
+    url = entry.get("url")
+    if not url:
+        return None
+    audio_format = entry.get("audio_format")
+    validate_audio_format(audio_format)
+    # Conversion jobs download the best audio stream as it is, see audio.py
+    format_selector = entry.get("format") or ("bestaudio/best" if audio_format else default_format_selector(None))
+    is_best = format_selector == default_format_selector(None)
+    item = DownloadItem(
+        url=url,
+        format_id="best" if is_best else format_selector,
+        format_type=entry.get("format_type") or ("best" if is_best else "selected"),
+        output_path=entry.get("output_path") or entry.get("output") or default_output,
+        title=entry.get("title") or url,
+        format_selector=format_selector
+    )
+    item.priority = int(entry.get("priority", 0))
+    item.retry_count = entry.get("retry_count", 0)
+    item.resume = entry.get("resume", False)
+    # Daily window of this item, "HH:MM"; see schedule.py
+    item.start_after = entry.get("start_after")
+    item.finish_before = entry.get("finish_before")
+    validate_item_times(item)
+    item.audio_format = audio_format
+    item.loudnorm = bool(entry.get("loudnorm"))
+    item.launch_profile = entry.get("launch_profile")
+    if entry.get("size_bytes"):
+        item.file_size = int(entry["size_bytes"])
+    return item
+
+
+class DownloadItem:
+    # Slotted: the queue can hold tens of thousands of these
+    __slots__ = (
+        "id", "url", "format_id", "format_type", "format_selector", "output_path", "title", "status",
+        "progress", "process", "added_time", "start_time", "end_time", "file_size", "download_speed",
+        "priority", "retry_count", "max_retries", "resume", "error_output", "failure_class", "metrics",
+        "queued_at", "worker", "output_file", "expected_size", "verification", "start_after", "finish_before",
+        "audio_format", "loudnorm", "conversion", "launch_profile",
+    )
+
+    def __init__(self, url, format_id, format_type, output_path, title="Unknown", format_selector=None):
+        self.id = None
+        self.url = url
+        self.format_id = format_id
+        self.format_type = format_type
+        self.format_selector = format_selector or default_format_selector(format_id)
+        self.output_path = output_path
+        self.title = title
+        self.status = "Queued"
+        self.progress = 0
+        self.process = None
+        self.added_time = datetime.now()
+        self.start_time = None
+        self.end_time = None
+        self.file_size = None       # bytes of the current stream, as reported by yt-dlp
+        self.download_speed = 0     # bytes/s
+        self.priority = 0
+        self.retry_count = 0
+        self.max_retries = 3
+        self.resume = False
+        self.error_output = ""
+        self.failure_class = None
+        self.metrics = JobMetrics()
+        self.queued_at = None
+        self.worker = None          # name of the remote worker running it, None when local
+        self.output_file = None     # final path on disk, once yt-dlp has named it
+        self.expected_size = None   # largest exact stream size reported, for the integrity check
+        self.verification = None    # integrity.Verifier result of the last attempt
+        self.start_after = None     # "HH:MM", only run after this time of day
+        self.finish_before = None   # "HH:MM", pause at this time of day
+        self.audio_format = None    # convert the downloaded audio to this, see audio.AUDIO_FORMATS
+        self.loudnorm = False       # with the loudnorm filter on the way
+        self.conversion = None      # audio.Converter result of the last attempt
+        self.launch_profile = None  # launch.LaunchProfile name for its processes, None = the runner's
+
+    @property
+    def host(self):
+        return url_host(self.url)
+
+    @property
+    def size_text(self):
+        return format_bytes(self.file_size)
+
+    @property
+    def speed_text(self):
+        return format_bytes(self.download_speed, "/s") if self.download_speed else ""
+
+    @property
+    def dropped(self):
+        """Cancelled before it ever started; it leaves no history entry or result"""
+        return self.status == "Cancelled" and self.start_time is None
+
+    def last_error_line(self):
+        for line in reversed(self.error_output.splitlines()):
+            if "ERROR:" in line:
+                return line.strip()
+        return ""
+
+def batch_summary(items):
+    """"3 completed, 997 cancelled" for the items of a committed batch"""
+    counts = {}
+    for item in items:
+        counts[item.status] = counts.get(item.status, 0) + 1
+    return ", ".join(f"{count} {status.lower()}" for status, count in counts.items())
+
+HISTORY_EXPORT_FIELDS = [
+    "title", "url", "host", "format_id", "format_type", "status", "added_time", "start_time",
+    "end_time", "failure_class", "output_path",
+]
+
+
+class DownloadHistory:
+    def __init__(self, history_file="Saves/download_history.json"):
+        self.history_file = history_file
+        self._history = None
+
+        # Ensure folder exists
+        folder = os.path.dirname(self.history_file)
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        # Ensure file exists
+        if not os.path.exists(self.history_file):
+            with open(self.history_file, "w", encoding="utf-8") as f:
+                json.dump([], f, indent=2)
+
+    @property
+    def history(self):
+        # Loaded on first access so startup doesn't pay for parsing a big file
+        if self._history is None:
+            self.load_history()
+        return self._history
+
+    @history.setter
+    def history(self, value):
+        self._history = value
+
+    def load_history(self):
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                self.history = data
+        except Exception as e:
+            print(f"Error loading history: {e}")
+            self.history = []
+
+    def save_history(self):
+        try:
+            with open(self.history_file, 'w', encoding='utf-8') as f:
+                json.dump(self.history, f, indent=2, ensure_ascii=False, default=str)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+
+    def export(self, path):
+        """Write the history as .csv (metrics flattened into columns), .jsonl or .json"""
+        ext = os.path.splitext(path)[1].lower()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if ext == ".csv":
+                writer = csv.writer(f)
+                writer.writerow(HISTORY_EXPORT_FIELDS + METRIC_FIELDS)
+                for entry in self.history:
+                    row = dict(entry, host=entry.get("host") or url_host(entry.get("url", "")))
+                    metrics = entry.get("metrics") or {}
+                    writer.writerow([row.get(k) for k in HISTORY_EXPORT_FIELDS]
+                                    + [metrics.get(k) for k in METRIC_FIELDS])
+            elif ext == ".jsonl":
+                for entry in self.history:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            else:
+                json.dump(self.history, f, indent=2, ensure_ascii=False, default=str)
+
+    def add_item(self, download_item):
+        self.add_items([download_item])
+
+    def add_items(self, download_items):
+        """Record finished items, newest first, with a single write of the history file"""
+        download_items = [download_item for download_item in download_items if not download_item.dropped]
+        if not download_items:
+            return
+        self.history[:0] = [self.history_entry(download_item) for download_item in reversed(download_items)]
+        self.save_history()
+
+    def history_entry(self, download_item):
+        return {
+            "title": download_item.title,
+            "url": download_item.url,
+            "format_id": download_item.format_id,
+            "format_type": download_item.format_type,
+            "output_path": download_item.output_path,
+            "status": download_item.status,
+            "added_time": download_item.added_time.isoformat(),
+            "start_time": download_item.start_time.isoformat() if download_item.start_time else None,
+            "end_time": download_item.end_time.isoformat() if download_item.end_time else None,
+            "file_size": download_item.file_size,
+            "retry_count": download_item.retry_count,
+            "failure_class": download_item.failure_class,
+            "error": download_item.last_error_line(),
+            "host": download_item.host,
+            "worker": download_item.worker,
+            "verification": download_item.verification,
+            "conversion": download_item.conversion,
+            "metrics": download_item.metrics.to_dict()
+        }
+
+class DownloadManager(QObject):
+    download_started = pyqtSignal(str)
+    download_progress = pyqtSignal(str, int, str)
+    download_finished = pyqtSignal(str, bool)
+    download_retrying = pyqtSignal(str, int, int)
+    # Items are left in the queue after the local slots were filled
+    queue_waiting = pyqtSignal()
+    # A schedule file was (re)loaded or failed to load; the message is for the log
+    schedule_changed = pyqtSignal(str)
+    # The DownloadItems that finished inside a batch(), emitted once it commits
+    batch_committed = pyqtSignal(list)
+
+    def __init__(self, max_concurrent=3, max_retries=3):
+        super().__init__()
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.queue = []
+        self.active_downloads = {}
+        self.retry_pending = {}
+        # Active items past their download (e.g. being verified); they don't take a slot
+        self.postprocessing = set()
+        # Items held by pause_many() until resume_many(), in the order they were paused
+        self.paused = {}
+        # Nesting depth of batch(); nothing starts while it's above 0
+        self.batch_depth = 0
+        self.batch_finished = []
+        self.item_counter = 0
+        self.circuit_breaker = HostCircuitBreaker()
+        self.schedule = Schedule()
+        self.schedule_file = None
+        self.schedule_mtime = None
+        # Bandwidth limit the running downloads were started with
+        self.applied_rate_limit = None
+        # Average speed of finished downloads, for projections
+        self.job_speed = None
+
+        self.metrics = DownloadMetrics()
+        self.metrics.gauge("queue_length", "Items waiting to start", lambda: len(self.queue))
+        self.metrics.gauge("active_downloads", "Downloads currently running", lambda: len(self.active_downloads))
+        self.metrics.gauge("retry_pending", "Items waiting for a retry", lambda: len(self.retry_pending))
+        self.metrics.gauge("max_concurrent", "Concurrent download limit", lambda: self.max_concurrent)
+        self.metrics.gauge("schedule_slots", "Concurrent download limit of the current schedule window",
+                           lambda: self.limits()[0])
+        self.sample_timer = QTimer(self)
+        self.sample_timer.timeout.connect(self.sample_throughput)
+        self.sample_timer.start(1000)
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.setSingleShot(True)
+        self.schedule_timer.timeout.connect(self.apply_schedule)
+
+    def sample_throughput(self):
+        self.metrics.record_throughput(sum(item.metrics.current_speed for item in self.active_downloads.values()))
+        
+    def add_to_queue(self, download_item):
+        self.item_counter += 1
+        download_item.id = str(self.item_counter)
+        download_item.queued_at = time.monotonic()
+        self._insert_queued(download_item)
+        self.process_queue()
+
+    def _insert_queued(self, item, front=False):
+        # Queue stays ordered by descending priority, FIFO within a priority
+        for index, queued in enumerate(self.queue):
+            if queued.priority < item.priority or (front and queued.priority == item.priority):
+                self.queue.insert(index, item)
+                return
+        self.queue.append(item)
+
+    def reprioritize(self, item_id, priority):
+        return bool(self.reprioritize_many({item_id: priority}))
+
+    @contextmanager
+    def batch(self):
+        """Apply several queue operations as one transaction.
+
+        Inside a batch process_queue starts nothing, so cancelling or pausing
+        running items can't pull queued ones into their slots halfway through.
+        download_finished is still emitted per item; listeners that write
+        history or redraw check in_batch() and wait for batch_committed, which
+        carries every item that finished. The outermost batch then fills the
+        free slots in one pass.
+        """
+        self.batch_depth += 1
+        try:
+            yield
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                finished, self.batch_finished = self.batch_finished, []
+                if finished:
+                    self.batch_committed.emit(finished)
+                self.process_queue()
+
+    def in_batch(self):
+        return self.batch_depth > 0
+
+    def _take_queued(self, item_ids):
+        """Remove the queued items among item_ids in one pass, keeping their order"""
+        taken = [item for item in self.queue if item.id in item_ids]
+        if taken:
+            self.queue = [item for item in self.queue if item.id not in item_ids]
+        return taken
+
+    def cancel_many(self, item_ids):
+        """Cancel queued, running, retrying and paused items as one batch; returns the ids cancelled"""
+        wanted = set(item_ids)
+        cancelled = []
+        with self.batch():
+            for item in self._take_queued(wanted):
+                self.active_downloads[item.id] = item
+            for item_id in wanted & (self.retry_pending.keys() | self.paused.keys()):
+                self.active_downloads[item_id] = self.retry_pending.pop(item_id, None) or self.paused.pop(item_id)
+            for item_id in dict.fromkeys(item_ids):
+                item = self.active_downloads.get(item_id)
+                if item is None:
+                    continue
+                if item.process and item.process.is_running():
+                    item.process.kill()
+                self.finish_download(item_id, False, "cancelled")
+                cancelled.append(item_id)
+        return cancelled
+
+    def cancel_all(self):
+        return self.cancel_many([item.id for item in self.get_all_items()])
+
+    def pause_many(self, item_ids, status="Paused"):
+        """Hold queued, running and retrying items until resume_many(); returns the ids paused.
+
+        Running downloads keep their partial data. Items on remote workers or
+        past their download can't be paused and are left alone.
+        """
+        wanted = set(item_ids)
+        paused = []
+        with self.batch():
+            for item in self._take_queued(wanted):
+                self.circuit_breaker.release(item.host, item.id)
+                item.status = status
+                self.paused[item.id] = item
+                paused.append(item.id)
+            for item_id in dict.fromkeys(item_ids):
+                if item_id in self.retry_pending:
+                    item = self.retry_pending.pop(item_id)
+                    self.circuit_breaker.release(item.host, item_id)
+                    item.status = status
+                    item.resume = item.failure_class != "integrity"
+                    self.paused[item_id] = item
+                    paused.append(item_id)
+                elif self.pause_download(item_id, status, hold=True):
+                    paused.append(item_id)
+        return paused
+
+    def pause_all(self, status="Paused"):
+        return self.pause_many([item.id for item in self.get_all_items()], status)
+
+    def resume_many(self, item_ids):
+        """Put paused items back at the front of their priority in the queue; returns the ids resumed"""
+        resumed = [self.paused.pop(item_id) for item_id in dict.fromkeys(item_ids) if item_id in self.paused]
+        if not resumed:
+            return []
+        now = time.monotonic()
+        for item in resumed:
+            item.status = "Queued"
+            item.queued_at = now
+        with self.batch():
+            # Stable: ahead of what was already queued at the same priority
+            self.queue = sorted(resumed + self.queue, key=lambda item: -item.priority)
+        return [item.id for item in resumed]
+
+    def resume_all(self):
+        return self.resume_many(list(self.paused))
+
+    def reprioritize_many(self, priorities):
+        """Set the priority of queued or paused items, {item_id: priority}; returns the ids changed"""
+        moved = self._take_queued(priorities.keys())
+        for item in moved:
+            item.priority = int(priorities[item.id])
+        held = [self.paused[item_id] for item_id in priorities if item_id in self.paused]
+        for item in held:
+            item.priority = int(priorities[item.id])
+        if moved:
+            with self.batch():
+                # Stable: behind what was already queued at the same priority, like _insert_queued
+                self.queue = sorted(self.queue + moved, key=lambda item: -item.priority)
+        return [item.id for item in moved + held]
+    
+    def local_downloads(self):
+        return [item for item in self.active_downloads.values()
+                if item.worker is None and item.id not in self.postprocessing]
+
+    def running_locally(self):
+        return len(self.local_downloads())
+
+    def take_next(self):
+        """Remove and return the next queued item whose host isn't cooling down and whose window is open"""
+        now = datetime.now()
+        item = next((i for i in self.queue if item_window_open(i, now) and self.circuit_breaker.allow(i.host, i.id)), None)
+        if item is not None:
+            self.queue.remove(item)
+        return item
+
+    def set_schedule_file(self, path):
+        """Load the schedule from path now and whenever the file changes; raises ValueError if it's invalid"""
+        self.schedule_file = path
+        self.schedule_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        self.set_schedule(Schedule.load(path))
+
+    def set_schedule(self, schedule):
+        self.schedule = schedule
+        self.apply_schedule()
+
+    def _reload_schedule_file(self):
+        mtime = os.path.getmtime(self.schedule_file) if os.path.exists(self.schedule_file) else None
+        if mtime == self.schedule_mtime:
+            return
+        self.schedule_mtime = mtime
+        try:
+            self.schedule = Schedule.load(self.schedule_file)
+        except ValueError as e:
+            self.schedule_changed.emit(f"Keeping the previous schedule, {e}")
+            return
+        self.schedule_changed.emit(f"Reloaded {self.schedule_file}: "
+                                   + (", ".join(w.describe() for w in self.schedule.windows) or "no windows"))
+
+    def limits(self, moment=None):
+        """(local download slots, total bytes/s or None, schedule window or None) at moment"""
+        return self.schedule.limits(moment or datetime.now(), self.max_concurrent)
+
+    def rate_limit_per_download(self):
+        slots, rate_limit, _ = self.limits()
+        return int(rate_limit / max(slots, 1)) if rate_limit else None
+
+    @profiled()
+    def apply_schedule(self):
+        """Pause what has to stop at this window edge, start what may run now and wait for the next edge"""
+        if self.schedule_file:
+            self._reload_schedule_file()
+        now = datetime.now()
+        slots, rate_limit, _ = self.limits(now)
+        running = self.local_downloads()
+        paused = {item.id: self._paused_status(item, now) for item in running if not item_window_open(item, now)}
+        # Over the window's limit: the lowest priority, most recently started ones wait
+        keep = sorted((item for item in running if item.id not in paused),
+                      key=lambda item: (-item.priority, item.start_time))
+        for item in keep[max(slots, 0):]:
+            paused[item.id] = self._paused_status(None, now)
+        if rate_limit != self.applied_rate_limit:
+            # yt-dlp can't change --limit-rate on the fly, restart the rest with their new share
+            for item in keep[:max(slots, 0)]:
+                paused[item.id] = "Queued"
+            self.applied_rate_limit = rate_limit
+        # Each one goes to the front, so the earliest started ends up first again
+        for item in sorted((item for item in running if item.id in paused), key=lambda item: item.start_time,
+                           reverse=True):
+            self.pause_download(item.id, paused[item.id])
+        self.process_queue()
+
+        edges = [self.schedule.next_change(now), next_edge(item_edges(self.queue + running), now)]
+        wait = min([(edge - now).total_seconds() + 1 for edge in edges if edge is not None]
+                   + [SCHEDULE_CHECK_INTERVAL])
+        self.schedule_timer.start(int(wait * 1000))
+
+    def _paused_status(self, item, now):
+        if item is not None:
+            return f"Paused until {format_time(item_bounds(item)[0])}"
+        if self.limits(now)[0] > 0:
+            return "Paused (window limit)"
+        edge = self.schedule.next_change(now)
+        return f"Paused until {edge:%H:%M}" if edge else "Paused"
+
+    def pause_download(self, item_id, status="Paused", hold=False):
+        """Stop a local download and put it back at the front of the queue, or with hold among the
+        paused items; it resumes from its partial data"""
+        item = self.active_downloads.get(item_id)
+        if item is None or item.worker is not None or item_id in self.postprocessing:
+            return False
+        if item.process and item.process.is_running():
+            item.process.kill()
+        del self.active_downloads[item_id]
+        # Stopped without a result; if it was probing its host, another item may
+        self.circuit_breaker.release(item.host, item_id)
+        item.process = None
+        item.download_speed = 0
+        item.resume = True
+        item.status = status
+        item.queued_at = time.monotonic()
+        if hold:
+            self.paused[item_id] = item
+        else:
+            self._insert_queued(item, front=True)
+        return True
+
+    def projection(self, now=None):
+        """Projected start and finish of every running and queued item, in queue order"""
+        now = now or datetime.now()
+        running = self.local_downloads()
+        speeds = [item.download_speed for item in running if item.download_speed]
+        job_speed = sum(speeds) / len(speeds) if speeds else (self.job_speed or DEFAULT_JOB_SPEED)
+        times = project(running, self.queue, self.schedule, now, self.max_concurrent, job_speed)
+        return [(item, *times[item.id]) for item in running + self.queue]
+
+    @profiled()
+    def process_queue(self):
+        if self.batch_depth:
+            return
+        # Items sent to remote workers don't take local slots
+        running = self.running_locally()
+        slots = self.limits()[0]
+        while running < slots:
+            item = self.take_next()
+            if item is None:
+                break
+            self.start_download(item)
+            running += 1
+        if self.queue:
+            self.queue_waiting.emit()
+    
+    def start_download(self, item):
+        item.status = "Downloading" if item.worker is None else f"Sent to {item.worker}"
+        item.start_time = datetime.now()
+        if item.queued_at is not None:
+            self.metrics.queue_wait.observe(time.monotonic() - item.queued_at)
+        self.metrics.jobs_started.inc()
+        self.active_downloads[item.id] = item
+        self.download_started.emit(item.id)
+    
+    def update_progress(self, item_id, progress, status=""):
+        if item_id in self.active_downloads:
+            item = self.active_downloads[item_id]
+            item.progress = progress
+            if status:
+                item.status = status
+            self.download_progress.emit(item_id, progress, status)
+    
+    def begin_postprocess(self, item_id, status):
+        """The network part of an active item is done; free its slot until finish_download"""
+        item = self.active_downloads.get(item_id)
+        if item is None:
+            return
+        self.postprocessing.add(item_id)
+        item.download_speed = 0
+        item.process = None
+        self.update_progress(item_id, item.progress, status)
+        self.process_queue()
+
+    def finish_download(self, item_id, success, failure_class=None):
+        self.postprocessing.discard(item_id)
+        if item_id in self.active_downloads:
+            item = self.active_downloads[item_id]
+            item.failure_class = None if success else failure_class
+            item.metrics.mark_finished()
+            self.metrics.bytes_downloaded.inc(item.metrics.bytes_transferred)
+            if not success and failure_class != "cancelled":
+                self.metrics.failures.inc(**{"class": failure_class or "unknown"})
+            if success:
+                self.circuit_breaker.record_success(item.host)
+                average = item.metrics.to_dict()["avg_throughput"]
+                if average and item.worker is None:
+                    self.job_speed = average if self.job_speed is None else 0.8 * self.job_speed + 0.2 * average
+            elif failure_class == "transient":
+                cooldown = self.circuit_breaker.record_failure(item.host)
+                if cooldown:
+                    QTimer.singleShot(cooldown * 1000, self.process_queue)
+            else:
+                self.circuit_breaker.release(item.host, item_id)
+
+            if not success and self._should_retry(item, failure_class):
+                self._schedule_retry(item)
+                return
+
+            item.end_time = datetime.now()
+            item.status = "Completed" if success else ("Cancelled" if failure_class == "cancelled" else "Failed")
+            item.process = None
+            item.download_speed = 0
+            item.progress = 100 if success else item.progress
+            result = "completed" if success else ("cancelled" if failure_class == "cancelled" else "failed")
+            self.metrics.jobs_finished.inc(result=result)
+            if item.metrics.started is not None:
+                self.metrics.job_duration.observe(item.metrics.finished - item.metrics.started, result=result)
+            if success:
+                self.metrics.record_completion()
+            
+            self.download_finished.emit(item_id, success)
+            del self.active_downloads[item_id]
+            if self.batch_depth:
+                self.batch_finished.append(item)
+            
+            self.process_queue()
+    
+    def _should_retry(self, item, failure_class):
+        if failure_class in ("transient", "integrity"):
+            return item.retry_count < item.max_retries
+        if failure_class == "unknown":
+            return item.retry_count < min(1, item.max_retries)
+        return False
+
+    def _schedule_retry(self, item):
+        item.retry_count += 1
+        # Partial data of a file that failed its integrity check isn't worth keeping
+        item.resume = item.failure_class != "integrity"
+        self.metrics.retries.inc()
+        delay = retry_delay(item.retry_count)
+        item.status = f"Retrying in {delay}s ({item.retry_count}/{item.max_retries})"
+        item.process = None
+        item.worker = None
+        item.error_output = ""
+        del self.active_downloads[item.id]
+        self.retry_pending[item.id] = item
+        self.download_retrying.emit(item.id, item.retry_count, delay)
+        QTimer.singleShot(delay * 1000, lambda: self._requeue_retry(item.id))
+        self.process_queue()
+
+    def _requeue_retry(self, item_id):
+        item = self.retry_pending.pop(item_id, None)
+        if item is None:
+            return
+        item.status = f"Queued (retry {item.retry_count})"
+        item.queued_at = time.monotonic()
+        # Retries go to the front so they pick up their partial data first
+        self._insert_queued(item, front=True)
+        self.process_queue()
+
+    def requeue(self, item_id, status="Queued"):
+        """Put an active item back at the front of the queue without counting
+        an attempt, e.g. when the remote worker running it went away"""
+        item = self.active_downloads.pop(item_id, None)
+        if item is None:
+            return False
+        self.circuit_breaker.release(item.host, item_id)
+        item.worker = None
+        item.process = None
+        item.download_speed = 0
+        item.resume = True
+        item.status = status
+        item.queued_at = time.monotonic()
+        self._insert_queued(item, front=True)
+        self.process_queue()
+        return True
+
+    def get_paused_items(self):
+        return list(self.paused.values())
+
+    def get_all_items(self):
+        return self.get_queue_items() + self.get_active_items() + self.get_retrying_items() + self.get_paused_items()
+
+    def find_item(self, item_id):
+        return next((item for item in self.get_all_items() if item.id == item_id), None)
+
+    def snapshot(self):
+        return [
+            {
+                "id": item.id,
+                "title": item.title,
+                "url": item.url,
+                "format": item.format_selector,
+                "output_path": item.output_path,
+                "status": item.status,
+                "progress": item.progress,
+                "priority": item.priority,
+                "speed": item.speed_text,
+                "size": item.size_text,
+                "speed_bps": item.download_speed,
+                "size_bytes": item.file_size,
+                "retry_count": item.retry_count,
+                "worker": item.worker,
+                "start_after": item.start_after,
+                "finish_before": item.finish_before,
+                "audio_format": item.audio_format,
+                "loudnorm": item.loudnorm,
+                "launch_profile": item.launch_profile
+            }
+            for item in self.get_all_items()
+        ]
+
+    def get_queue_items(self):
+        return self.queue.copy()
+    
+    def get_active_items(self):
+        return list(self.active_downloads.values())
+
+    def get_retrying_items(self):
+        return list(self.retry_pending.values())
+    
+    def remove_from_queue(self, item_id):
+        for item in self._take_queued({item_id}):
+            self.circuit_breaker.release(item.host, item.id)
+    
+    def cancel_download(self, item_id):
+        return bool(self.cancel_many([item_id]))
+
+
+class DownloadRunner(QObject):
+    """Launches and parses the yt-dlp process for every download the manager starts"""
+    log_message = pyqtSignal(str)
+
+    def __init__(self, download_manager, yt_dlp_path=None, ffmpeg_path=None, segmented=False, verify=True,
+                 convert_workers=CONVERT_WORKERS, launch_profile=None):
+        super().__init__()
+        self.download_manager = download_manager
+        self.yt_dlp_path = yt_dlp_path or find_executable(DEFAULT_YT_DLP_PATH, "yt-dlp")
+        self.ffmpeg_path = ffmpeg_path or find_executable(DEFAULT_FFMPEG_PATH, "ffmpeg")
+        # Fetch single-file http(s) formats with segmented.py instead of yt-dlp's one connection
+        self.segmented = segmented
+        # Size-check, hash and probe finished files before they count as completed, see integrity.py
+        self.verify = verify
+        # OS priorities of the yt-dlp/ffmpeg children, by name; items can pick their own, see launch.py
+        self.launch_profiles = load_launch_profiles()
+        self.launch_profile = launch_profile or DEFAULT_LAUNCH_PROFILE
+        self.verifier = Verifier(find_ffprobe(self.ffmpeg_path))
+        self.verifier.verified.connect(self.on_verified)
+        # Audio conversions run in their own process pool, outside the download slots
+        self.converter = Converter(self.ffmpeg_path, convert_workers)
+        self.converter.converted.connect(self.on_converted)
+        self.converter.log_message.connect(self.log_message)
+        self.download_manager.download_started.connect(self.on_download_started)
+        self.download_manager.download_finished.connect(lambda item_id, success: self.converter.cancel(item_id))
+
+    def on_download_started(self, item_id):
+        item = self.download_manager.active_downloads.get(item_id)
+        # Items sent to a remote worker are run there, see cluster.py
+        if item and item.worker is None:
+            self.log_message.emit(f"[DOWNLOAD] Started: {item.title}")
+            self._create_download_process(item)
+
+    def launch_for(self, item, heavy=False):
+        """The LaunchProfile for one of the item's processes; heavy is merge or conversion work"""
+        name = item.launch_profile or self.launch_profile
+        profile = self.launch_profiles.get(name)
+        if profile is None:
+            self.log_message.emit(f"[{item.id}] Unknown launch profile {name!r}, using normal priorities")
+            profile = self.launch_profiles["normal"]
+        return profile.for_work(heavy)
+
+    def build_args(self, item):
+        args = [
+            "-f", item.format_selector,
+            item.url,
+            "--newline",
+            "-o", download_output(item),
+            # --force-overwrites implies --no-continue, so retries resume the .part files instead
+            "--continue" if item.resume else "--force-overwrites",
+            "--no-warnings",
+            "--embed-metadata",
+            "--ffmpeg-location", self.ffmpeg_path
+        ]
+        
+        if not item.audio_format and not item.output_path.lower().endswith(('.mp3', '.m4a', '.wav', '.flac')):
+            args.extend(["--merge-output-format", "mkv"])
+        # This download's share of the schedule window's bandwidth
+        rate_limit = self.download_manager.rate_limit_per_download()
+        if rate_limit:
+            args.extend(["--limit-rate", str(rate_limit)])
+        return args
+
+    def _create_download_process(self, item):
+        item.metrics = JobMetrics(retries=item.retry_count)
+        item.metrics.mark_started()
+        item.output_file = None
+        item.expected_size = None
+        item.verification = None
+        item.conversion = None
+        # A merged selector ("bv+ba") always needs yt-dlp and ffmpeg
+        if self.segmented and "+" not in item.format_selector:
+            self._resolve_direct(item)
+        else:
+            self._start_yt_dlp(item)
+
+    def _resolve_direct(self, item):
+        """Ask yt-dlp for the selected format's URL now, format URLs expire and lean fetches omit them"""
+        args = segmented.resolve_args(item)
+        self.log_message.emit(f"[DOWNLOAD] Resolving: {self.yt_dlp_path} {' '.join(args)}")
+        targets = []
+
+        def on_records(handle, records):
+            current = self.download_manager.active_downloads.get(item.id)
+            if current is not item or item.process is not handle:
+                return
+            for record in records:
+                if record[0] == "json":
+                    targets.append(segmented.direct_target(record[1]))
+                elif record[0] == "stderr":
+                    item.error_output = (item.error_output + record[1])[-4000:]
+                    self.log_message.emit(f"[{item.id} ERROR] {record[1]}")
+                elif record[0] == "finished":
+                    self._on_resolved(item, record[1], targets[0] if len(targets) == 1 else None)
+
+        item.process = process_hub().start(self.yt_dlp_path, args, "jsonlines", on_records, self.launch_for(item))
+
+    def _on_resolved(self, item, exit_code, target):
+        if exit_code != 0:
+            self._on_process_finished(item, exit_code)
+        elif target is None:
+            self.log_message.emit(f"[{item.id}] No single direct URL for this format, using yt-dlp")
+            self._start_yt_dlp(item)
+        else:
+            url, filename, headers, size = target
+            self.log_message.emit(f"[{item.id}] Segmented download of {filename}")
+            item.process = segmented.start_segmented(
+                url, filename, headers, size, item.resume, self.download_manager.rate_limit_per_download(),
+                lambda handle, records: self._on_process_records(item.id, handle, records))
+
+    def _start_yt_dlp(self, item):
+        args = self.build_args(item)
+        self.log_message.emit(f"[DOWNLOAD] Command: {self.yt_dlp_path} {' '.join(args)}")
+        # yt-dlp runs the merge itself, through an ffmpeg child that inherits its limits
+        item.process = process_hub().start(
+            self.yt_dlp_path, args, "download",
+            lambda handle, records: self._on_process_records(item.id, handle, records),
+            self.launch_for(item, heavy="+" in item.format_selector))
+
+    @profiled()
+    def _on_process_records(self, item_id, handle, records):
+        item = self.download_manager.active_downloads.get(item_id)
+        # Records of a killed earlier attempt can still arrive after a retry started
+        if not item or item.process is not handle:
+            return
+
+        progress = None
+        status = ""
+        for record in records:
+            kind = record[0]
+            if kind == "progress":
+                _, percent, size_text, speed_text, size_bytes, speed = record
+                if size_bytes:
+                    item.file_size = size_bytes
+                    if not size_text.startswith("~"):
+                        item.expected_size = max(item.expected_size or 0, size_bytes)
+                if speed_text:
+                    item.download_speed = speed or 0
+                item.metrics.on_progress(percent, size_bytes, speed)
+                progress = int(percent)
+            elif kind == "destination":
+                item.metrics.on_destination()
+                item.output_file = record[1]
+            elif kind == "output":
+                item.output_file = record[1]
+            elif kind == "postprocess":
+                item.metrics.on_postprocess()
+                status = record[1] or status
+            elif kind == "stdout":
+                if record[1].strip():
+                    self.log_message.emit(f"[{item_id}] {record[1]}")
+            elif kind == "stderr":
+                item.error_output = (item.error_output + record[1])[-4000:]
+                self.log_message.emit(f"[{item_id} ERROR] {record[1]}")
+            elif kind == "started":
+                self.download_manager.metrics.spawn_latency.observe(record[1])
+            elif kind == "finished":
+                self._on_process_finished(item, record[1])
+                return
+
+        # One progress update per batch, the last line wins
+        if progress is not None or status:
+            self.download_manager.update_progress(item_id, item.progress if progress is None else progress, status)
+
+    def _on_process_finished(self, item, exit_code):
+        success = exit_code == 0
+        failure_class = None if success else classify_failure(item.error_output)
+        
+        self.log_message.emit(f"[{item.id}] Finished with exit code: {exit_code}"
+                              + (f" ({failure_class} failure)" if failure_class else ""))
+        if success and item.output_file and needs_conversion(item.output_file, item.audio_format, item.loudnorm):
+            self.download_manager.begin_postprocess(item.id, f"Converting to {item.audio_format}...")
+            self.converter.convert(item.id, item.output_file, item.audio_format, item.loudnorm,
+                                   self.launch_for(item, heavy=True))
+            return
+        self._verify_or_finish(item, success, failure_class)
+
+    def _verify_or_finish(self, item, success, failure_class=None):
+        if success and self.verify and item.output_file:
+            if item.id in self.download_manager.postprocessing:
+                self.download_manager.update_progress(item.id, item.progress, "Verifying...")
+            else:
+                self.download_manager.begin_postprocess(item.id, "Verifying...")
+            self.verifier.verify(item.id, item.output_file, item.expected_size)
+            return
+        self.download_manager.finish_download(item.id, success, failure_class)
+
+    def on_converted(self, item_id, result):
+        item = self.download_manager.active_downloads.get(item_id)
+        # Cancelled while it was being converted
+        if item is None or item_id not in self.download_manager.postprocessing:
+            return
+        item.conversion = result
+        metrics = self.download_manager.metrics
+        metrics.conversions.inc(result="ok" if result["ok"] else "failed")
+        metrics.convert_duration.observe(result["seconds"])
+        if not result["ok"]:
+            # The download itself is fine and stays on disk; fetching it again wouldn't help
+            error = f"ERROR: Converting {result['source']} to {result['format']} failed: {result['error']}"
+            item.error_output = (item.error_output + error + "\n")[-4000:]
+            self.log_message.emit(f"[{item_id} ERROR] {error}")
+            self.download_manager.finish_download(item_id, False, "conversion")
+            return
+        item.output_file = result["path"]
+        # The stream sizes yt-dlp reported don't apply to the re-encoded file
+        item.expected_size = None
+        self._verify_or_finish(item, True)
+
+    def on_verified(self, item_id, result):
+        item = self.download_manager.active_downloads.get(item_id)
+        # Cancelled while it was being checked
+        if item is None or item_id not in self.download_manager.postprocessing:
+            return
+        item.verification = result
+        metrics = self.download_manager.metrics
+        metrics.verifications.inc(result="ok" if result["ok"] else "failed")
+        if result["seconds"] is not None:
+            metrics.verify_duration.observe(result["seconds"])
+        if result["ok"]:
+            self.log_message.emit(f"[{item_id}] Verified {result['path']}: {result['size']} bytes, "
+                                  f"sha256 {result['sha256'][:16]}..., probe {result['probe']}")
+            self.download_manager.finish_download(item_id, True)
+        else:
+            error = f"ERROR: Integrity check failed for {result['path']}: {result['error']}"
+            item.error_output = (item.error_output + error + "\n")[-4000:]
+            self.log_message.emit(f"[{item_id} ERROR] {error}")
+            self.download_manager.finish_download(item_id, False, "integrity")
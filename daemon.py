@@ -0,0 +1,273 @@
+import os
+import json
+import time
+from datetime import datetime
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal
+from core import DownloadHistory, DownloadManager, DownloadRunner, item_from_entry, batch_summary
+from control import ControlServer, MetricsServer, METRICS_PORT
+from cluster import Coordinator, COORDINATOR_HOST, COORDINATOR_PORT
+from procio import process_hub
+from schedule import SCHEDULE_FILE
+from audio import CONVERT_WORKERS
+from subscriptions import SubscriptionManager, STARTUP_DELAY
+from cli import DEFAULT_QUEUE_FILE, DEFAULT_STATUS_FILE, DEFAULT_OUTPUT_TEMPLATE, read_status
+
+# The status file doubles as the daemon heartbeat, see cli.STATUS_STALE_AFTER
+STATUS_HEARTBEAT = 5
+
+
+class HeadlessDaemon(QObject):
+    """Processes a JSON-lines queue file without the GUI.
+
+    New lines appended to the queue file are picked up while running. The
+    status file records the consumed queue offset and every unfinished item,
+    so a restarted daemon carries on where the previous one stopped.
+    """
+    finished = pyqtSignal(bool)
+
+    def __init__(self, queue_file=DEFAULT_QUEUE_FILE, status_file=DEFAULT_STATUS_FILE,
+                 max_concurrent=3, yt_dlp_path=None, ffmpeg_path=None,
+                 output_template=DEFAULT_OUTPUT_TEMPLATE, exit_when_done=False, verbose=False,
+                 control=True, metrics_port=METRICS_PORT, coordinator_port=COORDINATOR_PORT,
+                 coordinator_host=COORDINATOR_HOST, segmented=False, verify=True, schedule_file=SCHEDULE_FILE,
+                 convert_workers=CONVERT_WORKERS, launch_profile=None):
+        super().__init__()
+        self.queue_file = queue_file
+        self.status_file = status_file
+        self.output_template = output_template
+        self.exit_when_done = exit_when_done
+        self.verbose = verbose
+        self.schedule_file = schedule_file
+        self.started_at = datetime.now()
+        self.queue_offset = 0
+        self.results = []
+        self.status_dirty = True
+        self.last_status_write = 0
+
+        self.download_manager = DownloadManager(max_concurrent)
+        self.download_history = DownloadHistory()
+        self.download_runner = DownloadRunner(self.download_manager, yt_dlp_path, ffmpeg_path, segmented, verify,
+                                              convert_workers, launch_profile)
+
+        self.download_runner.log_message.connect(self.on_runner_message)
+        self.download_manager.download_started.connect(self.on_download_started)
+        self.download_manager.download_progress.connect(self.mark_dirty)
+        self.download_manager.download_retrying.connect(self.on_download_retrying)
+        self.download_manager.download_finished.connect(self.on_download_finished)
+        self.download_manager.batch_committed.connect(self.on_batch_committed)
+        self.download_manager.schedule_changed.connect(lambda message: self.log(f"[SCHEDULE] {message}"))
+
+        self.control_server = None
+        if control:
+            self.control_server = ControlServer(self.download_manager, output_template)
+            self.control_server.log_message.connect(self.log)
+        self.metrics_server = MetricsServer(self.download_manager.metrics, metrics_port)
+        self.metrics_server.log_message.connect(self.log)
+        # Remote workers, only when a coordinator port is given
+        self.coordinator = Coordinator(self.download_manager, coordinator_port, coordinator_host)
+        self.coordinator.log_message.connect(self.log)
+        # Channel/playlist feeds from Saves/subscriptions.json, see subscriptions.py
+        self.subscriptions = SubscriptionManager(self.download_manager, self.download_runner.yt_dlp_path,
+                                                 output_template)
+        self.subscriptions.log_message.connect(self.log)
+        self.subscriptions.polled.connect(lambda *args: QTimer.singleShot(0, self.check_done))
+        if self.control_server:
+            self.control_server.coordinator = self.coordinator
+            self.control_server.subscriptions = self.subscriptions
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.read_queue_file)
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.write_status_if_needed)
+
+    def log(self, message):
+        print(f"{datetime.now().strftime('%H:%M:%S')} {message.strip()}", flush=True)
+
+    def on_runner_message(self, message):
+        # Batch conversion totals are worth seeing without -v
+        if self.verbose or message.startswith("[CONVERT]"):
+            self.log(message)
+
+    def mark_dirty(self, *args):
+        self.status_dirty = True
+
+    def start(self):
+        if self.control_server:
+            self.control_server.start()
+        self.metrics_server.start()
+        self.coordinator.start()
+        self.load_schedule()
+        self.log_launch_profile()
+        self.recover_from_status()
+        self.read_queue_file()
+        # A run that exits when done polls what's due right away, e.g. from cron
+        self.subscriptions.start(delay=0 if self.exit_when_done else STARTUP_DELAY)
+        self.write_status()
+        self.poll_timer.start(2000)
+        self.status_timer.start(1000)
+        # From the event loop: quitting before app.exec() has started is a no-op
+        QTimer.singleShot(0, self.check_done)
+
+    def log_launch_profile(self):
+        name = self.download_runner.launch_profile
+        profile = self.download_runner.launch_profiles.get(name)
+        if profile is None:
+            self.log(f"[LAUNCH] Unknown launch profile {name!r}, children run with normal priorities")
+        elif profile.name != "normal":
+            self.log(f"[LAUNCH] Children run as {profile.describe()}")
+
+    def load_schedule(self):
+        # Before any item is queued, so nothing starts outside the windows
+        try:
+            self.download_manager.set_schedule_file(self.schedule_file)
+        except ValueError as e:
+            self.log(f"[SCHEDULE] Running without a schedule, {e}")
+            return
+        for window in self.download_manager.schedule.windows:
+            self.log(f"[SCHEDULE] Window {window.describe()}")
+
+    def recover_from_status(self):
+        previous = read_status(self.status_file)
+        if not previous or previous.get("queue_file") != os.path.abspath(self.queue_file):
+            return
+        self.queue_offset = previous.get("queue_offset", 0)
+        recovered = 0
+        for entry in previous.get("items", []):
+            entry["resume"] = True
+            item = item_from_entry(entry, self.output_template)
+            if item:
+                self.download_manager.add_to_queue(item)
+                recovered += 1
+        if recovered:
+            self.log(f"[DAEMON] Recovered {recovered} unfinished items from previous run")
+
+    def read_queue_file(self):
+        if not os.path.exists(self.queue_file):
+            return
+        if os.path.getsize(self.queue_file) < self.queue_offset:
+            # Queue file was truncated or replaced, start over
+            self.queue_offset = 0
+
+        with open(self.queue_file, "rb") as f:
+            f.seek(self.queue_offset)
+            data = f.read()
+
+        # Only consume complete lines, a writer may be halfway through the last one
+        end = data.rfind(b"\n")
+        if end == -1:
+            return
+        added = 0
+        for line in data[:end].decode("utf-8", errors="replace").splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = item_from_entry(json.loads(line), self.output_template)
+            except (ValueError, TypeError, AttributeError) as e:
+                # json.JSONDecodeError is a ValueError, as is an invalid start_after/finish_before
+                self.log(f"[DAEMON] Skipping malformed queue line ({e}): {line[:100]}")
+                continue
+            if item:
+                self.download_manager.add_to_queue(item)
+                added += 1
+        self.queue_offset += end + 1
+        if added:
+            self.log(f"[QUEUE] Picked up {added} new items")
+            self.status_dirty = True
+
+    def on_download_started(self, item_id):
+        item = self.download_manager.active_downloads.get(item_id)
+        if item:
+            self.log(f"[DOWNLOAD] Started: {item.title}")
+        self.status_dirty = True
+
+    def on_download_retrying(self, item_id, attempt, delay):
+        item = self.download_manager.retry_pending.get(item_id)
+        if item:
+            self.log(f"[RETRY] {item.title}: attempt {attempt}/{item.max_retries} in {delay}s")
+        self.status_dirty = True
+
+    def on_download_finished(self, item_id, success):
+        item = self.download_manager.active_downloads.get(item_id)
+        # Bulk operations log and write the history once, in on_batch_committed
+        if item and not self.download_manager.in_batch():
+            self.log(f"[DOWNLOAD] {item.status}: {item.title}")
+            self.download_history.add_item(item)
+        if item and not item.dropped:
+            self.results.insert(0, {
+                "id": item.id,
+                "title": item.title,
+                "url": item.url,
+                "status": item.status,
+                "retry_count": item.retry_count,
+                "output_path": item.output_path,
+                "file": item.output_file,
+                "sha256": (item.verification or {}).get("sha256"),
+                "conversion": item.conversion
+            })
+            del self.results[200:]
+        self.status_dirty = True
+        # The manager removes the item right after emitting, check once it has
+        QTimer.singleShot(0, self.check_done)
+
+    def on_batch_committed(self, items):
+        if len(items) == 1:
+            self.log(f"[DOWNLOAD] {items[0].status}: {items[0].title}")
+        else:
+            self.log(f"[DOWNLOAD] {batch_summary(items)}")
+        self.download_history.add_items(items)
+
+    def is_idle(self):
+        if self.download_manager.get_all_items() or self.subscriptions.is_busy():
+            return False
+        return not os.path.exists(self.queue_file) or os.path.getsize(self.queue_file) <= self.queue_offset
+
+    def check_done(self):
+        if self.exit_when_done and self.is_idle():
+            self.coordinator.stop()
+            self.write_status(stopped=True)
+            self.log("[DAEMON] Queue drained, exiting")
+            # Cancelling is the user's call, not a failure
+            self.finished.emit(all(r["status"] in ("Completed", "Cancelled") for r in self.results))
+
+    def write_status_if_needed(self):
+        if self.status_dirty or time.time() - self.last_status_write >= STATUS_HEARTBEAT:
+            self.write_status()
+
+    def write_status(self, stopped=False):
+        status = {
+            "pid": os.getpid(),
+            "stopped": stopped,
+            "started": self.started_at.isoformat(),
+            "updated": datetime.now().isoformat(),
+            "queue_file": os.path.abspath(self.queue_file),
+            "queue_offset": self.queue_offset,
+            "idle": self.is_idle(),
+            "items": self.download_manager.snapshot(),
+            "results": self.results
+        }
+        folder = os.path.dirname(self.status_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = self.status_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(status, f, indent=2, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.status_file)
+        except Exception as e:
+            self.log(f"[DAEMON] Error writing status: {e}")
+        self.status_dirty = False
+        self.last_status_write = time.time()
+
+    def shutdown(self):
+        # Unfinished items stay in the status file and are picked up again on restart
+        self.poll_timer.stop()
+        self.status_timer.stop()
+        if self.control_server:
+            self.control_server.stop()
+        self.metrics_server.stop()
+        self.coordinator.stop()
+        self.subscriptions.stop()
+        self.write_status(stopped=True)
+        process_hub().shutdown()
+        QCoreApplication.quit()
+
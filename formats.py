@@ -0,0 +1,573 @@
+"""Format table model and the structured filter behind the Filter box.
+
+Rows are built once per fetch with their display text, numeric sort keys and
+a lowercase search index; filtering and sorting never touch the widgets.
+
+Filter syntax, terms are ANDed:
+
+    height>=1080  fps>30  tbr<2000  size<500MB     numeric comparison
+    vcodec:av01   ext:webm  note:premium           substring of one field
+    audio  video                                   audio-only / has video
+    1080p  opus                                    substring of the whole row
+    -webm  !vcodec:avc1                            negated term
+
+rank_formats() picks the download for "Add Best" from the same format list,
+following a FormatProfile's rules (resolution cap, codec preference, byte
+budget, audio bitrate), and estimates what yt-dlp's own
+bestvideo+bestaudio/best would have cost instead.
+
+info_fetch_args() builds the yt-dlp command for the format list: the full
+-J dump, or a lean one that prints just the fields the app uses.
+"""
+import os
+import re
+import json
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QColor, QFont
+from metrics import parse_size, format_bytes
+
+COLUMNS = ["Itag", "Ext", "Resolution", "Type", "VCodec", "ACodec", "FPS", "Bitrate", "Size", "Note"]
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+NUMERIC_FIELDS = {
+    "height": "height", "h": "height", "res": "height",
+    "width": "width", "w": "width",
+    "fps": "fps",
+    "tbr": "tbr", "bitrate": "tbr", "br": "tbr",
+    "vbr": "vbr", "abr": "abr", "asr": "asr",
+    "size": "size", "filesize": "size",
+}
+TEXT_FIELDS = {
+    "id": "id", "itag": "id",
+    "ext": "ext",
+    "vcodec": "vcodec", "acodec": "acodec", "codec": "codecs",
+    "note": "note", "type": "type",
+    "proto": "protocol", "protocol": "protocol",
+}
+# Field order of FormatRow.numbers and FormatRow.texts
+NUMERIC_KEYS = ("height", "width", "fps", "tbr", "vbr", "abr", "asr", "size")
+TEXT_KEYS = ("id", "ext", "vcodec", "acodec", "codecs", "note", "type", "protocol")
+TERM_RE = re.compile(r"^([a-z_]+)(>=|<=|!=|>|<|=|:)(.+)$")
+OPERATORS = {
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+DEFAULT_SELECTOR = "bestvideo+bestaudio/best"
+PROFILES_FILE = "Saves/format_profiles.json"
+# Most efficient first; prefixes of yt-dlp's vcodec/acodec strings
+EFFICIENT_VCODECS = ["av01", "vp09", "vp9", "hev1", "hvc1", "avc1", "h264"]
+EFFICIENT_ACODECS = ["opus", "mp4a", "vorbis", "mp3"]
+
+
+# Everything the table, the ranker and the queue read from an info dict
+LEAN_INFO_FIELDS = ["id", "title", "duration", "webpage_url", "extractor_key", "thumbnail"]
+LEAN_FORMAT_FIELDS = [
+    "format_id", "ext", "width", "height", "fps", "vcodec", "acodec", "tbr", "vbr", "abr", "asr",
+    "filesize", "filesize_approx", "format_note", "protocol",
+]
+
+
+def info_fetch_args(url, lean=True):
+    """yt-dlp arguments for fetching a video's formats.
+
+    The full mode dumps the whole info dict with -J; caption tracks,
+    thumbnails and heatmaps make that several MB. The lean mode prints two
+    JSON lines, the top-level fields and the trimmed format list, and skips
+    caption and comment extraction. Parse the lean output with lean_info().
+    """
+    if not lean:
+        return ["-J", "--no-warnings", url]
+    return [
+        "--no-warnings", "--skip-download", "--no-write-comments", "--no-write-subs",
+        "--no-write-auto-subs", "--extractor-args", "youtube:skip=translated_subs",
+        "-O", "%(.{" + ",".join(LEAN_INFO_FIELDS) + "})j",
+        "-O", "%(formats.:.{" + ",".join(LEAN_FORMAT_FIELDS) + "})j",
+        url,
+    ]
+
+
+def lean_info(objects):
+    """Merge the JSON lines of a lean fetch into an info dict, None if incomplete"""
+    info = None
+    formats = None
+    for obj in objects:
+        if isinstance(obj, dict) and info is None:
+            info = dict(obj)
+        elif isinstance(obj, list) and formats is None:
+            formats = [fmt for fmt in obj if isinstance(fmt, dict)]
+    if info is None or formats is None:
+        return None
+    info["formats"] = formats
+    return info
+
+
+def trim_info(info):
+    """Drop everything from a full -J info dict that lean mode wouldn't fetch"""
+    trimmed = {key: info[key] for key in LEAN_INFO_FIELDS if key in info}
+    trimmed["formats"] = [{key: fmt[key] for key in LEAN_FORMAT_FIELDS if key in fmt}
+                          for fmt in info.get("formats") or []]
+    return trimmed
+
+
+def format_size_bytes(fmt):
+    return fmt.get("filesize") or fmt.get("filesize_approx")
+
+
+def is_audio_only(fmt):
+    return fmt.get("vcodec") == "none"
+
+
+def has_audio(fmt):
+    return fmt.get("acodec") not in (None, "none")
+
+
+def estimate_bytes(fmt, duration=None):
+    """Reported size, else total bitrate (kbit/s) times duration, else None"""
+    size = format_size_bytes(fmt)
+    if size:
+        return int(size)
+    tbr = fmt.get("tbr")
+    if tbr and duration:
+        return int(tbr * 1000 / 8 * duration)
+    return None
+
+
+def codec_rank(codec, preference):
+    """Higher is better; codecs missing from the preference list rank lowest"""
+    codec = (codec or "").lower()
+    for position, prefix in enumerate(preference):
+        if codec.startswith(prefix):
+            return len(preference) - position
+    return 0
+
+
+class FormatProfile:
+    """Rules for picking the "best" download.
+
+    max_height caps the resolution, vcodecs/acodecs order codecs from most to
+    least preferred, max_bytes is a budget for video+audio together and
+    max_abr caps the audio bitrate (kbit/s). audio_only skips video entirely.
+    """
+
+    def __init__(self, name, max_height=None, vcodecs=None, acodecs=None, max_bytes=None,
+                 max_abr=None, audio_only=False):
+        self.name = name
+        self.max_height = max_height
+        self.vcodecs = list(vcodecs if vcodecs is not None else EFFICIENT_VCODECS)
+        self.acodecs = list(acodecs if acodecs is not None else EFFICIENT_ACODECS)
+        self.max_bytes = max_bytes
+        self.max_abr = max_abr
+        self.audio_only = audio_only
+
+    @classmethod
+    def from_dict(cls, data):
+        max_bytes = data.get("max_bytes")
+        if isinstance(max_bytes, str):
+            max_bytes = parse_size(max_bytes)
+        return cls(data["name"], data.get("max_height"), data.get("vcodecs"), data.get("acodecs"),
+                   max_bytes, data.get("max_abr"), bool(data.get("audio_only")))
+
+    def selector(self):
+        """A yt-dlp selector with the resolution and audio bitrate caps, for downloads queued without a
+        format list (subscriptions); codec order and size budget need the list and are left out"""
+        audio = f"[abr<={self.max_abr}]" if self.max_abr else ""
+        if self.audio_only:
+            return f"ba{audio}/ba" if audio else "ba"
+        video = f"[height<={self.max_height}]" if self.max_height else ""
+        if not video and not audio:
+            return DEFAULT_SELECTOR
+        return f"bv*{video}+ba{audio}/b{video}/{DEFAULT_SELECTOR}"
+
+    def to_dict(self):
+        return {
+            "name": self.name, "max_height": self.max_height, "vcodecs": self.vcodecs,
+            "acodecs": self.acodecs, "max_bytes": self.max_bytes, "max_abr": self.max_abr,
+            "audio_only": self.audio_only,
+        }
+
+
+DEFAULT_PROFILES = [
+    FormatProfile("Best quality"),
+    FormatProfile("Balanced (1080p)", max_height=1080, max_abr=160),
+    FormatProfile("Data saver (720p)", max_height=720, max_abr=96),
+    FormatProfile("Under 500 MiB", max_bytes=500 * 1024 * 1024, max_abr=160),
+    FormatProfile("Audio only", audio_only=True),
+]
+
+
+def load_profiles(path=PROFILES_FILE):
+    """Built-in profiles, overridden or extended by entries in the profiles file"""
+    profiles = {profile.name: profile for profile in DEFAULT_PROFILES}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    profile = FormatProfile.from_dict(entry)
+                    profiles[profile.name] = profile
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading format profiles: {e}")
+    return list(profiles.values())
+
+
+class FormatChoice:
+    """What rank_formats picked, and what yt-dlp's default would have fetched"""
+
+    def __init__(self, video, audio, expected_bytes, default_bytes):
+        self.video = video
+        self.audio = audio
+        self.expected_bytes = expected_bytes
+        self.default_bytes = default_bytes
+
+    @property
+    def format_id(self):
+        ids = [str(fmt.get("format_id")) for fmt in (self.video, self.audio) if fmt is not None]
+        return "+".join(ids)
+
+    @property
+    def selector(self):
+        # The exact pick, with a generic one behind it in case the ids vanish
+        # between the fetch and the download (expired manifests)
+        if not self.format_id:
+            return DEFAULT_SELECTOR
+        fallback = "bestaudio/best" if self.video is None else DEFAULT_SELECTOR
+        return f"{self.format_id}/{fallback}"
+
+    @property
+    def bytes_saved(self):
+        if self.expected_bytes is None or self.default_bytes is None:
+            return None
+        return self.default_bytes - self.expected_bytes
+
+    def describe(self):
+        parts = []
+        if self.video is not None:
+            video = self.video
+            codec = (video.get("vcodec") or "").split(".")[0]
+            parts.append(f"{video.get('format_id')} ({video.get('height') or '?'}p {codec})")
+        if self.audio is not None:
+            codec = (self.audio.get("acodec") or "").split(".")[0]
+            abr = self.audio.get("abr")
+            parts.append(f"{self.audio.get('format_id')} ({codec}{f' {abr:.0f}k' if abr else ''})")
+        text = " + ".join(parts) or DEFAULT_SELECTOR
+        if self.expected_bytes is not None:
+            text += f", ~{format_bytes(self.expected_bytes)}"
+        saved = self.bytes_saved
+        if saved is not None and self.default_bytes:
+            if saved > 0:
+                text += (f", {format_bytes(saved)} ({saved / self.default_bytes:.0%}) less than "
+                         f"{DEFAULT_SELECTOR}")
+            elif saved == 0:
+                text += f", same as {DEFAULT_SELECTOR}"
+            else:
+                text += f", {format_bytes(-saved)} more than {DEFAULT_SELECTOR}"
+        return text
+
+
+def _size_sum(*sizes):
+    known = [size for size in sizes if size is not None]
+    return sum(known) if known else None
+
+
+def default_choice(formats, duration=None):
+    """Roughly what yt-dlp picks for bestvideo+bestaudio/best: highest
+    resolution, then fps, then bitrate, regardless of size"""
+    videos = [fmt for fmt in formats if fmt.get("vcodec") not in (None, "none") and not has_audio(fmt)]
+    audios = [fmt for fmt in formats if is_audio_only(fmt) and has_audio(fmt)]
+    video_key = lambda f: (f.get("height") or 0, f.get("fps") or 0, f.get("tbr") or 0)
+    if videos and audios:
+        video = max(videos, key=video_key)
+        audio = max(audios, key=lambda f: f.get("abr") or f.get("tbr") or 0)
+        return video, audio
+    muxed = [fmt for fmt in formats if fmt.get("vcodec") not in (None, "none")]
+    if muxed:
+        return max(muxed, key=video_key), None
+    if audios:
+        return None, max(audios, key=lambda f: f.get("abr") or f.get("tbr") or 0)
+    return None, None
+
+
+def _pick_audio(audios, profile):
+    if not audios:
+        return None
+    cap = profile.max_abr
+
+    def key(fmt):
+        abr = fmt.get("abr") or fmt.get("tbr") or 0
+        within = cap is None or abr <= cap
+        # Over the cap, the closest to it wins
+        return (within, codec_rank(fmt.get("acodec"), profile.acodecs) if within else 0,
+                abr if within else -abr)
+    return max(audios, key=key)
+
+
+def rank_formats(formats, profile, duration=None):
+    """Pick the video and audio formats that best fit the profile.
+
+    Video candidates within the height cap are ranked by resolution, then
+    codec preference, then fps, then smaller size; the first one whose
+    video+audio estimate fits the byte budget wins, or the smallest one if
+    none does. Muxed formats (video with audio) are used alone.
+    """
+    default_video, default_audio = default_choice(formats, duration)
+    default_bytes = _size_sum(*(estimate_bytes(fmt, duration) for fmt in (default_video, default_audio)
+                                if fmt is not None))
+
+    audios = [fmt for fmt in formats if is_audio_only(fmt) and has_audio(fmt)]
+    audio = _pick_audio(audios, profile)
+    audio_bytes = estimate_bytes(audio, duration) if audio is not None else None
+
+    if profile.audio_only:
+        return FormatChoice(None, audio, audio_bytes, default_bytes)
+
+    videos = [fmt for fmt in formats if fmt.get("vcodec") not in (None, "none")]
+    if profile.max_height:
+        capped = [fmt for fmt in videos if (fmt.get("height") or 0) <= profile.max_height]
+        # Nothing under the cap: fall back to the smallest resolution available
+        if not capped and videos:
+            lowest = min(fmt.get("height") or 0 for fmt in videos)
+            capped = [fmt for fmt in videos if (fmt.get("height") or 0) == lowest]
+        videos = capped
+    if not videos:
+        return FormatChoice(None, audio, audio_bytes, default_bytes)
+
+    def total(fmt):
+        if has_audio(fmt):
+            return estimate_bytes(fmt, duration)
+        return _size_sum(estimate_bytes(fmt, duration), audio_bytes)
+
+    def key(fmt):
+        size = total(fmt)
+        return (fmt.get("height") or 0, codec_rank(fmt.get("vcodec"), profile.vcodecs),
+                fmt.get("fps") or 0, -(size if size is not None else float("inf")))
+
+    ranked = sorted(videos, key=key, reverse=True)
+    video = ranked[0]
+    if profile.max_bytes:
+        fitting = [fmt for fmt in ranked if total(fmt) is not None and total(fmt) <= profile.max_bytes]
+        if fitting:
+            video = fitting[0]
+        else:
+            sized = [fmt for fmt in ranked if total(fmt) is not None]
+            if sized:
+                video = min(sized, key=total)
+
+    if has_audio(video):
+        return FormatChoice(video, None, estimate_bytes(video, duration), default_bytes)
+    return FormatChoice(video, audio, total(video), default_bytes)
+
+
+class FormatRow:
+    """Display text, sort keys and filter fields of one format, as tuples"""
+    __slots__ = ("fmt", "values", "keys", "numbers", "texts", "index", "audio_only")
+
+    def __init__(self, fmt, position):
+        self.fmt = fmt
+        width = fmt.get("width")
+        height = fmt.get("height")
+        vcodec = fmt.get("vcodec") or ""
+        acodec = fmt.get("acodec") or ""
+        self.audio_only = is_audio_only(fmt)
+        typ = "Audio" if self.audio_only else "Video"
+        ext = fmt.get("ext", "mkv")
+        fps = fmt.get("fps")
+        tbr = fmt.get("tbr")
+        size_bytes = format_size_bytes(fmt)
+        itag = str(fmt.get("format_id", position + 1))
+
+        self.values = (
+            itag,
+            ext if self.audio_only else "mkv",
+            f"{width}x{height}" if width and height else "",
+            typ,
+            vcodec,
+            acodec,
+            str(fps or ""),
+            str(tbr or ""),
+            f"{round(size_bytes / (1024 * 1024), 2)} MiB" if size_bytes else "",
+            fmt.get("format_note", ""),
+        )
+        # Numeric columns sort as numbers, missing values first
+        self.keys = (
+            itag.lower(),
+            self.values[1],
+            float((width or 0) * (height or 0)),
+            typ,
+            vcodec.lower(),
+            acodec.lower(),
+            float(fps or -1),
+            float(tbr or -1),
+            float(size_bytes or -1),
+            self.values[9].lower(),
+        )
+        self.numbers = (height, width, fps, tbr, fmt.get("vbr"), fmt.get("abr"), fmt.get("asr"), size_bytes)
+        self.texts = (
+            self.keys[0], ext.lower(), self.keys[4], self.keys[5], f"{vcodec} {acodec}".lower(),
+            self.keys[9], typ.lower(), (fmt.get("protocol") or "").lower(),
+        )
+        self.index = " ".join(self.values + (ext, fmt.get("protocol") or "")).lower()
+
+
+def parse_query_value(field, text):
+    if field == "size":
+        # Bare numbers are MiB, "500MB"/"1.5GiB" carry their own unit
+        try:
+            return float(text) * 1024 * 1024
+        except ValueError:
+            return parse_size(text)
+    try:
+        return float(text.rstrip("p"))
+    except ValueError:
+        return None
+
+
+def compile_term(term):
+    """One query term -> predicate(row), or None for an empty term"""
+    term = term.strip().lower()
+    if not term:
+        return None
+    negate = term[0] in "-!" and len(term) > 1
+    body = term[1:] if negate else term
+
+    predicate = None
+    m = TERM_RE.match(body)
+    if m:
+        name, op, value = m.groups()
+        if op == ":" and name in TEXT_FIELDS:
+            field = TEXT_KEYS.index(TEXT_FIELDS[name])
+            predicate = lambda row, f=field, v=value: v in row.texts[f]
+        elif op != ":" and name in NUMERIC_FIELDS:
+            field = NUMERIC_FIELDS[name]
+            number = parse_query_value(field, value)
+            if number is not None:
+                compare = OPERATORS[op]
+                position = NUMERIC_KEYS.index(field)
+                predicate = lambda row, f=position, n=number, c=compare: row.numbers[f] is not None and c(row.numbers[f], n)
+    if predicate is None:
+        if body == "audio":
+            predicate = lambda row: row.audio_only
+        elif body == "video":
+            predicate = lambda row: not row.audio_only
+        else:
+            predicate = lambda row, v=body: v in row.index
+
+    if negate:
+        return lambda row, p=predicate: not p(row)
+    return predicate
+
+
+def compile_query(text):
+    return [p for p in (compile_term(term) for term in text.split()) if p is not None]
+
+
+class FormatTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.best_row = None
+        self.message = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1 if self.message else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def set_formats(self, formats, best_row=None):
+        self.beginResetModel()
+        self.message = None
+        self.rows = [FormatRow(fmt, position) for position, fmt in enumerate(formats)]
+        self.best_row = best_row
+        self.endResetModel()
+
+    def set_best_row(self, best_row):
+        previous, self.best_row = self.best_row, best_row
+        for row in (previous, best_row):
+            if row is not None and 0 <= row < len(self.rows):
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+
+    def set_message(self, text, background):
+        """Replace the rows with a single status line, e.g. "Fetching formats..." """
+        self.beginResetModel()
+        self.rows = []
+        self.best_row = None
+        self.message = (text, background)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.best_row = None
+        self.message = None
+        self.endResetModel()
+
+    def format_at(self, row):
+        if self.message or not 0 <= row < len(self.rows):
+            return None
+        return self.rows[row].fmt
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.message:
+            text, background = self.message
+            if role == Qt.ItemDataRole.DisplayRole:
+                return text if index.column() == 0 else ""
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return QColor(background)
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(Qt.GlobalColor.white)
+            if role == Qt.ItemDataRole.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+            return None
+
+        row = self.rows[index.row()]
+        best = index.row() == self.best_row
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.values[index.column()]
+        if role == SORT_ROLE:
+            return row.keys[index.column()]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if best:
+                return QColor(Qt.GlobalColor.darkGreen)
+            if row.audio_only:
+                return QColor(Qt.GlobalColor.lightGray)
+        if role == Qt.ItemDataRole.ForegroundRole and best:
+            return QColor(Qt.GlobalColor.white)
+        if role == Qt.ItemDataRole.FontRole and best:
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+
+class FormatFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.predicates = []
+        self.setSortRole(SORT_ROLE)
+
+    def set_query(self, text):
+        self.predicates = compile_query(text)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        if model.message or not self.predicates:
+            return True
+        row = model.rows[source_row]
+        return all(predicate(row) for predicate in self.predicates)
@@ -0,0 +1,179 @@
+"""Integrity checks for finished downloads.
+
+An exit code of 0 doesn't prove the file on disk is whole, so when
+verification is on the runner hands every finished download to a Verifier
+before it's marked Completed. Verifier.verify(item_id, path, expected_size)
+checks, off the GUI thread:
+
+- the file exists and isn't shorter than expected_size by more than
+  SIZE_TOLERANCE; expected_size is the largest exact stream size yt-dlp
+  reported, and merging or embedding metadata changes the final size a bit
+- its SHA-256, in one sequential pass with a large buffer right after the
+  download, while the file is still in the page cache; the digest goes into
+  the history entry so copies can be compared later
+- when ffprobe is available, that the container parses and has at least one
+  stream with a positive duration
+
+Size checks and hashes run on a small QThreadPool whose threads run at a
+lower CPU priority on Linux; probes go through the process hub, at most
+PROBE_CONCURRENCY at a time. verified(item_id, result) is emitted on the
+owner's thread with a dict that ends up in the history entry.
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import threading
+from collections import deque
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from procio import process_hub
+
+VERIFY_THREADS = 2
+PROBE_CONCURRENCY = 2
+HASH_BUFFER_SIZE = 4 * 1024 * 1024
+SIZE_TOLERANCE = 0.02
+# Hash threads yield to the GUI and the downloads
+HASH_NICENESS = 10
+
+
+def find_ffprobe(ffmpeg_path):
+    """ffprobe next to the ffmpeg in use, else on PATH, else None"""
+    folder, name = os.path.split(ffmpeg_path or "")
+    candidate = os.path.join(folder, name.replace("ffmpeg", "ffprobe"))
+    if folder and "ffmpeg" in name and os.path.exists(candidate):
+        return candidate
+    return shutil.which("ffprobe")
+
+
+def hash_file(path, buffer_size=HASH_BUFFER_SIZE):
+    digest = hashlib.sha256()
+    buffer = memoryview(bytearray(buffer_size))
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            # hashlib releases the GIL for large updates
+            digest.update(buffer[:count])
+    return digest.hexdigest()
+
+
+def check_file(path, expected_size):
+    """Size and hash part of a verification result"""
+    result = {"path": path, "ok": False, "error": "", "size": None, "expected_size": expected_size,
+              "sha256": None, "probe": "skipped"}
+    try:
+        result["size"] = os.path.getsize(path)
+        if expected_size and result["size"] < expected_size * (1 - SIZE_TOLERANCE):
+            result["error"] = f"file is {result['size']} bytes, expected about {expected_size}"
+            return result
+        result["sha256"] = hash_file(path)
+    except OSError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    result["ok"] = True
+    return result
+
+
+class _HashNotifier(QObject):
+    checked = pyqtSignal(str, dict)
+
+
+class HashTask(QRunnable):
+    def __init__(self, item_id, path, expected_size, notifier):
+        super().__init__()
+        self.item_id = item_id
+        self.path = path
+        self.expected_size = expected_size
+        self.notifier = notifier
+
+    def run(self):
+        if sys.platform.startswith("linux"):
+            # Linux nice values are per thread; elsewhere this would renice the whole app
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), HASH_NICENESS)
+            except OSError:
+                pass
+        self.notifier.checked.emit(self.item_id, check_file(self.path, self.expected_size))
+
+
+def probe_args(path):
+    return ["-v", "error", "-show_entries", "format=duration:stream=codec_type", "-of", "json", path]
+
+
+def probe_error(document):
+    """None if ffprobe's output describes a playable file, else the reason"""
+    if not isinstance(document, dict) or not document.get("streams"):
+        return "ffprobe found no streams"
+    duration = (document.get("format") or {}).get("duration")
+    try:
+        if duration is not None and float(duration) <= 0:
+            return f"ffprobe reports a duration of {duration}"
+    except ValueError:
+        pass
+    return None
+
+
+class Verifier(QObject):
+    verified = pyqtSignal(str, dict)
+
+    def __init__(self, ffprobe_path=None, threads=VERIFY_THREADS, probe_concurrency=PROBE_CONCURRENCY):
+        super().__init__()
+        self.ffprobe_path = ffprobe_path
+        self.probe_concurrency = probe_concurrency
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(threads)
+        self.notifier = _HashNotifier()
+        self.notifier.checked.connect(self.on_checked)
+        self.started = {}
+        self.probe_queue = deque()
+        self.probing = {}
+
+    def verify(self, item_id, path, expected_size=None):
+        self.started[item_id] = time.monotonic()
+        self.pool.start(HashTask(item_id, path, expected_size, self.notifier))
+
+    def on_checked(self, item_id, result):
+        if not result["ok"] or not self.ffprobe_path:
+            self.done(item_id, result)
+            return
+        self.probe_queue.append((item_id, result))
+        self.start_probes()
+
+    def start_probes(self):
+        while self.probe_queue and len(self.probing) < self.probe_concurrency:
+            item_id, result = self.probe_queue.popleft()
+            output = {}
+
+            def on_records(handle, records, item_id=item_id, result=result, output=output):
+                for record in records:
+                    if record[0] == "json":
+                        output["document"] = record[1]
+                    elif record[0] == "stderr":
+                        output["stderr"] = output.get("stderr", "") + record[1]
+                    elif record[0] == "finished":
+                        self.on_probed(item_id, result, record[1], output)
+
+            self.probing[item_id] = process_hub().start(self.ffprobe_path, probe_args(result["path"]), "json",
+                                                        on_records)
+
+    def on_probed(self, item_id, result, exit_code, output):
+        self.probing.pop(item_id, None)
+        document = output.get("document")
+        error = probe_error(document) if exit_code == 0 else \
+            (output.get("stderr", "").strip().splitlines() or [f"ffprobe exited with {exit_code}"])[-1]
+        if error:
+            result.update(ok=False, probe="failed", error=error)
+        else:
+            result.update(probe="ok", duration=float(document.get("format", {}).get("duration") or 0),
+                          streams=[stream.get("codec_type") for stream in document["streams"]])
+        self.done(item_id, result)
+        self.start_probes()
+
+    def done(self, item_id, result):
+        started = self.started.pop(item_id, None)
+        result["seconds"] = round(time.monotonic() - started, 3) if started is not None else None
+        self.verified.emit(item_id, result)
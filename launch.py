@@ -0,0 +1,173 @@
+"""OS-level priorities for child processes.
+
+yt-dlp and ffmpeg children would otherwise inherit the GUI's priority and
+compete with it, and with everything else on the host, for CPU and disk. A
+LaunchProfile says how they should run:
+
+    nice       CPU nice level, 0-19
+    io_class   "idle", or "best-effort" with io_level 0 (high) to 7 (low)
+    cpus       CPU affinity, e.g. "1-3,6", or "spare" for every CPU but the first
+    memory     address-space cap in bytes or e.g. "2GiB"
+
+nice and io_class apply to every child. cpus and memory only apply to heavy
+work, merges and conversions, where ffmpeg can take every core and a lot of
+memory; a plain download is network-bound.
+
+On Linux the command is prefixed with nice, ionice, taskset and prlimit,
+whichever are installed, and the ffmpeg that yt-dlp starts for a merge
+inherits all of it. macOS only has nice. On Windows, with psutil installed,
+the priority class, I/O priority and affinity are set right after the
+process starts; memory caps and the profile as a whole are ignored without
+psutil.
+
+Built in are "normal" (inherit everything) and "background", which keeps the
+machine responsive under a large batch. Saves/launch_profiles.json can add
+profiles or override these, in the same form as format profiles:
+
+    [{"name": "night", "nice": 5, "io_class": "best-effort", "io_level": 6, "memory": "4GiB"}]
+"""
+import os
+import json
+import shutil
+from metrics import parse_size
+
+LAUNCH_PROFILES_FILE = "Saves/launch_profiles.json"
+DEFAULT_LAUNCH_PROFILE = os.environ.get("VDM_LAUNCH_PROFILE") or "normal"
+IO_CLASSES = {"best-effort": "2", "idle": "3"}
+# Windows I/O priorities (psutil.IOPRIO_*) by io_class
+WINDOWS_IO_PRIORITIES = {"best-effort": "IOPRIO_LOW", "idle": "IOPRIO_VERYLOW"}
+WRAPPERS = ("nice", "ionice", "taskset", "prlimit")
+_wrapper_paths = None
+
+
+def wrapper_paths():
+    """Installed nice/ionice/taskset/prlimit, looked up once"""
+    global _wrapper_paths
+    if _wrapper_paths is None:
+        _wrapper_paths = {name: shutil.which(name) for name in WRAPPERS} if os.name == "posix" else {}
+    return _wrapper_paths
+
+
+def parse_cpus(value):
+    """"1-3,6" or [1, 2, 3, 6] -> sorted CPU numbers; "spare" leaves the first CPU to the GUI"""
+    if value is None:
+        return None
+    if value == "spare":
+        count = os.cpu_count() or 1
+        return list(range(1, count)) if count > 1 else None
+    if isinstance(value, str):
+        cpus = set()
+        for part in value.split(","):
+            first, _, last = part.strip().partition("-")
+            cpus.update(range(int(first), int(last or first) + 1))
+        value = cpus
+    return sorted(int(cpu) for cpu in value)
+
+
+class LaunchProfile:
+    def __init__(self, name, nice=None, io_class=None, io_level=None, cpus=None, memory=None):
+        if io_class is not None and io_class not in IO_CLASSES:
+            raise ValueError(f"io_class must be one of {', '.join(IO_CLASSES)}, not {io_class!r}")
+        self.name = name
+        self.nice = nice
+        self.io_class = io_class
+        self.io_level = io_level
+        self.cpus = cpus            # as given, resolved by parse_cpus() at launch
+        self.memory = memory        # bytes
+
+    @classmethod
+    def from_dict(cls, data):
+        memory = data.get("memory")
+        if isinstance(memory, str):
+            memory = parse_size(memory)
+            if memory is None:
+                raise ValueError(f"not a size: {data.get('memory')!r}")
+        cpus = data.get("cpus")
+        parse_cpus(cpus)
+        return cls(data["name"], data.get("nice"), data.get("io_class"), data.get("io_level"), cpus,
+                   int(memory) if memory else None)
+
+    def for_work(self, heavy):
+        """This profile as it applies to one job; light work drops affinity and the memory cap"""
+        if heavy or (self.cpus is None and self.memory is None):
+            return self
+        return LaunchProfile(self.name, self.nice, self.io_class, self.io_level)
+
+    def with_nice(self, nice):
+        """A copy that runs at least this nice"""
+        return LaunchProfile(self.name, max(self.nice or 0, nice), self.io_class, self.io_level, self.cpus,
+                             self.memory)
+
+    def wrap(self, program, args):
+        """(program, args) with the POSIX wrappers in front"""
+        tools = wrapper_paths()
+        prefix = []
+        if self.nice and tools.get("nice"):
+            prefix += [tools["nice"], "-n", str(self.nice)]
+        if self.io_class and tools.get("ionice"):
+            prefix += [tools["ionice"], "-c", IO_CLASSES[self.io_class]]
+            if self.io_class == "best-effort" and self.io_level is not None:
+                prefix += ["-n", str(self.io_level)]
+        cpus = parse_cpus(self.cpus)
+        if cpus and tools.get("taskset"):
+            prefix += [tools["taskset"], "-c", ",".join(map(str, cpus))]
+        if self.memory and tools.get("prlimit"):
+            prefix += [tools["prlimit"], f"--as={self.memory}", "--"]
+        if not prefix:
+            return program, args
+        return prefix[0], prefix[1:] + [program] + list(args)
+
+    def apply(self, pid):
+        """Windows: set priority class, I/O priority and affinity of a started process with psutil"""
+        if os.name != "nt" or not pid:
+            return
+        try:
+            import psutil
+        except ImportError:
+            return
+        try:
+            process = psutil.Process(pid)
+            if self.nice:
+                process.nice(psutil.IDLE_PRIORITY_CLASS if self.nice >= 15 else psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            if self.io_class:
+                process.ionice(getattr(psutil, WINDOWS_IO_PRIORITIES[self.io_class]))
+            cpus = parse_cpus(self.cpus)
+            if cpus:
+                process.cpu_affinity(cpus)
+        except (psutil.Error, OSError, ValueError):
+            # The process may already be gone; the job runs either way
+            pass
+
+    def describe(self):
+        parts = []
+        if self.nice:
+            parts.append(f"nice {self.nice}")
+        if self.io_class:
+            parts.append(f"{self.io_class} I/O" + (f" {self.io_level}" if self.io_level is not None else ""))
+        if self.cpus is not None:
+            parts.append(f"CPUs {self.cpus}")
+        if self.memory:
+            parts.append(f"{self.memory / 1073741824:.1f} GiB cap")
+        return f"{self.name} ({', '.join(parts) or 'inherited'})"
+
+
+DEFAULT_LAUNCH_PROFILES = [
+    LaunchProfile("normal"),
+    # Downloads yield the CPU and disk to everything else; merges and
+    # conversions also stay off the first CPU, which the GUI gets to itself
+    LaunchProfile("background", nice=10, io_class="idle", cpus="spare"),
+]
+
+
+def load_launch_profiles(path=LAUNCH_PROFILES_FILE):
+    """name -> LaunchProfile, the built-in ones overridden or extended by the profiles file"""
+    profiles = {profile.name: profile for profile in DEFAULT_LAUNCH_PROFILES}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    profile = LaunchProfile.from_dict(entry)
+                    profiles[profile.name] = profile
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading launch profiles: {e}")
+    return profiles
@@ -0,0 +1,307 @@
+"""Numeric download telemetry.
+
+yt-dlp only reports sizes and speeds as display strings ("12.34MiB",
+"1.20MiB/s"), these helpers turn them back into bytes so the numbers can be
+aggregated and exported. JobMetrics covers one download attempt,
+DownloadMetrics the manager as a whole (rendered in the Prometheus text
+format by control.MetricsServer).
+"""
+import re
+import time
+from collections import deque
+
+SIZE_UNITS = {
+    "B": 1,
+    "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3, "TIB": 1024 ** 4,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+}
+# Column order for CSV exports, matches JobMetrics.to_dict()
+METRIC_FIELDS = [
+    "bytes", "ttfb", "extraction_time", "download_time", "merge_time", "total_time",
+    "avg_throughput", "peak_throughput", "retries",
+]
+SIZE_RE = re.compile(r"~?\s*(\d+(?:\.\d+)?)\s*([KMGT]?i?B)", re.IGNORECASE)
+
+
+def parse_size(text):
+    """'12.34MiB' -> 12939428, '1.2MiB/s' -> 1258291. None if it isn't a size."""
+    if not text:
+        return None
+    m = SIZE_RE.search(text)
+    if not m:
+        return None
+    unit = SIZE_UNITS.get(m.group(2).upper())
+    if unit is None:
+        return None
+    return int(float(m.group(1)) * unit)
+
+
+def format_bytes(value, suffix=""):
+    if value is None:
+        return ""
+    if value < 1024:
+        return f"{int(value)}B{suffix}"
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        value /= 1024
+        if value < 1024 or unit == "TiB":
+            return f"{value:.2f}{unit}{suffix}"
+
+
+class JobMetrics:
+    """Timings and byte counts for one download attempt.
+
+    The runner feeds it from the yt-dlp output; phases are split on the first
+    "Destination:" line (end of extraction), the last 100% line (end of
+    download) and the first merger/postprocessor line.
+    """
+    __slots__ = (
+        "retries", "started", "first_byte", "download_started", "download_finished", "merge_started",
+        "finished", "completed_bytes", "stream_bytes", "current_speed", "peak_speed",
+    )
+
+    def __init__(self, retries=0):
+        self.retries = retries
+        self.started = None
+        self.first_byte = None
+        self.download_started = None
+        self.download_finished = None
+        self.merge_started = None
+        self.finished = None
+        self.completed_bytes = 0
+        self.stream_bytes = 0
+        self.current_speed = 0
+        self.peak_speed = 0
+
+    def mark_started(self):
+        self.started = time.monotonic()
+
+    def on_destination(self):
+        # A new stream (e.g. the audio half of a video+audio selector) begins
+        now = time.monotonic()
+        if self.download_started is None:
+            self.download_started = now
+        self.download_finished = None
+        self.completed_bytes += self.stream_bytes
+        self.stream_bytes = 0
+
+    def on_progress(self, percent, total_bytes, speed):
+        now = time.monotonic()
+        if self.download_started is None:
+            self.download_started = now
+        if self.first_byte is None and percent > 0:
+            self.first_byte = now
+        if total_bytes:
+            self.stream_bytes = int(total_bytes * min(percent, 100) / 100)
+        self.current_speed = speed or 0
+        if speed and speed > self.peak_speed:
+            self.peak_speed = speed
+        if percent >= 100:
+            self.download_finished = now
+            self.current_speed = 0
+
+    def on_postprocess(self):
+        self.current_speed = 0
+        if self.merge_started is None:
+            self.merge_started = time.monotonic()
+            if self.download_finished is None:
+                self.download_finished = self.merge_started
+
+    def mark_finished(self):
+        self.finished = time.monotonic()
+        self.current_speed = 0
+        self.completed_bytes += self.stream_bytes
+        self.stream_bytes = 0
+
+    @property
+    def bytes_transferred(self):
+        return self.completed_bytes + self.stream_bytes
+
+    def _span(self, start, end):
+        if start is None or end is None:
+            return None
+        return round(max(0.0, end - start), 3)
+
+    def to_dict(self):
+        end = self.finished or time.monotonic()
+        download_end = self.download_finished or self.merge_started or end
+        download_time = self._span(self.download_started, download_end)
+        average = None
+        if download_time and self.bytes_transferred:
+            average = int(self.bytes_transferred / download_time)
+        return {
+            "bytes": self.bytes_transferred,
+            "ttfb": self._span(self.started, self.first_byte),
+            "extraction_time": self._span(self.started, self.download_started),
+            "download_time": download_time,
+            "merge_time": self._span(self.merge_started, end if self.merge_started else None),
+            "total_time": self._span(self.started, end),
+            "avg_throughput": average,
+            "peak_throughput": int(self.peak_speed) or None,
+            "retries": self.retries,
+        }
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        if labels:
+            return self.values.get(_label_key(labels), 0)
+        return sum(self.values.values())
+
+    def samples(self):
+        if not self.values:
+            return [(self.name, "", 0)]
+        return [(self.name, _format_labels(key), value) for key, value in self.values.items()]
+
+
+class Gauge:
+    """Read from a callback at scrape time, so it never goes stale"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read=None):
+        self.name = name
+        self.help_text = help_text
+        self.read = read or (lambda: 0)
+
+    def samples(self):
+        return [(self.name, "", self.read())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def mean(self):
+        count = sum(s["count"] for s in self.series.values())
+        return sum(s["sum"] for s in self.series.values()) / count if count else None
+
+    def samples(self):
+        result = []
+        for key, series in self.series.items():
+            for bound, count in zip(self.buckets, series["counts"]):
+                result.append((f"{self.name}_bucket", _format_labels(key, [("le", bound)]), count))
+            result.append((f"{self.name}_bucket", _format_labels(key, [("le", "+Inf")]), series["count"]))
+            result.append((f"{self.name}_sum", _format_labels(key), round(series["sum"], 6)))
+            result.append((f"{self.name}_count", _format_labels(key), series["count"]))
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="vdm_"):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(self.prefix + name, help_text))
+
+    def gauge(self, name, help_text, read=None):
+        return self._register(Gauge(self.prefix + name, help_text, read))
+
+    def histogram(self, name, help_text, buckets):
+        return self._register(Histogram(self.prefix + name, help_text, buckets))
+
+    def render_prometheus(self):
+        """Prometheus text exposition format, version 0.0.4"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+SECONDS_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+SPAWN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+THROUGHPUT_SAMPLES = 120
+
+
+class DownloadMetrics(MetricsRegistry):
+    """The download manager's counters, histograms and throughput history.
+
+    Gauges that depend on manager state are wired up by the manager; the
+    throughput history keeps one aggregate bytes/s sample per second for the
+    Queue tab graph.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.jobs_started = self.counter("jobs_started_total", "Download attempts started, including retries")
+        self.jobs_finished = self.counter("jobs_finished_total", "Downloads that reached a final state, by result")
+        self.failures = self.counter("failures_total", "Failed download attempts, by failure class")
+        self.retries = self.counter("retries_total", "Retries scheduled after a failed attempt")
+        self.bytes_downloaded = self.counter("downloaded_bytes_total", "Bytes transferred by finished attempts")
+        self.verifications = self.counter("verifications_total", "Integrity checks of finished files, by result")
+        self.conversions = self.counter("conversions_total", "Audio conversions of finished downloads, by result")
+        self.queue_wait = self.histogram("queue_wait_seconds", "Time from enqueue to start", SECONDS_BUCKETS)
+        self.job_duration = self.histogram("job_duration_seconds", "Run time of the final attempt, by result",
+                                           SECONDS_BUCKETS)
+        self.verify_duration = self.histogram("verify_seconds", "Time to size-check, hash and probe a file",
+                                              SECONDS_BUCKETS)
+        self.convert_duration = self.histogram("convert_seconds", "Time to convert a downloaded audio file",
+                                               SECONDS_BUCKETS)
+        self.spawn_latency = self.histogram("process_spawn_seconds", "Time from QProcess.start to started",
+                                            SPAWN_BUCKETS)
+        self.throughput = self.gauge("throughput_bytes_per_second", "Aggregate speed of running downloads",
+                                     lambda: self.throughput_history[-1][1] if self.throughput_history else 0)
+        self.throughput_history = deque(maxlen=THROUGHPUT_SAMPLES)
+        self.completion_times = deque()
+
+    def record_throughput(self, bytes_per_second):
+        self.throughput_history.append((time.monotonic(), bytes_per_second))
+
+    def record_completion(self):
+        self.completion_times.append(time.monotonic())
+
+    def jobs_per_hour(self):
+        cutoff = time.monotonic() - 3600
+        while self.completion_times and self.completion_times[0] < cutoff:
+            self.completion_times.popleft()
+        return len(self.completion_times)
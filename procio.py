@@ -0,0 +1,337 @@
+"""Subprocess I/O off the GUI thread.
+
+Every yt-dlp process (downloads, -J fetches, searches) is owned by a single
+worker thread. The worker reads the pipes, decodes, runs the line regexes and
+JSON parsing, and hands the owner compact records, batched per job at most
+every FLUSH_INTERVAL ms:
+
+    ("started", spawn_seconds)
+    ("stdout", text)                  raw output, for logging
+    ("stderr", text)
+    ("progress", percent, size_text, speed_text, size_bytes, speed_bytes_per_s)
+    ("destination", path)             a new output stream begins
+    ("output", path)                  final file of a merge, conversion or earlier run
+    ("postprocess", status_text)      merger/ffmpeg/cleanup phase, status may be ""
+    ("json", obj)                     parsed object ("json" and "jsonlines" jobs)
+    ("json_error", message)
+    ("finished", exit_code, stdout_bytes)
+
+The owner only sees ProcessHandle objects; its callback(handle, records) runs
+on the owner's thread. A launch.LaunchProfile passed to start() sets the
+child's OS priorities, see launch.py.
+"""
+import re
+import json
+import time
+import itertools
+from PyQt6.QtCore import QCoreApplication, QObject, QProcess, QThread, QTimer, Qt, pyqtSignal
+from metrics import parse_size
+
+FLUSH_INTERVAL = 50
+# -J output is only logged as a byte count, stdout/stderr text beyond this is cut
+MAX_LOG_CHUNK = 4000
+
+# "[download]  45.3% of ~  12.34MiB at  1.23MiB/s ETA 00:10 (frag 3/20)"
+# "[download] 100% of   12.34MiB in 00:00:05 at 2.34MiB/s"
+PROGRESS_RE = re.compile(r"\[download\]\s+(\d{1,3}(?:\.\d+)?)%(?:\s+of\s+(~?\s*\S+))?(?:.*?\sat\s+(\S+))?")
+POSTPROCESS_PREFIXES = ("[Merger]", "[ExtractAudio]", "[VideoConvertor]", "[FixupM3u8]", "[Metadata]")
+# '[download] Destination: a.f137.mp4', '[ExtractAudio] Destination: a.mp3'
+DESTINATION_RE = re.compile(r"^\[(\w+)\] Destination: (.+)$")
+# '[Merger] Merging formats into "a.mkv"', '[download] a.mkv has already been downloaded'
+OUTPUT_RE = re.compile(r'Merging formats into "(.+)"$|^\[download\] (.+) has already been downloaded')
+
+
+def parse_download_line(line):
+    """Records for one line of `yt-dlp --newline` output"""
+    records = []
+    m = DESTINATION_RE.match(line)
+    if m:
+        records.append(("destination", m.group(2)) if m.group(1) == "download" else ("output", m.group(2)))
+    m = OUTPUT_RE.search(line)
+    if m:
+        records.append(("output", m.group(1) or m.group(2)))
+
+    m = PROGRESS_RE.search(line)
+    if m:
+        size_text = m.group(2).replace(" ", "") if m.group(2) else ""
+        speed_text = m.group(3) or ""
+        records.append(("progress", float(m.group(1)), size_text, speed_text,
+                        parse_size(size_text), parse_size(speed_text)))
+
+    status = ""
+    if "Merging formats into" in line or "[Merger]" in line:
+        status = "Merging..."
+    elif "Deleting original file" in line:
+        status = "Cleaning up..."
+    elif "[ffmpeg]" in line and ("Converting" in line or "Merging" in line):
+        status = "Processing..."
+    if status or line.startswith(POSTPROCESS_PREFIXES):
+        records.append(("postprocess", status))
+    return records
+
+
+class OutputParser:
+    """Splits a byte stream into complete lines; subclasses turn them into records"""
+
+    def __init__(self):
+        self.pending = b""
+        self.received = 0
+
+    def feed(self, data):
+        self.received += len(data)
+        self.pending += data
+        if b"\n" not in self.pending:
+            return []
+        complete, self.pending = self.pending.rsplit(b"\n", 1)
+        text = complete.decode("utf-8", errors="replace")
+        return self.parse_text(text)
+
+    def finish(self):
+        if not self.pending:
+            return []
+        text, self.pending = self.pending.decode("utf-8", errors="replace"), b""
+        return self.parse_text(text)
+
+    def parse_text(self, text):
+        return [("stdout", text)]
+
+
+class DownloadParser(OutputParser):
+    def parse_text(self, text):
+        records = [("stdout", text)]
+        for line in text.splitlines():
+            records.extend(parse_download_line(line))
+        return records
+
+
+class JsonLinesParser(OutputParser):
+    def parse_text(self, text):
+        records = [("stdout", text[:MAX_LOG_CHUNK])]
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(("json", json.loads(line)))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+
+class JsonParser(OutputParser):
+    """A single JSON document (yt-dlp -J), parsed once the process exits"""
+
+    def feed(self, data):
+        self.received += len(data)
+        self.pending += data
+        return []
+
+    def finish(self):
+        text = self.pending.decode("utf-8", errors="replace").strip()
+        self.pending = b""
+        if not text:
+            return []
+        records = [("stdout", f"received {self.received} bytes")]
+        # Warnings or other lines may precede the document
+        start = text.find("{")
+        try:
+            if start == -1:
+                raise json.JSONDecodeError("no JSON object in output", text, 0)
+            records.append(("json", json.loads(text[start:])))
+        except json.JSONDecodeError as e:
+            records.append(("json_error", f"{e}; output starts with: {text[:500]}"))
+        return records
+
+
+PARSERS = {
+    "download": DownloadParser,
+    "json": JsonParser,
+    "jsonlines": JsonLinesParser,
+    "text": OutputParser,
+}
+
+
+class ProcessWorker(QObject):
+    """Lives in the hub's thread; owns the QProcess objects and the parsers"""
+    records_ready = pyqtSignal(dict)
+
+    def __init__(self):
+        super().__init__()
+        self.processes = {}
+        self.parsers = {}
+        self.spawn_times = {}
+        self.pending = {}
+        self.flush_timer = None
+
+    def _pend(self, job_id, records):
+        if records:
+            self.pending.setdefault(job_id, []).extend(records)
+
+    def start_job(self, job_id, program, args, kind, launch):
+        if self.flush_timer is None:
+            self.flush_timer = QTimer(self)
+            self.flush_timer.timeout.connect(self.flush)
+            self.flush_timer.start(FLUSH_INTERVAL)
+
+        process = QProcess(self)
+        self.processes[job_id] = process
+        self.parsers[job_id] = PARSERS[kind]()
+        process.readyReadStandardOutput.connect(lambda: self.on_stdout(job_id))
+        process.readyReadStandardError.connect(lambda: self.on_stderr(job_id))
+        process.started.connect(lambda: self.on_started(job_id, process, launch))
+        process.finished.connect(lambda exit_code, status: self.on_finished(job_id, exit_code))
+        process.errorOccurred.connect(lambda error: self.on_error(job_id, error))
+        self.spawn_times[job_id] = time.monotonic()
+        process.start(program, args)
+
+    def on_started(self, job_id, process, launch):
+        self._pend(job_id, [("started", time.monotonic() - self.spawn_times.pop(job_id, time.monotonic()))])
+        if launch is not None:
+            # Only does something on Windows, elsewhere the command was wrapped
+            launch.apply(process.processId())
+
+    def on_stdout(self, job_id):
+        process = self.processes.get(job_id)
+        if process is not None:
+            self._pend(job_id, self.parsers[job_id].feed(bytes(process.readAllStandardOutput())))
+
+    def on_stderr(self, job_id):
+        process = self.processes.get(job_id)
+        if process is not None:
+            text = bytes(process.readAllStandardError()).decode("utf-8", errors="replace")
+            if text.strip():
+                self._pend(job_id, [("stderr", text[-MAX_LOG_CHUNK:])])
+
+    def on_error(self, job_id, error):
+        # A process that never started emits no finished signal
+        if error == QProcess.ProcessError.FailedToStart and job_id in self.processes:
+            message = self.processes[job_id].errorString()
+            self._pend(job_id, [("stderr", f"ERROR: failed to start: {message}\n")])
+            self.on_finished(job_id, -1)
+
+    def on_finished(self, job_id, exit_code):
+        process = self.processes.pop(job_id, None)
+        if process is None:
+            return
+        self._drain(job_id, process)
+        parser = self.parsers.pop(job_id)
+        self._pend(job_id, parser.finish() + [("finished", exit_code, parser.received)])
+        self.spawn_times.pop(job_id, None)
+        process.deleteLater()
+        self.flush()
+
+    def _drain(self, job_id, process):
+        data = bytes(process.readAllStandardOutput())
+        if data:
+            self._pend(job_id, self.parsers[job_id].feed(data))
+        error = bytes(process.readAllStandardError()).decode("utf-8", errors="replace")
+        if error.strip():
+            self._pend(job_id, [("stderr", error[-MAX_LOG_CHUNK:])])
+
+    def flush(self):
+        if self.pending:
+            batch, self.pending = self.pending, {}
+            self.records_ready.emit(batch)
+
+    def kill_job(self, job_id):
+        process = self.processes.get(job_id)
+        if process is not None:
+            process.kill()
+
+    def kill_all(self):
+        for job_id, process in list(self.processes.items()):
+            process.blockSignals(True)
+            process.kill()
+            process.waitForFinished(3000)
+            self.processes.pop(job_id, None)
+            self.parsers.pop(job_id, None)
+        if self.flush_timer is not None:
+            self.flush_timer.stop()
+
+
+class ProcessHandle:
+    """Owner-side view of a job running in the hub"""
+
+    def __init__(self, hub, job_id):
+        self.hub = hub
+        self.job_id = job_id
+        self.running = True
+        self.exit_code = None
+
+    def is_running(self):
+        return self.running
+
+    def kill(self):
+        if self.running:
+            self.hub.request_kill.emit(self.job_id)
+
+
+class ProcessHub(QObject):
+    request_start = pyqtSignal(int, str, list, str, object)
+    request_kill = pyqtSignal(int)
+    request_kill_all = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.job_ids = itertools.count(1)
+        self.jobs = {}
+        self.thread = QThread()
+        self.thread.setObjectName("vdm-process-io")
+        self.worker = ProcessWorker()
+        self.worker.moveToThread(self.thread)
+        self.request_start.connect(self.worker.start_job)
+        self.request_kill.connect(self.worker.kill_job)
+        self.request_kill_all.connect(self.worker.kill_all, Qt.ConnectionType.BlockingQueuedConnection)
+        self.worker.records_ready.connect(self.dispatch)
+        self.thread.start()
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def start(self, program, args, kind, callback, launch=None):
+        """Start a process in the worker thread; callback(handle, records) runs on this thread"""
+        job_id = next(self.job_ids)
+        handle = ProcessHandle(self, job_id)
+        self.jobs[job_id] = (handle, callback)
+        if launch is not None:
+            program, args = launch.wrap(program, args)
+        self.request_start.emit(job_id, program, list(args), kind, launch)
+        return handle
+
+    def dispatch(self, batch):
+        for job_id, records in batch.items():
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            handle, callback = job
+            if records[-1][0] == "finished":
+                handle.running = False
+                handle.exit_code = records[-1][1]
+                del self.jobs[job_id]
+            callback(handle, records)
+
+    def running_count(self):
+        return sum(1 for handle, _ in self.jobs.values() if handle.running)
+
+    def shutdown(self):
+        """Kill everything still running and stop the worker thread (blocking)"""
+        if not self.thread.isRunning():
+            return
+        self.request_kill_all.emit()
+        for handle, _ in self.jobs.values():
+            handle.running = False
+        self.jobs.clear()
+        self.thread.quit()
+        self.thread.wait(5000)
+
+
+_hub = None
+
+
+def process_hub():
+    """The process hub shared by everything in this process, created on first use"""
+    global _hub
+    if _hub is None:
+        _hub = ProcessHub()
+    return _hub
@@ -0,0 +1,181 @@
+"""Opt-in profiling for the event loop.
+
+Three independent pieces, all off by default (VDM_PROFILE=1 or the Settings
+tab turns the first two on):
+
+- a watchdog timer that measures how late it fires; lateness beyond
+  STALL_THRESHOLD ms is a stall and is blamed on the slowest profiled slot
+  that ran since the previous tick
+- per-slot wall time for handlers decorated with @profiled
+- a cProfile capture that can be toggled at runtime
+
+write_summary() puts the top offenders in a text file, the GUI calls it on exit.
+"""
+import io
+import os
+import inspect
+import time
+import pstats
+import cProfile
+import functools
+from collections import deque
+from datetime import datetime
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+PROFILE_ENABLED = os.environ.get("VDM_PROFILE", "") not in ("", "0")
+SUMMARY_FILE = "Saves/profile_summary.txt"
+CPROFILE_FILE = "Saves/profile.prof"
+WATCHDOG_INTERVAL = 20
+STALL_THRESHOLD = 50
+MAX_DRIFT_SAMPLES = 100000
+TOP_OFFENDERS = 15
+
+# The Profiler currently collecting slot timings, None when profiling is off
+_active = None
+
+
+def profiled(name=None):
+    """Record the wall time of every call while profiling is enabled"""
+    def decorator(func):
+        label = name or func.__qualname__
+        # PyQt drops surplus signal arguments by looking at the slot's code
+        # object, which it can't do through the wrapper, so trim them here
+        max_args = None if func.__code__.co_flags & inspect.CO_VARARGS else func.__code__.co_argcount
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class SlotStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Profiler(QObject):
+    stall_detected = pyqtSignal(float, str)
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+        self.started_at = None
+        self.slots = {}
+        self.drifts = deque(maxlen=MAX_DRIFT_SAMPLES)
+        self.stalls = []
+        self.slowest_since_tick = (0.0, "")
+        self.last_tick = None
+        self.cprofile = None
+        self.cprofile_stats = None
+
+        self.watchdog = QTimer(self)
+        self.watchdog.setTimerType(Qt.TimerType.PreciseTimer)
+        self.watchdog.timeout.connect(self.on_tick)
+
+    def set_enabled(self, enabled):
+        global _active
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        if enabled:
+            self.started_at = self.started_at or datetime.now()
+            _active = self
+            self.last_tick = time.perf_counter()
+            self.watchdog.start(WATCHDOG_INTERVAL)
+        else:
+            _active = None
+            self.watchdog.stop()
+
+    def record(self, label, elapsed):
+        stats = self.slots.get(label)
+        if stats is None:
+            stats = self.slots[label] = SlotStats()
+        stats.count += 1
+        stats.total += elapsed
+        if elapsed > stats.max:
+            stats.max = elapsed
+        if elapsed > self.slowest_since_tick[0]:
+            self.slowest_since_tick = (elapsed, label)
+
+    def on_tick(self):
+        now = time.perf_counter()
+        drift = max(0.0, (now - self.last_tick) * 1000 - WATCHDOG_INTERVAL)
+        self.last_tick = now
+        self.drifts.append(drift)
+        if drift >= STALL_THRESHOLD:
+            elapsed, label = self.slowest_since_tick
+            culprit = f"{label} ({elapsed * 1000:.0f} ms)" if label else "unprofiled code"
+            self.stalls.append((drift, culprit, datetime.now()))
+            self.stall_detected.emit(drift, culprit)
+        self.slowest_since_tick = (0.0, "")
+
+    def set_cprofile(self, enabled):
+        if enabled and self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        elif not enabled and self.cprofile is not None:
+            self.cprofile.disable()
+            if self.cprofile_stats is None:
+                self.cprofile_stats = pstats.Stats(self.cprofile)
+            else:
+                self.cprofile_stats.add(self.cprofile)
+            self.cprofile = None
+
+    def summary(self):
+        lines = [f"VDM profile summary, {self.started_at or datetime.now():%Y-%m-%d %H:%M:%S} "
+                 f"to {datetime.now():%Y-%m-%d %H:%M:%S}", ""]
+
+        drifts = list(self.drifts)
+        lines.append(f"Event loop: {len(drifts)} watchdog ticks ({WATCHDOG_INTERVAL} ms), "
+                     f"drift p50 {percentile(drifts, 0.5):.1f} ms, p95 {percentile(drifts, 0.95):.1f} ms, "
+                     f"p99 {percentile(drifts, 0.99):.1f} ms, max {max(drifts, default=0):.1f} ms")
+        lines.append(f"Stalls over {STALL_THRESHOLD} ms: {len(self.stalls)}")
+        for drift, culprit, when in sorted(self.stalls, key=lambda s: s[0], reverse=True)[:TOP_OFFENDERS]:
+            lines.append(f"  {drift:8.0f} ms  {when:%H:%M:%S}  {culprit}")
+
+        lines += ["", f"{'Slot':<48} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        ranked = sorted(self.slots.items(), key=lambda kv: kv[1].total, reverse=True)
+        for label, stats in ranked[:TOP_OFFENDERS]:
+            lines.append(f"{label:<48} {stats.count:>8} {stats.total * 1000:>10.1f} "
+                         f"{stats.total / stats.count * 1000:>9.2f} {stats.max * 1000:>9.1f}")
+
+        if self.cprofile_stats is not None:
+            buffer = io.StringIO()
+            self.cprofile_stats.stream = buffer
+            self.cprofile_stats.sort_stats("cumulative").print_stats(TOP_OFFENDERS * 2)
+            lines += ["", f"cProfile (full stats in {CPROFILE_FILE}):", buffer.getvalue().rstrip()]
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path=SUMMARY_FILE):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # A capture still running at exit is stopped so it makes the summary
+        self.set_cprofile(False)
+        text = self.summary()
+        if self.cprofile_stats is not None:
+            self.cprofile_stats.dump_stats(CPROFILE_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
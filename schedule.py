@@ -0,0 +1,238 @@
+"""Download windows and completion projection.
+
+A Schedule is a list of daily windows, loaded from SCHEDULE_FILE (or
+`run --schedule FILE`), each with its own concurrency and bandwidth limit:
+
+    [{"name": "night", "start": "01:00", "end": "07:00", "max_concurrent": 6},
+     {"name": "day", "start": "07:00", "end": "01:00", "max_concurrent": 1, "rate_limit": "2MiB"}]
+
+Windows may wrap around midnight and the first one containing the current
+time applies; max_concurrent defaults to the manager's own limit. With
+windows defined, nothing runs outside of them. An empty schedule (no file)
+means the queue runs all the time without a bandwidth limit.
+
+Items can also carry their own start_after/finish_before times of day
+(queue-file and control API keys of the same names). Such an item only runs
+between the two, every day; a missing one stands for midnight.
+
+DownloadManager.apply_schedule enforces all of this at every window edge.
+It pauses downloads that have to stop, keeping their partial data, and they
+resume at the front of the queue when their window opens again. project()
+estimates when every item will start and finish from its known size.
+"""
+import json
+import os
+from datetime import timedelta
+from metrics import parse_size
+
+SCHEDULE_FILE = "Saves/schedule.json"
+# How far ahead, and in how many steps at most, project() looks
+PROJECTION_HORIZON = timedelta(days=14)
+PROJECTION_MAX_STEPS = 20000
+# Per-download speed assumed by projections until a download has finished
+DEFAULT_JOB_SPEED = 2 * 1048576
+# apply_schedule also runs this often between edges, and picks up edits to the file
+SCHEDULE_CHECK_INTERVAL = 30
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_time(text):
+    """'01:30' -> minutes after midnight"""
+    hours, _, minutes = str(text).strip().partition(":")
+    value = int(hours) * 60 + int(minutes or 0)
+    # "24:00" is allowed as the end of the day
+    if not 0 <= value <= MINUTES_PER_DAY:
+        raise ValueError(f"not a time of day: {text!r}")
+    return value
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def minute_of_day(moment):
+    return moment.hour * 60 + moment.minute
+
+
+def in_window(start, end, minute):
+    """Whether minute lies in [start, end), which may wrap midnight; start == end is the whole day"""
+    if start == end:
+        return True
+    if start < end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def next_edge(minutes, moment):
+    """The first datetime after moment that falls on one of the given minutes of the day"""
+    if not minutes:
+        return None
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = [midnight + timedelta(days=day, minutes=minute) for day in (0, 1) for minute in minutes]
+    return min(candidate for candidate in candidates if candidate > moment)
+
+
+def item_bounds(item):
+    """(start, end) minutes of an item's own daily window, or None"""
+    if not item.start_after and not item.finish_before:
+        return None
+    start = parse_time(item.start_after) if item.start_after else 0
+    end = parse_time(item.finish_before) if item.finish_before else MINUTES_PER_DAY
+    return start, end
+
+
+def validate_item_times(item):
+    """Raises ValueError if the item's start_after/finish_before aren't times of day"""
+    item_bounds(item)
+
+
+def item_edges(items):
+    """Minutes of the day at which any of the items' own windows open or close"""
+    return {minute % MINUTES_PER_DAY for bounds in {item_bounds(item) for item in items} if bounds
+            for minute in bounds}
+
+
+def item_window_open(item, moment):
+    bounds = item_bounds(item)
+    return bounds is None or in_window(bounds[0], bounds[1], minute_of_day(moment))
+
+
+class ScheduleWindow:
+    def __init__(self, name, start, end, max_concurrent=None, rate_limit=None):
+        self.name = name
+        self.start = parse_time(start)
+        self.end = parse_time(end)
+        self.max_concurrent = max_concurrent
+        self.rate_limit = rate_limit     # bytes/s for all downloads together, None = unlimited
+
+    @classmethod
+    def from_dict(cls, entry):
+        rate_limit = entry.get("rate_limit")
+        if isinstance(rate_limit, str):
+            rate_limit = parse_size(rate_limit)
+            if rate_limit is None:
+                raise ValueError(f"not a rate: {entry.get('rate_limit')!r}")
+        max_concurrent = entry.get("max_concurrent")
+        return cls(entry.get("name") or f"{entry['start']}-{entry['end']}", entry["start"], entry["end"],
+                   int(max_concurrent) if max_concurrent is not None else None,
+                   int(rate_limit) if rate_limit else None)
+
+    def contains(self, moment):
+        return in_window(self.start, self.end, minute_of_day(moment))
+
+    def describe(self):
+        text = f"{self.name} ({format_time(self.start)}-{format_time(self.end)}"
+        if self.max_concurrent is not None:
+            text += f", {self.max_concurrent} at once"
+        if self.rate_limit:
+            text += f", {self.rate_limit / 1048576:.1f} MiB/s"
+        return text + ")"
+
+
+class Schedule:
+    def __init__(self, windows=None):
+        self.windows = list(windows or [])
+
+    @classmethod
+    def load(cls, path=SCHEDULE_FILE):
+        """The schedule in path; an empty one if the file doesn't exist. Raises ValueError if it's invalid."""
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return cls([ScheduleWindow.from_dict(entry) for entry in entries])
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: {e}") from e
+
+    def window_at(self, moment):
+        return next((window for window in self.windows if window.contains(moment)), None)
+
+    def limits(self, moment, default_concurrent):
+        """(slots, rate_limit, window) in effect at moment; window is None when no schedule is set"""
+        if not self.windows:
+            return default_concurrent, None, None
+        window = self.window_at(moment)
+        if window is None:
+            return 0, None, None
+        slots = window.max_concurrent if window.max_concurrent is not None else default_concurrent
+        return slots, window.rate_limit, window
+
+    def next_change(self, moment):
+        return next_edge({minute for window in self.windows for minute in (window.start, window.end)}, moment)
+
+
+def project(running, queued, schedule, now, default_concurrent, job_speed):
+    """Projected (start, finish) datetimes per item id.
+
+    running and queued are DownloadItems in the order they would run; sizes
+    come from item.file_size, items without one are assumed to be as large
+    as the average known item. Every download is assumed to go at job_speed
+    bytes/s, or its share of the window's rate limit if that's lower. Times
+    are None where the item can't be projected (no size known at all, or
+    beyond PROJECTION_HORIZON).
+    """
+    sizes = [item.file_size for item in running + queued if item.file_size]
+    average = sum(sizes) / len(sizes) if sizes else None
+
+    def remaining_bytes(item):
+        size = item.file_size or average
+        if size is None:
+            return None
+        return size * (1 - min(item.progress, 100) / 100)
+
+    result = {item.id: [item.start_time or now, None] for item in running}
+    result.update({item.id: [None, None] for item in queued})
+    remaining = {item.id: remaining_bytes(item) for item in running + queued}
+    active = list(running)
+    pending = list(queued)
+    edges = item_edges(active + pending)
+    horizon = now + PROJECTION_HORIZON
+    moment = now
+
+    for _ in range(PROJECTION_MAX_STEPS):
+        if not (active or pending) or moment >= horizon:
+            break
+        slots, rate_limit, _ = schedule.limits(moment, default_concurrent)
+        # Pauses at this edge go back to the front, like DownloadManager.pause_download
+        stopped = [item for item in active if not item_window_open(item, moment)]
+        stopped += [item for item in active if item not in stopped][max(slots, 0):]
+        for item in reversed(stopped):
+            active.remove(item)
+            pending.insert(0, item)
+        index = 0
+        while len(active) < slots and index < len(pending):
+            item = pending[index]
+            if edges and not item_window_open(item, moment):
+                index += 1
+                continue
+            pending.pop(index)
+            active.append(item)
+            if result[item.id][0] is None:
+                result[item.id][0] = moment
+
+        speed = job_speed
+        if rate_limit and active:
+            speed = min(speed, rate_limit / max(slots, 1))
+        events = [moment + timedelta(seconds=remaining[item.id] / speed) for item in active
+                  if remaining[item.id] is not None and speed > 0]
+        for edge in (schedule.next_change(moment), next_edge(edges, moment)):
+            if edge is not None:
+                events.append(edge)
+        if any(remaining[item.id] is None for item in active):
+            # Unknown size and nothing to compare with: count it done without a time
+            events.append(moment)
+        if not events:
+            break
+        following = max(min(events), moment)
+        elapsed = (following - moment).total_seconds()
+        for item in list(active):
+            if remaining[item.id] is None:
+                active.remove(item)
+                continue
+            remaining[item.id] -= speed * elapsed
+            if remaining[item.id] <= 1:
+                active.remove(item)
+                result[item.id][1] = following
+        moment = following
+    return {item_id: tuple(times) for item_id, times in result.items()}
@@ -0,0 +1,250 @@
+"""Name search across several yt-dlp search backends at once.
+
+A SearchSession starts one `yt-dlp --flat-playlist --dump-json <prefix>N:query`
+job per backend through the process hub. Each backend gets its own timeout,
+and a slow or failing backend never holds up the others. Results are
+de-duplicated across backends and emitted one by one as their JSON lines
+arrive, so the table fills while the searches are still running.
+
+A MetadataPrefetcher fetches the lean format metadata of the top results in
+the background, a few at a time and at a lower CPU priority, so picking one
+of them shows its formats without another yt-dlp round trip.
+
+SearchCache keeps recent result lists keyed by (mode, query, limit), so a
+repeated search renders at once; entries past their freshness window are
+shown and then revalidated by a background search.
+"""
+import time
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from procio import process_hub
+from launch import LaunchProfile
+from formats import info_fetch_args, lean_info
+
+# name -> (yt-dlp search prefix, label for the Source column)
+SEARCH_BACKENDS = {
+    "youtube": ("ytsearch", "YouTube"),
+    "soundcloud": ("scsearch", "SoundCloud"),
+    "bilibili": ("bilisearch", "Bilibili"),
+    "niconico": ("nicosearch", "Niconico"),
+}
+SEARCH_MODES = {
+    "Search YouTube": ["youtube"],
+    "Search All Sites": list(SEARCH_BACKENDS),
+}
+BACKEND_TIMEOUT = 20
+PREFETCH_TOP_K = 5
+PREFETCH_WORKERS = 2
+PREFETCH_CACHE_SIZE = 50
+PREFETCH_NICE = 10
+PREFETCH_LAUNCH = LaunchProfile("prefetch", nice=PREFETCH_NICE)
+SEARCH_CACHE_TTL = 600
+SEARCH_CACHE_FRESH = 60
+SEARCH_CACHE_SIZE = 50
+
+
+def search_args(backend, query, limit):
+    prefix = SEARCH_BACKENDS[backend][0]
+    return ["--flat-playlist", "--dump-json", "--no-warnings", f"{prefix}{limit}:{query}"]
+
+
+def result_url(result):
+    return result.get("webpage_url") or result.get("url")
+
+
+def result_key(result):
+    """Identity of a result across backends: extractor + id, else the URL"""
+    if result.get("id"):
+        return ((result.get("ie_key") or result.get("extractor_key") or "").lower(), str(result["id"]))
+    return ("url", result_url(result) or "")
+
+
+def search_cache_key(mode, query, limit):
+    return (mode, " ".join(query.split()).lower(), limit)
+
+
+def result_signature(result):
+    """What a row shows; two results with the same signature render the same"""
+    return (result_key(result), result.get("title"), result.get("uploader"), result.get("channel"),
+            result.get("duration"), result.get("view_count"), result.get("_backend"))
+
+
+class SearchCache:
+    """LRU of result lists; entries expire after ttl seconds and should be
+    revalidated once older than fresh seconds"""
+
+    def __init__(self, ttl=SEARCH_CACHE_TTL, fresh=SEARCH_CACHE_FRESH, max_entries=SEARCH_CACHE_SIZE):
+        self.ttl = ttl
+        self.fresh = fresh
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """(results, needs_revalidation), or None on a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored, results = entry
+        age = time.monotonic() - stored
+        if age > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return list(results), age > self.fresh
+
+    def put(self, key, results):
+        self.entries[key] = (time.monotonic(), list(results))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class SearchSession(QObject):
+    """One search, fanned out to several backends"""
+    result_added = pyqtSignal(dict)
+    backend_finished = pyqtSignal(str, int, str)    # backend, results, error ("" on success)
+    finished = pyqtSignal()
+
+    def __init__(self, yt_dlp_path, parent=None):
+        super().__init__(parent)
+        self.yt_dlp_path = yt_dlp_path
+        self.handles = {}
+        self.timers = {}
+        self.counts = {}
+        self.errors = {}
+        self.seen = set()
+        self.results = []
+        self.started = None
+        self.timeout = BACKEND_TIMEOUT
+        self.first_result_ms = None
+
+    def start(self, query, backends, limit, timeout=BACKEND_TIMEOUT):
+        self.started = time.perf_counter()
+        self.timeout = timeout
+        for backend in backends:
+            self.counts[backend] = 0
+            self.errors[backend] = ""
+            self.handles[backend] = process_hub().start(
+                self.yt_dlp_path, search_args(backend, query, limit), "jsonlines",
+                lambda handle, records, name=backend: self.on_records(name, handle, records))
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda name=backend: self.on_timeout(name))
+            timer.start(int(timeout * 1000))
+            self.timers[backend] = timer
+
+    def is_running(self):
+        return bool(self.handles)
+
+    def cancel(self):
+        for backend in list(self.handles):
+            self.handles.pop(backend).kill()
+            self.timers.pop(backend).stop()
+
+    def on_timeout(self, backend):
+        handle = self.handles.get(backend)
+        if handle is not None:
+            # Results that arrived before the timeout are kept
+            self.errors[backend] = f"timed out after {self.timeout:g}s"
+            handle.kill()
+
+    def on_records(self, backend, handle, records):
+        if self.handles.get(backend) is not handle:
+            return
+        for record in records:
+            kind = record[0]
+            if kind == "json":
+                self.add_result(backend, record[1])
+            elif kind == "stderr":
+                lines = [line.strip() for line in record[1].splitlines() if "ERROR:" in line]
+                if lines and not self.errors[backend]:
+                    self.errors[backend] = lines[0]
+            elif kind == "finished":
+                self.timers.pop(backend).stop()
+                del self.handles[backend]
+                error = self.errors[backend]
+                if not error and record[1] != 0 and not self.counts[backend]:
+                    error = f"exit code {record[1]}"
+                self.backend_finished.emit(backend, self.counts[backend], error)
+                if not self.handles:
+                    self.finished.emit()
+
+    def add_result(self, backend, result):
+        if not isinstance(result, dict) or result.get("_type") == "playlist":
+            return
+        key = result_key(result)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        result["_backend"] = backend
+        self.counts[backend] += 1
+        self.results.append(result)
+        if self.first_result_ms is None:
+            self.first_result_ms = (time.perf_counter() - self.started) * 1000
+        self.result_added.emit(result)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000 if self.started else 0
+
+
+class MetadataPrefetcher(QObject):
+    """Bounded background pool of lean format fetches, keyed by URL"""
+    prefetched = pyqtSignal(str, bool)     # url, success
+
+    def __init__(self, yt_dlp_path, max_workers=PREFETCH_WORKERS, cache_size=PREFETCH_CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.yt_dlp_path = yt_dlp_path
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.pending = []
+        self.running = {}
+        self.objects = {}
+        self.cache = OrderedDict()
+
+    def enqueue(self, url):
+        if not url or url in self.cache or url in self.running or url in self.pending:
+            return
+        self.pending.append(url)
+        self._fill()
+
+    def get(self, url):
+        info = self.cache.get(url)
+        if info is not None:
+            self.cache.move_to_end(url)
+        return info
+
+    def is_pending(self, url):
+        return url in self.running or url in self.pending
+
+    def cancel(self):
+        """Drop everything queued or running; finished results stay cached"""
+        self.pending.clear()
+        for url, handle in list(self.running.items()):
+            handle.kill()
+        self.running.clear()
+        self.objects.clear()
+
+    def _fill(self):
+        while self.pending and len(self.running) < self.max_workers:
+            url = self.pending.pop(0)
+            self.objects[url] = []
+            # Background fetches shouldn't compete with the one the user is waiting for
+            self.running[url] = process_hub().start(
+                self.yt_dlp_path, info_fetch_args(url, lean=True), "jsonlines",
+                lambda handle, records, u=url: self.on_records(u, handle, records), PREFETCH_LAUNCH)
+
+    def on_records(self, url, handle, records):
+        if self.running.get(url) is not handle:
+            return
+        for record in records:
+            if record[0] == "json":
+                self.objects[url].append(record[1])
+            elif record[0] == "finished":
+                del self.running[url]
+                info = lean_info(self.objects.pop(url)) if record[1] == 0 else None
+                if info is not None and info.get("formats"):
+                    self.cache[url] = info
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+                self.prefetched.emit(url, url in self.cache)
+                self._fill()
@@ -0,0 +1,497 @@
+"""Segmented HTTP downloads for formats that are a single direct URL.
+
+yt-dlp fetches a progressive http(s) format over one connection, which on a
+fast link caps a single file well below line rate. When segmented downloads
+are on, the runner first asks yt-dlp to resolve the format (resolve_args)
+and, if it turns out to be one plain http(s) URL, fetches it here instead:
+
+- the file is split into byte ranges fetched in parallel, each over a
+  keep-alive connection from a per-host pool shared by all downloads
+- the .part file is preallocated and each segment writes what it reads at
+  its own offset (os.pwrite) straight from one reusable buffer
+- segment positions are saved next to the .part file, so an interrupted
+  download resumes every segment where it stopped
+- the connection count adapts: starting at INITIAL_SEGMENTS, the largest
+  remaining range is split for another connection as long as that keeps
+  raising the total throughput, up to MAX_SEGMENTS; a segment that finishes
+  early takes over half of the largest remaining one
+- with a rate limit (the schedule window's share for this download), the
+  connections together stay under it by sleeping whenever they're ahead
+
+start_segmented() returns a handle with the ProcessHandle interface and
+reports procio-style records, so the runner treats it like a yt-dlp process.
+Formats needing a merge, HLS/DASH and servers without range support fall
+back to (or stay on) a single connection.
+"""
+import os
+import ssl
+import json
+import time
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlsplit
+from PyQt6.QtCore import QObject, QTimer
+from metrics import format_bytes
+from procio import FLUSH_INTERVAL
+from audio import download_output
+
+INITIAL_SEGMENTS = 4
+MAX_SEGMENTS = 16
+MIN_SEGMENT_SIZE = 2 * 1024 * 1024
+BUFFER_SIZE = 256 * 1024
+ADAPT_INTERVAL = 1.0
+# Another connection has to raise the total throughput by this much to be kept growing
+ADAPT_GAIN = 0.1
+STATE_INTERVAL = 2.0
+MAX_IDLE_PER_HOST = 16
+CONNECT_TIMEOUT = 20
+DIRECT_PROTOCOLS = ("http", "https")
+DIRECT_FIELDS = ["url", "protocol", "http_headers", "filesize", "filesize_approx", "ext", "filename"]
+
+
+def resolve_args(item):
+    """yt-dlp arguments that print the selected format's URL and the final file name as one JSON line"""
+    return ["-f", item.format_selector, "-o", download_output(item), "--no-warnings", "--no-playlist",
+            "-O", "%(.{" + ",".join(DIRECT_FIELDS) + "})j", item.url]
+
+
+def direct_target(info):
+    """(url, filename, headers, size) when info describes one plain http(s) file, else None"""
+    if not isinstance(info, dict) or info.get("protocol") not in DIRECT_PROTOCOLS:
+        return None
+    if not info.get("url") or not info.get("filename"):
+        return None
+    return info["url"], info["filename"], info.get("http_headers") or {}, info.get("filesize")
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port), shared across downloads"""
+
+    def __init__(self, max_idle=MAX_IDLE_PER_HOST):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+
+    def get(self, key):
+        with self.lock:
+            connections = self.idle.get(key)
+            if connections:
+                return connections.pop()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=CONNECT_TIMEOUT, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+
+    def put(self, key, connection):
+        with self.lock:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) < self.max_idle:
+                connections.append(connection)
+                return
+        connection.close()
+
+
+_pool = None
+# path -> the SegmentedDownload writing it, see SegmentedDownload.run
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def connection_pool():
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool()
+    return _pool
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Segment:
+    __slots__ = ("pos", "end", "done")
+
+    def __init__(self, pos, end):
+        self.pos = pos
+        self.end = end
+        self.done = False
+
+
+def write_at(fd, data, offset):
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data, offset = data[written:], offset + written
+    else:
+        # Every segment has its own descriptor, so seek + write is safe
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+class SegmentedDownload:
+    """One file fetched over several ranged connections; run() blocks, call it on a thread"""
+
+    def __init__(self, url, path, headers=None, size=None, resume=False, pool=None, rate_limit=None):
+        self.url = url
+        self.path = path
+        self.part_path = path + ".part"
+        self.state_path = path + ".part.segments"
+        self.headers = dict(headers or {})
+        self.expected_size = size
+        self.resume = resume
+        self.rate_limit = rate_limit    # bytes/s over all connections, None = unlimited
+        self.pool = pool or connection_pool()
+        parts = urlsplit(url)
+        self.key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        self.request_path = parts.path + ("?" + parts.query if parts.query else "")
+
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.segments = []
+        self.threads = []
+        self.total = None
+        self.validator = ""
+        self.ranged = True
+        self.received = 0           # bytes read over the network in this run
+        self.resumed_bytes = 0
+        self.target = INITIAL_SEGMENTS
+        self.error = ""
+        self.finished = False
+        self.stopped = threading.Event()
+        self.messages = deque()
+        self.throttle_start = time.monotonic()
+
+    # -- state shared with the owner thread --------------------------------
+
+    def downloaded(self):
+        with self.lock:
+            return self.resumed_bytes + self.received
+
+    def active_connections(self):
+        with self.lock:
+            return sum(1 for segment in self.segments if not segment.done)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def log(self, text):
+        self.messages.append(text)
+
+    # -- download thread ---------------------------------------------------
+
+    def run(self):
+        # A cancelled download of the same file may still be flushing its
+        # segments and state; a retry or resume starts once it has stopped
+        with _writers_lock:
+            previous = _writers.get(self.path)
+            _writers[self.path] = self
+        if previous is not None:
+            previous.stopped.wait()
+        try:
+            self._run()
+        except DownloadError as e:
+            self.error = f"ERROR: {e}"
+        except (OSError, http.client.HTTPException) as e:
+            self.error = f"ERROR: {type(e).__name__}: {e}"
+        if self.error:
+            self.cancelled.set()
+            self._join()
+        if self.segments and self.ranged and (self.error or self.cancelled.is_set()) and not self.finished:
+            self.save_state()
+        with _writers_lock:
+            if _writers.get(self.path) is self:
+                del _writers[self.path]
+        self.stopped.set()
+        self.finished = True
+
+    def _run(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        saved = self.load_state() if self.resume else None
+        start = saved["segments"][0][0] if saved else 0
+
+        connection, response = self._open(start, None)
+        if response.status == 200:
+            # No range support: one stream from the start, nothing to resume
+            self.ranged = False
+            saved = None
+            length = response.getheader("Content-Length")
+            self.total = int(length) if length and length.isdigit() else None
+        else:
+            self.total = self._content_total(response)
+            self.validator = response.getheader("ETag") or response.getheader("Last-Modified") or ""
+            if saved and (saved["total"] != self.total or saved["validator"] != self.validator):
+                self.log("[segmented] Remote file changed, starting over")
+                connection.close()
+                saved = None
+                connection, response = self._open(0, None)
+                self.total = self._content_total(response)
+
+        if saved:
+            self.segments = [Segment(pos, end) for pos, end in saved["segments"]]
+            self.resumed_bytes = saved["done"]
+            self.log(f"[segmented] Resuming {len(self.segments)} segments, "
+                     f"{format_bytes(self.resumed_bytes)} already on disk")
+        else:
+            self.segments = [Segment(0, self.total if self.total is not None else float("inf"))]
+            self._preallocate()
+
+        self._start_segment(self.segments[0], connection, response)
+        if self.ranged:
+            for segment in self.segments[1:]:
+                self._start_segment(segment)
+            while self.active_connections() < self.target and self._split():
+                pass
+        self._supervise()
+        self._join()
+        if self.error:
+            return
+        if self.cancelled.is_set():
+            return
+        os.replace(self.part_path, self.path)
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def _open(self, start, end):
+        """A connection and its response for bytes start..end-1 (end None: to the end of the file)"""
+        headers = dict(self.headers)
+        headers["Range"] = f"bytes={start}-" + ("" if end is None else str(end - 1))
+        connection = self.pool.get(self.key)
+        try:
+            connection.request("GET", self.request_path, headers=headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            # An idle pooled connection may have been closed by the server; one fresh retry
+            connection.close()
+            connection = self.pool.get(self.key)
+            connection.request("GET", self.request_path, headers=headers)
+            response = connection.getresponse()
+        if response.status not in (200, 206):
+            status, reason = response.status, response.reason
+            connection.close()
+            raise DownloadError(f"HTTP Error {status}: {reason}")
+        return connection, response
+
+    def _content_total(self, response):
+        content_range = response.getheader("Content-Range") or ""
+        total = content_range.rpartition("/")[2]
+        if not total.isdigit():
+            raise DownloadError(f"unusable Content-Range: {content_range!r}")
+        return int(total)
+
+    def _preallocate(self):
+        fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            if self.total:
+                if hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(fd, 0, self.total)
+                    except OSError:
+                        os.ftruncate(fd, self.total)
+                else:
+                    os.ftruncate(fd, self.total)
+        finally:
+            os.close(fd)
+
+    def _start_segment(self, segment, connection=None, response=None):
+        thread = threading.Thread(target=self._fetch, args=(segment, connection, response), daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+    def _split(self):
+        """Give half of the largest remaining range to a new connection"""
+        with self.lock:
+            running = [s for s in self.segments if not s.done]
+            if not running:
+                return False
+            largest = max(running, key=lambda s: s.end - s.pos)
+            remaining = largest.end - largest.pos
+            if remaining == float("inf") or remaining < 2 * MIN_SEGMENT_SIZE:
+                return False
+            middle = largest.pos + remaining // 2
+            segment = Segment(middle, largest.end)
+            largest.end = middle
+            self.segments.insert(self.segments.index(largest) + 1, segment)
+        self._start_segment(segment)
+        return True
+
+    def _fetch(self, segment, connection, response):
+        fd = None
+        try:
+            if response is None:
+                connection, response = self._open(segment.pos, segment.end)
+                if response.status != 206:
+                    raise DownloadError(f"server ignored the range request (HTTP {response.status})")
+            fd = os.open(self.part_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+            buffer = memoryview(bytearray(BUFFER_SIZE))
+            while not self.cancelled.is_set():
+                with self.lock:
+                    remaining = segment.end - segment.pos
+                if remaining <= 0:
+                    break
+                count = response.readinto(buffer[:min(BUFFER_SIZE, remaining)])
+                if not count:
+                    if segment.end == float("inf"):
+                        break
+                    raise DownloadError(f"IncompleteRead: connection closed {remaining} bytes early")
+                write_at(fd, buffer[:count], segment.pos)
+                # Splits never move an end closer than MIN_SEGMENT_SIZE to pos, so this stays in range
+                with self.lock:
+                    segment.pos += count
+                    self.received += count
+                    received = self.received
+                if self.rate_limit:
+                    ahead = received / self.rate_limit - (time.monotonic() - self.throttle_start)
+                    if ahead > 0:
+                        self.cancelled.wait(ahead)
+            if response.isclosed() and not response.will_close:
+                self.pool.put(self.key, connection)
+                connection = None
+        except (OSError, http.client.HTTPException, DownloadError) as e:
+            if not self.error:
+                self.error = f"ERROR: {e}" if isinstance(e, DownloadError) else f"ERROR: {type(e).__name__}: {e}"
+            self.cancelled.set()
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if connection is not None:
+                # Unread body left (the range was split or the job cancelled)
+                connection.close()
+            with self.lock:
+                segment.done = segment.pos >= segment.end or not self.cancelled.is_set()
+
+    def _supervise(self):
+        last_rate, last_bytes, last_time = None, 0, time.monotonic()
+        last_save = last_time
+        growing = True
+        while any(thread.is_alive() for thread in self.threads):
+            self.cancelled.wait(ADAPT_INTERVAL / 4)
+            if self.cancelled.is_set():
+                return
+            now = time.monotonic()
+            if self.ranged and now - last_save >= STATE_INTERVAL:
+                self.save_state()
+                last_save = now
+            if not self.ranged or now - last_time < ADAPT_INTERVAL:
+                # Keep the connection count up as segments finish
+                while self.ranged and self.active_connections() < min(self.target, MAX_SEGMENTS) and self._split():
+                    pass
+                continue
+            with self.lock:
+                received = self.received
+            rate = (received - last_bytes) / (now - last_time)
+            last_bytes, last_time = received, now
+            if growing and self.target < MAX_SEGMENTS:
+                if last_rate is None or rate > last_rate * (1 + ADAPT_GAIN):
+                    self.target += 1
+                    if self._split():
+                        self.log(f"[segmented] {self.active_connections()} connections at {format_bytes(rate, '/s')}")
+                else:
+                    # The last connection didn't pay off, stay here
+                    growing = False
+                    self.target = max(INITIAL_SEGMENTS, self.target - 1)
+                    self.log(f"[segmented] Settled on {self.target} connections at {format_bytes(rate, '/s')}")
+                last_rate = rate
+
+    def _join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def save_state(self):
+        with self.lock:
+            segments = [[s.pos, s.end] for s in self.segments if s.pos < s.end]
+        done = self.total - sum(end - pos for pos, end in segments)
+        state = {"url": self.url, "total": self.total, "validator": self.validator, "done": done,
+                 "segments": segments}
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
+
+    def load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if not os.path.exists(self.part_path) or not state["segments"]:
+                return None
+            if os.path.getsize(self.part_path) != state["total"]:
+                return None
+            return state
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+class SegmentedJob(QObject):
+    """Owner-side handle of a SegmentedDownload, reports like a procio job"""
+
+    def __init__(self, download, callback):
+        super().__init__()
+        self.download = download
+        self.callback = callback
+        self.running = True
+        self.exit_code = None
+        self.started = False
+        self.last_bytes = None
+        self.samples = deque(maxlen=20)
+        self.thread = threading.Thread(target=download.run, daemon=True)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.thread.start()
+        self.timer.start(FLUSH_INTERVAL)
+
+    def is_running(self):
+        return self.running
+
+    def kill(self):
+        self.download.cancel()
+
+    def speed(self, now, downloaded):
+        self.samples.append((now, downloaded))
+        first_time, first_bytes = self.samples[0]
+        if now - first_time <= 0:
+            return 0
+        return int((downloaded - first_bytes) / (now - first_time))
+
+    def poll(self):
+        download = self.download
+        records = []
+        if not self.started:
+            self.started = True
+            records += [("started", 0.0), ("destination", download.path)]
+        while download.messages:
+            records.append(("stdout", download.messages.popleft()))
+
+        downloaded = download.downloaded()
+        if download.total and downloaded != self.last_bytes:
+            self.last_bytes = downloaded
+            speed = self.speed(time.monotonic(), downloaded)
+            percent = min(100.0, 100.0 * downloaded / download.total)
+            records.append(("progress", percent, format_bytes(download.total),
+                            format_bytes(speed, "/s"), download.total, speed))
+
+        if download.finished:
+            self.timer.stop()
+            self.running = False
+            if download.error:
+                records.append(("stderr", download.error + "\n"))
+            self.exit_code = 0 if not download.error and not download.cancelled.is_set() else 1
+            records.append(("finished", self.exit_code, download.received))
+        if records:
+            self.callback(self, records)
+
+
+def start_segmented(url, path, headers, size, resume, rate_limit, callback):
+    """Start fetching url into path; callback(handle, records) runs on the calling thread"""
+    job = SegmentedJob(SegmentedDownload(url, path, headers, size, resume, rate_limit=rate_limit), callback)
+    job.start()
+    return job
@@ -0,0 +1,356 @@
+"""Channel and playlist subscriptions.
+
+SUBSCRIPTIONS_FILE lists the feeds to follow:
+
+    [{"name": "Some channel", "url": "https://www.youtube.com/@some/videos", "every": 360,
+      "format": "Balanced (1080p)", "output": "/data/%(channel)s/%(title)s.%(ext)s"}]
+
+every is minutes between polls, format a format profile name or a yt-dlp
+selector, output a path template; priority, initial (entries taken on the
+first poll, the rest only marked as seen), max_age_days and stop_at_known
+are optional.
+
+A poll lists the feed flat and lazily (--flat-playlist --lazy-playlist), so
+yt-dlp only requests the pages that are actually read, newest first.
+Reading stops at the first entry already in SUBSCRIPTION_ARCHIVE, or older
+than max_age_days, and the process is killed there; the archive has the
+format of yt-dlp's --download-archive, which is passed along with
+--break-on-existing so yt-dlp stops at the same entry on its own. A channel
+with a few new uploads therefore costs one page however long it is.
+
+New entries are enqueued oldest first and go into the archive right away,
+so each is enqueued once even if its download fails. Playlists that grow at
+the end instead of the front need "stop_at_known": false; they are listed
+completely (still flat, without extraction) and known entries are skipped.
+
+Poll times and counts are kept in SUBSCRIPTION_STATE, written only by the
+running instance; the list itself is re-read when the file changes, e.g.
+after `cli.py subscribe`.
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from core import item_from_entry, default_format_selector
+from formats import load_profiles
+from procio import process_hub
+
+SUBSCRIPTIONS_FILE = "Saves/subscriptions.json"
+SUBSCRIPTION_STATE = "Saves/subscription_state.json"
+SUBSCRIPTION_ARCHIVE = "Saves/subscription_archive.txt"
+DEFAULT_INTERVAL = 360          # minutes
+INITIAL_ITEMS = 10
+POLL_CONCURRENCY = 2
+POLL_TIMEOUT = 300              # seconds
+CHECK_INTERVAL = 60             # seconds between looks for due subscriptions
+STARTUP_DELAY = 10
+# yt-dlp's exit code when --break-on-existing stopped it
+BREAK_EXIT_CODE = 101
+
+
+def archive_key(entry):
+    """The line yt-dlp's --download-archive would hold for a flat entry"""
+    if not entry.get("id"):
+        return None
+    extractor = entry.get("ie_key") or entry.get("extractor_key") or "generic"
+    return f"{extractor.lower()} {entry['id']}"
+
+
+def load_archive(path=SUBSCRIPTION_ARCHIVE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except OSError:
+        return set()
+
+
+def load_subscriptions(path=SUBSCRIPTIONS_FILE):
+    """Subscriptions in path, [] if it doesn't exist. Raises ValueError if it's invalid."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [Subscription.from_dict(entry) for entry in json.load(f)]
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{path}: {e}") from e
+
+
+def save_subscriptions(subscriptions, path=SUBSCRIPTIONS_FILE):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([subscription.to_dict() for subscription in subscriptions], f, indent=2, ensure_ascii=False)
+
+
+class Subscription:
+    def __init__(self, url, name=None, every=DEFAULT_INTERVAL, format=None, output=None, priority=0,
+                 initial=INITIAL_ITEMS, max_age_days=None, stop_at_known=True, enabled=True):
+        self.url = url
+        self.name = name or url
+        self.every = every
+        self.format = format
+        self.output = output
+        self.priority = priority
+        self.initial = initial
+        self.max_age_days = max_age_days
+        self.stop_at_known = stop_at_known
+        self.enabled = enabled
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry["url"], entry.get("name"), int(entry.get("every", DEFAULT_INTERVAL)), entry.get("format"),
+                   entry.get("output"), int(entry.get("priority", 0)), int(entry.get("initial", INITIAL_ITEMS)),
+                   entry.get("max_age_days"), bool(entry.get("stop_at_known", True)), bool(entry.get("enabled", True)))
+
+    def to_dict(self):
+        return {
+            "name": self.name, "url": self.url, "every": self.every, "format": self.format, "output": self.output,
+            "priority": self.priority, "initial": self.initial, "max_age_days": self.max_age_days,
+            "stop_at_known": self.stop_at_known, "enabled": self.enabled,
+        }
+
+    def selector(self, profiles):
+        """The yt-dlp selector of this subscription's format rule"""
+        profile = next((profile for profile in profiles if profile.name == self.format), None)
+        if profile is not None:
+            return profile.selector()
+        return default_format_selector(self.format)
+
+    def cutoff(self):
+        """upload_date (YYYYMMDD) below which entries are too old, or None"""
+        if not self.max_age_days:
+            return None
+        return (datetime.now() - timedelta(days=int(self.max_age_days))).strftime("%Y%m%d")
+
+    def poll_args(self, archive_path, first_poll):
+        args = ["--flat-playlist", "--lazy-playlist", "--dump-json", "--no-warnings"]
+        if self.stop_at_known:
+            args += ["--download-archive", archive_path, "--break-on-existing"]
+            if first_poll:
+                args += ["--playlist-end", str(max(self.initial, 1))]
+            if self.cutoff():
+                # Flat entries often have no date, "?" lets those through
+                args += ["--break-match-filters", f"upload_date>=?{self.cutoff()}"]
+        return args + [self.url]
+
+
+class Poll:
+    """One listing of a subscription's feed"""
+
+    def __init__(self, subscription, first):
+        self.subscription = subscription
+        self.first = first
+        self.handle = None
+        self.entries = []
+        self.keys = set()
+        self.seen = 0
+        self.stopped = False        # we stopped reading; the process was killed on purpose
+        self.error = ""
+        self.started = datetime.now()
+
+
+class SubscriptionManager(QObject):
+    """Polls the subscriptions that are due and feeds their new entries to the download manager"""
+    log_message = pyqtSignal(str)
+    # name, entries enqueued
+    polled = pyqtSignal(str, int)
+
+    def __init__(self, download_manager, yt_dlp_path, default_output, path=SUBSCRIPTIONS_FILE,
+                 state_path=SUBSCRIPTION_STATE, archive_path=SUBSCRIPTION_ARCHIVE):
+        super().__init__()
+        self.download_manager = download_manager
+        self.yt_dlp_path = yt_dlp_path
+        self.default_output = default_output
+        self.path = path
+        self.state_path = state_path
+        self.archive_path = archive_path
+        self.subscriptions = []
+        self.mtime = None
+        self.state = {}
+        self.archive = set()
+        self.due = []
+        self.polls = {}
+        self.check_timer = QTimer(self)
+        self.check_timer.timeout.connect(self.check_due)
+
+    def start(self, delay=STARTUP_DELAY):
+        self.reload()
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        self.archive = load_archive(self.archive_path)
+        if self.subscriptions:
+            self.log_message.emit(f"[SUBSCRIPTIONS] Following {len(self.subscriptions)} feeds, "
+                                  f"{len(self.archive)} entries known")
+        self.check_timer.start(CHECK_INTERVAL * 1000)
+        # By default not right at startup, the first frame and the queue come first
+        QTimer.singleShot(delay * 1000, self.check_due)
+
+    def stop(self):
+        self.check_timer.stop()
+        for poll in list(self.polls.values()):
+            poll.stopped = True
+            poll.handle.kill()
+
+    def reload(self):
+        """Re-read the subscriptions file if it changed since the last look"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        try:
+            self.subscriptions = load_subscriptions(self.path)
+        except ValueError as e:
+            self.log_message.emit(f"[SUBSCRIPTIONS] Keeping the previous list, {e}")
+
+    def save(self, subscriptions):
+        save_subscriptions(subscriptions, self.path)
+        self.mtime = None
+        self.reload()
+
+    def add(self, subscription):
+        self.save([s for s in self.subscriptions if s.url != subscription.url] + [subscription])
+        self.poll_now(subscription.url)
+
+    def remove(self, url):
+        self.save([s for s in self.subscriptions if s.url != url])
+
+    def last_checked(self, subscription):
+        checked = self.state.get(subscription.url, {}).get("last_checked")
+        return datetime.fromisoformat(checked) if checked else None
+
+    def is_busy(self):
+        return bool(self.polls or self.due)
+
+    def is_due(self, subscription, now):
+        checked = self.last_checked(subscription)
+        return subscription.enabled and (checked is None or now - checked >= timedelta(minutes=subscription.every))
+
+    def check_due(self):
+        self.reload()
+        now = datetime.now()
+        for subscription in self.subscriptions:
+            if self.is_due(subscription, now):
+                self._add_due(subscription)
+        self.start_polls()
+
+    def poll_now(self, url=None):
+        """Poll one subscription (or all of them) now, whatever their interval"""
+        self.reload()
+        for subscription in self.subscriptions:
+            if url is None or subscription.url == url:
+                self._add_due(subscription)
+        self.start_polls()
+
+    def _add_due(self, subscription):
+        if subscription.url not in self.polls and all(due.url != subscription.url for due in self.due):
+            self.due.append(subscription)
+
+    def start_polls(self):
+        while self.due and len(self.polls) < POLL_CONCURRENCY:
+            subscription = self.due.pop(0)
+            poll = Poll(subscription, subscription.url not in self.state)
+            self.polls[subscription.url] = poll
+            args = subscription.poll_args(self.archive_path, poll.first)
+            self.log_message.emit(f"[SUBSCRIPTIONS] Polling {subscription.name}: {' '.join(args)}")
+            poll.handle = process_hub().start(self.yt_dlp_path, args, "jsonlines",
+                                              lambda handle, records, poll=poll: self.on_records(poll, records))
+            QTimer.singleShot(POLL_TIMEOUT * 1000, lambda poll=poll: self.on_timeout(poll))
+
+    def on_timeout(self, poll):
+        if self.polls.get(poll.subscription.url) is poll and not poll.stopped:
+            poll.error = f"timed out after {POLL_TIMEOUT}s"
+            poll.stopped = True
+            poll.handle.kill()
+
+    def on_records(self, poll, records):
+        for record in records:
+            if record[0] == "json" and not poll.stopped:
+                self.on_entry(poll, record[1])
+            elif record[0] == "stderr":
+                if "ERROR:" in record[1]:
+                    poll.error = record[1].strip()
+            elif record[0] == "finished":
+                self.finish_poll(poll, record[1])
+
+    def on_entry(self, poll, entry):
+        subscription = poll.subscription
+        if not isinstance(entry, dict):
+            return
+        poll.seen += 1
+        key = archive_key(entry)
+        cutoff = subscription.cutoff()
+        too_old = cutoff is not None and (entry.get("upload_date") or "99999999") < cutoff
+        if subscription.stop_at_known and (key in self.archive or too_old):
+            # Newest first: everything after this one was seen by an earlier poll
+            poll.stopped = True
+            poll.handle.kill()
+            return
+        if key in self.archive or key in poll.keys or too_old or not (entry.get("url") or entry.get("webpage_url")):
+            return
+        if key is not None:
+            poll.keys.add(key)
+        poll.entries.append(entry)
+        if poll.first and subscription.stop_at_known and len(poll.entries) >= subscription.initial:
+            poll.stopped = True
+            poll.handle.kill()
+
+    def finish_poll(self, poll, exit_code):
+        subscription = poll.subscription
+        del self.polls[subscription.url]
+        if exit_code not in (0, BREAK_EXIT_CODE) and not poll.stopped and not poll.error:
+            poll.error = f"yt-dlp exited with {exit_code}"
+        # A first poll only takes the newest few, the rest just become known
+        taken = poll.entries[:subscription.initial] if poll.first else poll.entries
+        self.enqueue(subscription, taken)
+        new_keys = [key for key in (archive_key(entry) for entry in poll.entries) if key]
+        self.archive.update(new_keys)
+        if new_keys:
+            try:
+                with open(self.archive_path, "a", encoding="utf-8") as f:
+                    f.write("".join(key + "\n" for key in new_keys))
+            except OSError as e:
+                self.log_message.emit(f"[SUBSCRIPTIONS] Failed to update {self.archive_path}: {e}")
+
+        seconds = (datetime.now() - poll.started).total_seconds()
+        self.state[subscription.url] = {"last_checked": datetime.now().isoformat(timespec="seconds"),
+                                        "last_new": len(taken), "last_seen": poll.seen,
+                                        "seconds": round(seconds, 1), "error": poll.error}
+        self.save_state()
+        self.log_message.emit(f"[SUBSCRIPTIONS] {subscription.name}: {len(taken)} new of {poll.seen} listed "
+                              f"in {seconds:.1f}s" + (f", {poll.error}" if poll.error else ""))
+        self.polled.emit(subscription.name, len(taken))
+        self.start_polls()
+
+    def enqueue(self, subscription, entries):
+        selector = subscription.selector(load_profiles()) if subscription.format else None
+        items = []
+        for entry in reversed(entries):
+            item = item_from_entry({
+                "url": entry.get("url") or entry.get("webpage_url"),
+                "title": entry.get("title"),
+                "format": selector,
+                "output_path": subscription.output or self.default_output,
+                "priority": subscription.priority,
+            }, self.default_output)
+            if item is None:
+                continue
+            item.max_retries = self.download_manager.max_retries
+            items.append(item)
+        # New uploads go in as one batch, then fill the free slots in one pass
+        with self.download_manager.batch():
+            for item in items:
+                self.download_manager.add_to_queue(item)
+
+    def save_state(self):
+        folder = os.path.dirname(self.state_path)
+        try:
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+        except OSError as e:
+            self.log_message.emit(f"[SUBSCRIPTIONS] Failed to save {self.state_path}: {e}")
@@ -0,0 +1,206 @@
+"""Asynchronous thumbnail loading.
+
+ThumbnailLoader.request(url) returns a cached QPixmap right away or None, in
+which case thumbnail_ready(url, pixmap) follows once the image is in. Lookups
+go memory (an LRU of QPixmaps), then disk (scaled-down JPEGs under
+THUMBNAIL_DIR), then the network. Downloads share one QNetworkAccessManager,
+which keeps connections alive per host, and at most MAX_CONCURRENT run at a
+time. Decoding, scaling and the disk write happen on a small thread pool, so
+the GUI thread only turns the finished QImage into a QPixmap.
+
+The first HTTPS request of a process loads the system CA certificates, which
+blocks the calling thread for a noticeable moment; a WarmupTask does that on
+the pool first and downloads start once it's done.
+"""
+import os
+import hashlib
+from collections import OrderedDict, deque
+from PyQt6.QtCore import QObject, QRunnable, QSize, QThreadPool, QUrl, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest, QSslConfiguration, QSslSocket
+
+THUMBNAIL_DIR = "Saves/thumbnails"
+THUMBNAIL_SIZE = QSize(160, 90)
+MAX_CONCURRENT = 4
+MEMORY_CACHE_SIZE = 300
+DISK_CACHE_FILES = 5000
+REQUEST_TIMEOUT = 10000
+
+
+def cache_path(url, folder=THUMBNAIL_DIR):
+    return os.path.join(folder, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".jpg")
+
+
+def pick_thumbnail(info, min_width=THUMBNAIL_SIZE.width()):
+    """The smallest thumbnail at least min_width wide, else the best one there is"""
+    thumbnails = [t for t in info.get("thumbnails") or [] if t.get("url")]
+    sized = [t for t in thumbnails if t.get("width")]
+    large_enough = [t for t in sized if t["width"] >= min_width]
+    if large_enough:
+        return min(large_enough, key=lambda t: t["width"])["url"]
+    if info.get("thumbnail"):
+        return info["thumbnail"]
+    if sized:
+        return max(sized, key=lambda t: t["width"])["url"]
+    # yt-dlp lists thumbnails from worst to best
+    return thumbnails[-1]["url"] if thumbnails else None
+
+
+class _DecodeNotifier(QObject):
+    decoded = pyqtSignal(str, QImage)
+    warmed_up = pyqtSignal()
+
+
+class WarmupTask(QRunnable):
+    """Load the CA certificates off the GUI thread, ahead of the first download"""
+
+    def __init__(self, notifier):
+        super().__init__()
+        self.notifier = notifier
+
+    def run(self):
+        try:
+            if QSslSocket.supportsSsl():
+                QSslConfiguration.defaultConfiguration().caCertificates()
+        finally:
+            self.notifier.warmed_up.emit()
+
+
+class DecodeTask(QRunnable):
+    """Decode downloaded bytes (scaled and written to disk) or a cached file"""
+
+    def __init__(self, url, data, path, notifier):
+        super().__init__()
+        self.url = url
+        self.data = data
+        self.path = path
+        self.notifier = notifier
+
+    def run(self):
+        image = QImage()
+        if self.data is None:
+            image.load(self.path)
+        elif image.loadFromData(self.data):
+            image = image.scaled(THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                image.save(self.path, "JPG", 85)
+            except OSError:
+                pass
+        self.notifier.decoded.emit(self.url, image)
+
+
+class PruneTask(QRunnable):
+    """Keep the newest max_files files of the disk cache"""
+
+    def __init__(self, folder, max_files):
+        super().__init__()
+        self.folder = folder
+        self.max_files = max_files
+
+    def run(self):
+        try:
+            entries = [entry for entry in os.scandir(self.folder) if entry.is_file()]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class ThumbnailLoader(QObject):
+    thumbnail_ready = pyqtSignal(str, QPixmap)
+
+    def __init__(self, folder=THUMBNAIL_DIR, max_concurrent=MAX_CONCURRENT, memory_size=MEMORY_CACHE_SIZE,
+                 parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.max_concurrent = max_concurrent
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.pending = deque()
+        self.waiting = set()
+        self.active = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "downloads": 0, "failures": 0, "bytes": 0}
+
+        self.network = QNetworkAccessManager(self)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.notifier = _DecodeNotifier()
+        self.notifier.decoded.connect(self.on_decoded)
+        self.notifier.warmed_up.connect(self.on_warmed_up)
+        self.ready = False
+        self.pool.start(WarmupTask(self.notifier))
+        self.pool.start(PruneTask(folder, DISK_CACHE_FILES))
+
+    def request(self, url):
+        """The cached pixmap, or None and a thumbnail_ready signal later"""
+        if not url:
+            return None
+        pixmap = self.memory.get(url)
+        if pixmap is not None:
+            self.memory.move_to_end(url)
+            self.stats["memory_hits"] += 1
+            return pixmap
+        if url in self.waiting:
+            return None
+        self.waiting.add(url)
+        path = cache_path(url, self.folder)
+        if os.path.exists(path):
+            self.stats["disk_hits"] += 1
+            self.pool.start(DecodeTask(url, None, path, self.notifier))
+        else:
+            self.pending.append(url)
+            self._start_downloads()
+        return None
+
+    def clear_pending(self):
+        """Forget downloads that haven't started, e.g. for the rows of an old search"""
+        for url in self.pending:
+            self.waiting.discard(url)
+        self.pending.clear()
+
+    def on_warmed_up(self):
+        self.ready = True
+        self._start_downloads()
+
+    def _start_downloads(self):
+        while self.ready and self.pending and len(self.active) < self.max_concurrent:
+            url = self.pending.popleft()
+            request = QNetworkRequest(QUrl(url))
+            request.setTransferTimeout(REQUEST_TIMEOUT)
+            reply = self.network.get(request)
+            self.active[reply] = url
+            reply.finished.connect(lambda reply=reply: self.on_reply(reply))
+
+    def on_reply(self, reply):
+        url = self.active.pop(reply, None)
+        if url is not None:
+            if reply.error() == QNetworkReply.NetworkError.NoError:
+                data = bytes(reply.readAll())
+                self.stats["downloads"] += 1
+                self.stats["bytes"] += len(data)
+                self.pool.start(DecodeTask(url, data, cache_path(url, self.folder), self.notifier))
+            else:
+                # Not cached, so the next request tries again
+                self.waiting.discard(url)
+                self.stats["failures"] += 1
+        reply.deleteLater()
+        self._start_downloads()
+
+    def on_decoded(self, url, image):
+        self.waiting.discard(url)
+        if image.isNull():
+            self.stats["failures"] += 1
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.memory[url] = pixmap
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+        self.thumbnail_ready.emit(url, pixmap)